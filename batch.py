@@ -0,0 +1,23 @@
+# Runs many scheduling scenarios (teams, what-if variants) in one go on a process pool and writes one
+# consolidated results file. The source is a folder of CSVs or a JSON manifest; see
+# event.load_scenarios for the manifest format.
+#
+#   python3 batch.py scenarios/ -o results.json
+#   python3 batch.py manifest.json --workers 4
+import argparse
+
+from event import load_scenarios, run_batch, write_batch_results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solve a batch of scheduling scenarios.")
+    parser.add_argument('source', help="folder of CSVs or JSON manifest")
+    parser.add_argument('-o', '--output', default='batch_results.json', help="consolidated results file")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args()
+
+    records = run_batch(load_scenarios(args.source), workers=args.workers)
+    write_batch_results(records, args.output)
+    for r in records:
+        timing = f"{r['seconds']:.2f}s" if 'seconds' in r else r.get('error', '')
+        print(f"{r['name']:<40} {r['status']:<10} {timing}")
+    print(f"\nWrote results for {len(records)} scenarios to {args.output}")
@@ -0,0 +1,207 @@
+# Measures how the solver scales. Synthetic Science Olympiad rosters are generated from fixed seeds
+# (student count, events, block structure, seat counts, build ratio, ban density and tightness, the
+# share of the team's event capacity the roster needs), each is solved with find_assignment, and the
+# nodes and wall time per instance are compared against a stored baseline.
+#
+#   python3 benchmark.py                       run the suite and compare with benchmark_baseline.json
+#   python3 benchmark.py -k scale              only the cases whose name contains "scale"
+#   python3 benchmark.py --solver bnb          another backend (the baseline is per solver)
+#   python3 benchmark.py --decompose           solve part by part with solve_decomposed
+#   python3 benchmark.py --update-baseline     store this run as the new baseline
+#   python3 benchmark.py --check               exit 1 on a status change, more nodes, or a slowdown
+#
+# Node counts are deterministic and comparable anywhere; wall times only on the machine that wrote
+# the baseline.
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from event import (MAX_BUILDS_PER_STUDENT, MAX_EVENTS_PER_STUDENT, SolverStats, find_assignment,
+                   problem_from_tables, solve_decomposed)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+def generate_roster(seed: int, students: int = 15, blocks: int = 6, events_per_block: int = 3,
+                    no_conflict: int = 5, seats: tuple = (2, 3), build_ratio: float = 0.3,
+                    ban_density: float = 0.0, tightness: Optional[float] = None,
+                    tryouts_per_student: tuple = (4, 8), overfull_block: bool = False, pairs: int = 0) -> Dict:
+    # find_assignment keyword arguments for a random roster, the same for the same arguments.
+    # Seat counts are drawn from seats; with tightness, they are then adjusted one at a time within
+    # that range toward needing that share of students * MAX_EVENTS_PER_STUDENT slots. No block asks for more
+    # seats than there are students unless overfull_block is set, which makes the first one do so.
+    # ban_density is the share of student pairs that cannot share an event; as many student-event
+    # bans are drawn per student as that density of the events. pairs pair_together rules join events of
+    # different blocks, the second taking the first's seat count.
+    r = random.Random(seed)
+    names = [f'Student{i + 1}' for i in range(students)]
+    block_events = {f'Block {b + 1}': [f'Event {b + 1}.{j + 1}' for j in range(events_per_block)]
+                    for b in range(blocks)}
+    no_conflict_events = [f'Open Event {j + 1}' for j in range(no_conflict)]
+    events = [e for evs in block_events.values() for e in evs] + no_conflict_events
+    event_block = {e: b for b, evs in block_events.items() for e in evs}
+    requirements = {e: r.choice(seats) for e in events}
+
+    def room(event):
+        # seats the event can take without its block needing more students than the team has
+        block = event_block.get(event)
+        return block is None or sum(requirements[e] for e in block_events[block]) < students
+
+    if tightness is not None:
+        target = round(tightness * students * MAX_EVENTS_PER_STUDENT)
+        low, high = min(seats), max(seats)
+        for _ in range(100 * len(events)):
+            total = sum(requirements.values())
+            if total == target:
+                break
+            event = r.choice(events)
+            if total < target and requirements[event] < high and room(event):
+                requirements[event] += 1
+            elif total > target and requirements[event] > low:
+                requirements[event] -= 1
+    if overfull_block:
+        first = block_events['Block 1']
+        while sum(requirements[e] for e in first) <= students:
+            requirements[r.choice(first)] += 1
+
+    paired = []
+    for _ in range(pairs):
+        a, b = r.sample(events, 2)
+        if event_block.get(a, a) != event_block.get(b, b):
+            requirements[b] = requirements[a]
+            paired.append((a, b))
+
+    build_events = [e for e in events if r.random() < build_ratio]
+
+    # each student tries out for a few events; ranks order everyone who tried out for an event
+    skill = {s: r.random() for s in names}
+    takers: Dict[str, List[tuple]] = {e: [] for e in events}
+    for s in names:
+        for e in r.sample(events, min(len(events), r.randint(*tryouts_per_student))):
+            takers[e].append((skill[s] + r.gauss(0, 0.25), s))
+    tryouts: Dict[str, List[tuple]] = {s: [] for s in names}
+    for e, entries in takers.items():
+        for rank, (_, s) in enumerate(sorted(entries, reverse=True), 1):
+            tryouts[s].append((e, rank))
+
+    student_pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+    rules = {'mandatory': {'student-event': []},
+             'banned': {'student-event': [(s, e) for s in names for e in events if r.random() < ban_density],
+                        'student-student': [p for p in student_pairs if r.random() < ban_density]}}
+    if paired:
+        rules['pair_together'] = paired
+    similar_groups = {f'Group {b + 1}': [evs[0] for evs in list(block_events.values())[b::3]]
+                      for b in range(min(3, blocks))}
+    return problem_from_tables(tryouts, no_conflict_events, block_events, requirements, build_events, rules,
+                               similar_groups)
+
+# The suite: (name, generate_roster arguments, find_assignment budget overrides). Scaling curves vary
+# one dimension at a time around a 40-student, 0.8-tight roster; the search cases are small, full and
+# heavily banned, so they backtrack, and are capped by nodes so their counts stay machine independent;
+# the infeasible cases are infeasible by construction.
+BASE = dict(students=40, blocks=10, events_per_block=4, no_conflict=8, seats=(1, 4), tightness=0.8)
+SEARCH = dict(students=12, blocks=4, events_per_block=3, no_conflict=3, seats=(1, 4), tightness=1.0)
+CASES = (
+    [(f'scale-students-{n}', dict(BASE, students=n, blocks=max(2, n // 4), no_conflict=max(2, n // 5)), {})
+     for n in (15, 30, 60, 100, 150)]
+    + [('scale-team-15', dict(students=15, blocks=6, events_per_block=3, no_conflict=5, tightness=0.85), {})]
+    + [(f'tightness-{t:.2f}', dict(BASE, tightness=t), {}) for t in (0.5, 0.7, 0.9, 0.95, 1.0)]
+    + [(f'blocks-{b}x{k}', dict(BASE, blocks=b, events_per_block=k), {}) for b, k in ((4, 10), (20, 2), (40, 1))]
+    + [(f'seats-{lo}-{hi}', dict(BASE, seats=(lo, hi)), {}) for lo, hi in ((1, 2), (2, 3), (3, 4))]
+    + [(f'builds-{b:.2f}', dict(BASE, build_ratio=b), {}) for b in (0.0, 0.25, 0.5)]
+    + [(f'bans-{d:.2f}', dict(BASE, ban_density=d), {}) for d in (0.02, 0.05, 0.1)]
+    + [(f'pairs-{n}', dict(BASE, pairs=n), {}) for n in (2, 4, 8)]
+    + [(f'search-bans-{d:.2f}-{i}', dict(SEARCH, ban_density=d), {'node_limit': 20000})
+       for d in (0.15, 0.2, 0.25) for i in (1, 2, 3)]
+    + [('infeasible-over-capacity', dict(BASE, tightness=None, seats=(5, 6)), {}),
+       ('infeasible-overfull-block', dict(BASE, overfull_block=True), {}),
+       ('infeasible-builds', dict(BASE, build_ratio=1.0, tightness=0.9), {}),
+       ('infeasible-banned-pairs', dict(students=12, blocks=3, events_per_block=2, no_conflict=2,
+                                        seats=(3, 3), ban_density=0.9), {})]
+)
+
+def run_case(problem: Dict, solver: str, time_limit: Optional[float], node_limit: Optional[int],
+             repeat: int, decompose: bool = False) -> Dict:
+    # best wall time of repeat solves; nodes and status from the last one
+    seconds = math.inf
+    solve = solve_decomposed if decompose else find_assignment
+    for _ in range(repeat):
+        stats = SolverStats()
+        start = time.perf_counter()
+        result = solve(**problem, solver=solver, time_limit=time_limit, node_limit=node_limit, stats=stats)
+        seconds = min(seconds, time.perf_counter() - start)
+    return {'students': len(problem['students']), 'events': len(problem['events']),
+            'slots': sum(problem['event_student_requirements'].values()),
+            'status': result.status, 'cost': result.cost, 'nodes': stats.nodes,
+            'seconds': round(seconds, 4)}
+
+def compare(name: str, record: Dict, base: Optional[Dict], slowdown: float) -> List[str]:
+    # regressions of one case against its baseline record
+    if base is None:
+        return []
+    problems = []
+    if record['status'] != base['status']:
+        problems.append(f"{name}: status {base['status']} -> {record['status']}")
+    if record['nodes'] > base['nodes']:
+        problems.append(f"{name}: nodes {base['nodes']} -> {record['nodes']}")
+    # sub-10ms cases are too noisy to time
+    if record['seconds'] > max(base['seconds'], 0.01) * slowdown:
+        problems.append(f"{name}: {base['seconds']:.3f}s -> {record['seconds']:.3f}s")
+    return problems
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time the solver on synthetic rosters against a baseline.")
+    parser.add_argument('-k', dest='pattern', default='', help="only cases whose name contains this")
+    parser.add_argument('--solver', default='dfs', help="backend passed to find_assignment")
+    parser.add_argument('--decompose', action='store_true', help="solve with solve_decomposed")
+    parser.add_argument('--time-limit', type=float, default=30.0, help="seconds per solve")
+    parser.add_argument('--node-limit', type=int, default=200000, help="search nodes per solve")
+    parser.add_argument('--repeat', type=int, default=3, help="solves per case; the fastest is kept")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--check', action='store_true', help="exit 1 when any case regressed")
+    parser.add_argument('--slowdown', type=float, default=1.5, help="time ratio --check tolerates")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    suite = args.solver + ('+decompose' if args.decompose else '')
+    stored = baseline.get(suite, {})
+
+    print(f"solver {suite}, {MAX_EVENTS_PER_STUDENT} events and {MAX_BUILDS_PER_STUDENT} builds per student")
+    print(f"{'case':<28}{'students':>9}{'slots':>7}  {'status':<11}{'nodes':>9}{'base':>9}{'seconds':>9}{'base':>9}")
+    results = {}
+    regressions = []
+    for name, params, budget in CASES:
+        if args.pattern not in name:
+            continue
+        # seeded by name, so adding cases leaves the others' rosters alone
+        record = run_case(generate_roster(zlib.crc32(name.encode()), **params), args.solver,
+                          budget.get('time_limit', args.time_limit), budget.get('node_limit', args.node_limit),
+                          args.repeat, args.decompose)
+        results[name] = record
+        base = stored.get(name)
+        regressions += compare(name, record, base, args.slowdown)
+        base_nodes = '' if base is None else base['nodes']
+        base_seconds = '' if base is None else f"{base['seconds']:.3f}"
+        print(f"{name:<28}{record['students']:>9}{record['slots']:>7}  {record['status']:<11}"
+              f"{record['nodes']:>9}{base_nodes:>9}{record['seconds']:>9.3f}{base_seconds:>9}")
+
+    if args.update_baseline:
+        baseline[suite] = dict(stored, **results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nWrote baseline for {len(results)} cases to {args.baseline}")
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        if args.check:
+            sys.exit(1)
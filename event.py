@@ -1,9 +1,17 @@
 from collections import defaultdict
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Union
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
+import hashlib
+import heapq
+import itertools
+import json
 import math
+import multiprocessing
 import os
 import csv
+import random
+import time
 
 MAX_EVENTS_PER_STUDENT = 4
 MAX_BUILDS_PER_STUDENT = 2
@@ -15,227 +23,2773 @@ def build_event_to_block(blocks: Dict[str, List[str]]) -> Dict[str, str]:
             mapping[e] = block_name
     return mapping
 
-def eligible(student: str, event: str, student_assignments: Dict[str, List[str]],
-             event_slots_remaining: Dict[str, int], event_to_block: Dict[str, str],
-             rules: Dict, max_per_student: int) -> bool:
-    # slot available
-    if event_slots_remaining.get(event, 0) <= 0:
-        return False
+def student_limits(students: List[str], rules: Dict, max_per_student: int,
+                   max_builds_per_student: int = MAX_BUILDS_PER_STUDENT) -> tuple:
+    # each student's event cap and build cap: the team-wide ones, or tighter ones from rules['limits']
+    limits = rules.get('limits', {})
+    event_limits = {s: max_per_student for s in students}
+    for s, n in limits.get('student-events', []):
+        if s in event_limits:
+            event_limits[s] = min(event_limits[s], n)
+    build_limits = {s: max_builds_per_student for s in students}
+    for s, n in limits.get('student-builds', []):
+        if s in build_limits:
+            build_limits[s] = min(build_limits[s], n)
+    return event_limits, build_limits
+
+class RankTables:
+    # Preference/performance ranks and similar-event groups turned into lookup tables once,
+    # so ordering candidates never calls list.index() inside the search.
+    def __init__(self, preferences: Dict[str, List[str]], performance: Optional[Dict[str, List[str]]],
+                 similar_groups: Dict[str, List[str]]):
+        # student -> event -> preference rank (lower index = higher preference)
+        self.pref_rank: Dict[str, Dict[str, int]] = {}
+        for s, evs in preferences.items():
+            ranks = self.pref_rank[s] = {}
+            for i, e in enumerate(evs):
+                ranks.setdefault(e, i)
+        # event -> student -> performance rank (lower index = better performer)
+        self.perf_rank: Dict[str, Dict[str, int]] = {}
+        for e, ss in (performance or {}).items():
+            ranks = self.perf_rank[e] = {}
+            for i, s in enumerate(ss):
+                ranks.setdefault(s, i)
+        # number of students who tried out for each event
+        self.tryout_counts: Dict[str, int] = {e: len(ss) for e, ss in (performance or {}).items()}
+        self.event_to_group: Dict[str, str] = {}
+        for gname, evs in similar_groups.items():
+            for ev in evs:
+                self.event_to_group[ev] = gname
+
+    def pref(self, student: str, event: str) -> int:
+        return self.pref_rank.get(student, {}).get(event, 999)
+
+    def perf(self, student: str, event: str) -> int:
+        return self.perf_rank.get(event, {}).get(student, 999)
+
+    def cost(self, student: str, event: str) -> int:
+        # tryout-rank cost of one seat, minimized by the exact solvers
+        return self.pref(student, event) + self.perf(student, event)
+
+class CompiledProblem:
+    # Students, events and blocks interned to integers, with the static rules turned into bitsets
+    # over student indices (bit i = students[i]), so an eligibility test is a few AND operations.
+    def __init__(self, students: List[str], event_student_requirements: Dict[str, int],
+                 event_to_block: Dict[str, str], rules: Dict, build_events: List[str], max_per_student: int,
+                 max_builds_per_student: int = MAX_BUILDS_PER_STUDENT):
+        self.students = list(students)
+        self.student_index: Dict[str, int] = {s: i for i, s in enumerate(self.students)}
+        self.events = list(event_student_requirements)
+        self.event_index: Dict[str, int] = {e: i for i, e in enumerate(self.events)}
+        self.all_students = (1 << len(self.students)) - 1
+
+        # event index -> block index; events outside any block share the None block
+        self.blocks: List[Optional[str]] = []
+        self.block_index: Dict[Optional[str], int] = {}
+        self.event_block: List[int] = []
+        for e in self.events:
+            block = event_to_block.get(e)
+            if block not in self.block_index:
+                self.block_index[block] = len(self.blocks)
+                self.blocks.append(block)
+            self.event_block.append(self.block_index[block])
+        self.seats: List[int] = [event_student_requirements[e] for e in self.events]
+        build_set = set(build_events)
+        self.is_build: List[bool] = [e in build_set for e in self.events]
+
+        # event index -> students banned from it; student index -> students banned alongside them
+        banned = rules.get('banned', {})
+        self.banned: List[int] = [0] * len(self.events)
+        for s, e in banned.get('student-event', []):
+            if s in self.student_index and e in self.event_index:
+                self.banned[self.event_index[e]] |= 1 << self.student_index[s]
+        self.peers: List[int] = [0] * len(self.students)
+        for a, b in banned.get('student-student', []):
+            if a in self.student_index and b in self.student_index:
+                self.peers[self.student_index[a]] |= 1 << self.student_index[b]
+                self.peers[self.student_index[b]] |= 1 << self.student_index[a]
+
+        # pair_together rules merged into groups of events that always share one roster, filled as one
+        # super-slot; an event paired with an unknown one is in a group nobody can take
+        groups: List[tuple] = []
+        for a, b in rules.get('pair_together', []):
+            members = {self.event_index[e] for e in (a, b) if e in self.event_index}
+            takeable = a in self.event_index and b in self.event_index
+            for group in [g for g in groups if g[0] & members]:
+                groups.remove(group)
+                members |= group[0]
+                takeable = takeable and group[1]
+            if members:
+                groups.append((members, takeable))
+        self.pair_group: List[Optional[int]] = [None] * len(self.events)
+        self.pair_groups: List[List[int]] = []
+        # group index -> students no static rule keeps off any of its events: banned from none, the
+        # events in distinct blocks, and the whole group within the event and build caps
+        self.pair_able: List[int] = []
+        for members, takeable in groups:
+            events = sorted(members)
+            able = self.all_students
+            for e in events:
+                self.pair_group[e] = len(self.pair_groups)
+                able &= ~self.banned[e]
+            if (not takeable or len({self.event_block[e] for e in events}) < len(events)
+                    or len(events) > max_per_student
+                    or sum(self.is_build[e] for e in events) > max_builds_per_student):
+                able = 0
+            self.pair_groups.append(events)
+            self.pair_able.append(able)
+
+    def mask(self, students) -> int:
+        m = 0
+        for s in students:
+            m |= 1 << self.student_index[s]
+        return m
+
+    def members(self, mask: int) -> List[str]:
+        # student names of a mask, in index order
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self.students[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+    def decode(self, event_masks: List[int]) -> Dict[str, List[str]]:
+        # per-student event bitmasks back to the Dict[str, List[str]] result form
+        result = {}
+        for i, m in enumerate(event_masks):
+            evs = result[self.students[i]] = []
+            while m:
+                low = m & -m
+                evs.append(self.events[low.bit_length() - 1])
+                m ^= low
+        return result
+
+# rosters from this size rank candidates with RankArrays when NumPy is installed; below it, building
+# the arrays costs more than sorting the few candidates in Python
+VECTORIZE_MIN_STUDENTS = 25
+
+class RankArrays:
+    # The candidate order of SolverState.candidate_key as NumPy arrays over student indices: static
+    # preference/performance rank sums per event, and load and similar-group counts kept in step with
+    # assign/unassign, so a domain is ordered by one lexsort instead of a key tuple per student.
+    # Raises ImportError without NumPy.
+    def __init__(self, problem: CompiledProblem, ranks: RankTables, pair_map: Dict[str, List[str]]):
+        import numpy
+        self.numpy = numpy
+        self.problem = problem
+        self.ranks = ranks
+        self.pair_map = pair_map
+        self.nbytes = (len(problem.students) + 7) // 8
+        groups = sorted(set(ranks.event_to_group.values()))
+        self.group_index: Dict[str, int] = {g: i for i, g in enumerate(groups)}
+        self.loads = numpy.zeros(len(problem.students), dtype=numpy.int64)
+        self.group_loads = numpy.zeros((len(problem.students), max(1, len(groups))), dtype=numpy.int64)
+        # event -> (preference rank sums, performance rank sums), built on first use
+        self.rank_sums: Dict[str, tuple] = {}
+        self.jitter = None
+
+    def place(self, i: int, event: str, delta: int):
+        self.loads[i] += delta
+        group = self.ranks.event_to_group.get(event)
+        if group:
+            self.group_loads[i, self.group_index[group]] += delta
+
+    def set_jitter(self, jitter: Optional[Dict[str, float]]):
+        self.jitter = None if jitter is None else self.numpy.array([jitter[s] for s in self.problem.students])
+
+    def order(self, event: str, mask: int, weights: Optional[tuple]) -> List[str]:
+        # the students of `mask`, sorted as candidate_key sorts them; lexsort is stable and the indices
+        # come out ascending, so ties keep index order just like list.sort over members()
+        numpy = self.numpy
+        bits = numpy.unpackbits(numpy.frombuffer(mask.to_bytes(self.nbytes, 'little'), dtype=numpy.uint8),
+                                bitorder='little')
+        idx = numpy.flatnonzero(bits)
+        sums = self.rank_sums.get(event)
+        if sums is None:
+            ranks = self.ranks
+            evs = [event] + self.pair_map.get(event, [])
+            sums = self.rank_sums[event] = (
+                numpy.array([sum(ranks.pref(s, x) for x in evs) for s in self.problem.students], dtype=numpy.int64),
+                numpy.array([sum(ranks.perf(s, x) for x in evs) for s in self.problem.students], dtype=numpy.int64))
+        group = self.ranks.event_to_group.get(event)
+        penalty = (self.group_loads[idx, self.group_index[group]] == 0).astype(numpy.int64) if group else 1
+        keys = [sums[0][idx], sums[1][idx], penalty, self.loads[idx]]
+        if weights is not None:
+            score = 0
+            for w, k in zip(weights, keys):
+                score = score + w * k
+            keys = [score]
+        if self.jitter is not None:
+            keys.append(self.jitter[idx])
+        # a constant key (no similar group) orders nothing; lexsort wants arrays, primary key last
+        keys = [k for k in keys if not numpy.isscalar(k)]
+        if keys:
+            idx = idx[numpy.lexsort(keys[::-1])]
+        students = self.problem.students
+        return [students[i] for i in idx.tolist()]
+
+class SolverStats:
+    # Counters and timings of one solve, collected when passed as find_assignment(stats=...). Nothing
+    # is measured without one: the solver only checks for its presence.
+    def __init__(self):
+        self.nodes = 0         # placements tried
+        self.backtracks = 0    # branching points whose candidates ran out
+        self.backjumps = 0     # branching points skipped by conflict-directed backjumping
+        self.max_depth = 0
+        self.nogoods = 0       # nogoods learned
+        self.domains = 0       # candidate domains computed
+        # dead ends by cause: propagation failures ('seats', 'block', 'capacity', 'builds', 'pair'),
+        # 'empty domain', 'bound', 'nogood' and 'flow' (no relaxed schedule fills the open seats)
+        self.prunes: Dict[str, int] = defaultdict(int)
+        # students left out of a domain, by the first rule that rules them out
+        self.rejections: Dict[str, int] = defaultdict(int)
+        # seconds per phase: 'setup', 'search', 'eligibility', 'sorting', 'propagation'
+        self.timings: Dict[str, float] = defaultdict(float)
+
+    def add(self, other: 'SolverStats'):
+        # fold in the counters of another solve, e.g. one part of a decomposed roster
+        for name in ('nodes', 'backtracks', 'backjumps', 'nogoods', 'domains'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for mine, theirs in ((self.prunes, other.prunes), (self.rejections, other.rejections),
+                             (self.timings, other.timings)):
+            for key, value in theirs.items():
+                mine[key] += value
+
+    def to_dict(self) -> Dict:
+        return {'nodes': self.nodes, 'backtracks': self.backtracks, 'backjumps': self.backjumps,
+                'max_depth': self.max_depth, 'nogoods': self.nogoods, 'domains': self.domains,
+                'prunes': dict(self.prunes), 'rejections': dict(self.rejections),
+                'timings': {k: round(v, 6) for k, v in self.timings.items()}}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+# seconds between the periodic snapshots a progress callback receives
+PROGRESS_INTERVAL = 1.0
+
+class SolverProgress:
+    # What a progress callback (find_assignment(progress=...), improve_assignment(progress=...)) is
+    # handed: a periodic snapshot of the search, or with `assignment` set, a complete schedule just
+    # found that is better than any before it.
+    def __init__(self, elapsed: float, nodes: int, filled: int, seats: int, best_cost: Optional[int],
+                 assignment: Optional['Assignment'] = None):
+        self.elapsed = elapsed      # seconds since the search started
+        self.nodes = nodes          # placements tried so far
+        self.filled = filled        # seats filled at the search's current position
+        self.seats = seats
+        self.best_cost = best_cost  # cost of the best complete schedule so far, None before the first
+        self.assignment = assignment
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        record = {'elapsed': round(self.elapsed, 3), 'nodes': self.nodes,
+                  'nodes_per_second': round(self.nodes_per_second), 'filled': self.filled, 'seats': self.seats,
+                  'best_cost': self.best_cost}
+        if self.assignment is not None:
+            record['status'] = self.assignment.status
+            record['assignment'] = dict(self.assignment)
+        return record
+
+class SolverState:
+    # Assignment facts maintained incrementally as placements are made and undone, so that
+    # eligibility never rescans the rules, the other students' rosters, or the build list.
+    # The name-keyed views are what the solvers and callers read; eligibility itself runs on the
+    # integer masks of the compiled problem.
+    def __init__(self, students: List[str], event_student_requirements: Dict[str, int],
+                 event_to_block: Dict[str, str], rules: Dict, max_per_student: int,
+                 build_events: List[str], ranks: Optional[RankTables] = None,
+                 max_builds_per_student: int = MAX_BUILDS_PER_STUDENT):
+        self.students = list(students)
+        self.event_to_block = event_to_block
+        self.max_per_student = max_per_student
+        self.build_events = set(build_events)
+        self.problem = CompiledProblem(students, event_student_requirements, event_to_block, rules, build_events,
+                                       max_per_student, max_builds_per_student)
+
+        self.student_assignments: Dict[str, List[str]] = {s: [] for s in students}
+        self.event_slots_remaining: Dict[str, int] = dict(event_student_requirements)
+        # per-event roster sets and per-student build counters
+        self.event_rosters: Dict[str, set] = {e: set() for e in event_student_requirements}
+        self.build_counts: Dict[str, int] = {s: 0 for s in students}
+
+        # the same placements as bitsets: per-student event masks, per-event roster masks, per-block
+        # masks of the students already sitting in it, the students at their event limit or build
+        # cap, and per-event masks of the banned peers of its roster
+        problem = self.problem
+        self.event_masks: List[int] = [0] * len(problem.students)
+        self.roster_masks: List[int] = [0] * len(problem.events)
+        self.block_masks: List[int] = [0] * len(problem.blocks)
+        self.full_mask = 0
+        self.build_full_mask = 0
+        self.peer_masks: List[int] = [0] * len(problem.events)
+
+        self.block_events: Dict[str, List[str]] = defaultdict(list)
+        for e in event_student_requirements:
+            self.block_events[event_to_block.get(e)].append(e)
+
+        # similar-event group counts per student, for the group tie-breaker
+        self.ranks = ranks if ranks is not None else RankTables({}, None, {})
+        self.student_groups: Dict[str, Dict[str, int]] = {s: defaultdict(int) for s in students}
+        # total tryout-rank cost of the current placements
+        self.total_cost = 0
+
+        # hashed ban indexes
+        banned = rules.get('banned', {})
+        self.banned_student_event = {(s, e) for s, e in banned.get('student-event', [])}
+        self.banned_peers: Dict[str, set] = defaultdict(set)
+        for a, b in banned.get('student-student', []):
+            self.banned_peers[a].add(b)
+            self.banned_peers[b].add(a)
+
+        # per-student event and build caps; a cap of zero rules the student out from the start
+        self.event_limits, self.build_limits = student_limits(students, rules, max_per_student,
+                                                              max_builds_per_student)
+        for s in students:
+            if self.event_limits[s] <= 0:
+                self.full_mask |= 1 << problem.student_index[s]
+            if self.build_limits[s] <= 0:
+                self.build_full_mask |= 1 << problem.student_index[s]
+
+        self.pairs = list(rules.get('pair_together', []))
+        # event -> the other events of its pair group
+        self.pair_map: Dict[str, List[str]] = {}
+        for group in problem.pair_groups:
+            for e in group:
+                self.pair_map[problem.events[e]] = [problem.events[p] for p in group if p != e]
+
+        # candidate ordering: lexicographic keys, no random tie-breaking (see set_ordering)
+        self.rank_keys: Dict[str, Dict[str, tuple]] = {}
+        self.weights: Optional[tuple] = None
+        self.jitter: Optional[Dict[str, float]] = None
+        # the same order computed on arrays, for large rosters when NumPy is installed
+        self.rank_arrays: Optional[RankArrays] = None
+        if len(problem.students) >= VECTORIZE_MIN_STUDENTS:
+            try:
+                self.rank_arrays = RankArrays(problem, self.ranks, self.pair_map)
+            except ImportError:
+                pass
+
+        # candidate domains cached per distinct event; entries in `dirty` are recomputed on demand
+        self.domains: Dict[str, List[str]] = {}
+        self.dirty = set(event_student_requirements)
+        # cheapest cost of each event's open seats, cached alongside its domain
+        self.bounds: Dict[str, int] = {}
+        # student -> events whose cached domain currently lists that student
+        self.listed_in: Dict[str, set] = {s: set() for s in students}
+        # blocks whose events' domains changed since their last Hall check
+        self.hall_dirty = set(self.block_events)
+        # event index -> students ruled out by symmetry breaking in the current branch
+        self.excluded_masks: List[int] = [0] * len(problem.events)
+        # instrumentation, attached by find_assignment(stats=...)
+        self.stats: Optional[SolverStats] = None
+        # progress callback, attached by find_assignment(progress=...)
+        self.progress: Optional[Callable[[SolverProgress], None]] = None
+
+    def unavailable(self, e: int) -> int:
+        # students ruled out of event index `e`: already on it, at their event limit, tried earlier in
+        # this branch, banned from it or alongside someone on it, busy in its block, or at the build cap
+        problem = self.problem
+        mask = (self.roster_masks[e] | self.full_mask | self.excluded_masks[e] | problem.banned[e]
+                | self.peer_masks[e] | self.block_masks[problem.event_block[e]])
+        if problem.is_build[e]:
+            mask |= self.build_full_mask
+        return mask
+
+    def eligible(self, student: str, event: str) -> bool:
+        # slot available
+        if self.event_slots_remaining.get(event, 0) <= 0:
+            return False
+        problem = self.problem
+        return not self.unavailable(problem.event_index[event]) >> problem.student_index[student] & 1
+
+    def assign(self, student: str, event: str):
+        self._invalidate(student, event, freeing=False)
+        problem = self.problem
+        i = problem.student_index[student]
+        e = problem.event_index[event]
+        bit = 1 << i
+        self.student_assignments[student].append(event)
+        self.event_slots_remaining[event] -= 1
+        self.event_rosters[event].add(student)
+        self.event_masks[i] |= 1 << e
+        self.roster_masks[e] |= bit
+        self.block_masks[problem.event_block[e]] |= bit
+        self.peer_masks[e] |= problem.peers[i]
+        if len(self.student_assignments[student]) >= self.event_limits[student]:
+            self.full_mask |= bit
+        if event in self.build_events:
+            self.build_counts[student] += 1
+            if self.build_counts[student] >= self.build_limits[student]:
+                self.build_full_mask |= bit
+        group = self.ranks.event_to_group.get(event)
+        if group:
+            self.student_groups[student][group] += 1
+        if self.rank_arrays is not None:
+            self.rank_arrays.place(i, event, 1)
+        self.total_cost += self.ranks.cost(student, event)
+
+    def unassign(self, student: str, event: str):
+        self._invalidate(student, event, freeing=True)
+        problem = self.problem
+        i = problem.student_index[student]
+        e = problem.event_index[event]
+        bit = 1 << i
+        self.student_assignments[student].remove(event)
+        self.event_slots_remaining[event] += 1
+        self.event_rosters[event].discard(student)
+        self.event_masks[i] &= ~(1 << e)
+        self.roster_masks[e] &= ~bit
+        # a student holds at most one event per block, so the block is free again
+        self.block_masks[problem.event_block[e]] &= ~bit
+        peers = 0
+        for s in self.event_rosters[event]:
+            peers |= problem.peers[problem.student_index[s]]
+        self.peer_masks[e] = peers
+        if len(self.student_assignments[student]) < self.event_limits[student]:
+            self.full_mask &= ~bit
+        if event in self.build_events:
+            self.build_counts[student] -= 1
+            if self.build_counts[student] < self.build_limits[student]:
+                self.build_full_mask &= ~bit
+        group = self.ranks.event_to_group.get(event)
+        if group:
+            self.student_groups[student][group] -= 1
+        if self.rank_arrays is not None:
+            self.rank_arrays.place(i, event, -1)
+        self.total_cost -= self.ranks.cost(student, event)
+
+    def exclude(self, student: str, event: str):
+        self.excluded_masks[self.problem.event_index[event]] |= 1 << self.problem.student_index[student]
+        self._invalidate_event(event)
+
+    def include(self, student: str, event: str):
+        self.excluded_masks[self.problem.event_index[event]] &= ~(1 << self.problem.student_index[student])
+        self._invalidate_event(event)
+
+    def is_excluded(self, student: str, event: str) -> bool:
+        e = self.problem.event_index.get(event)
+        return e is not None and bool(self.excluded_masks[e] >> self.problem.student_index[student] & 1)
+
+    def _invalidate_event(self, event: str):
+        self.dirty.add(event)
+        self.dirty.update(self.pair_map.get(event, ()))
+
+    def _invalidate(self, student: str, event: str, freeing: bool):
+        # Only domains this change can affect: the event itself (slot count, banned peers), events
+        # in the same block, events listing the student (load/group order, limits), and pair partners.
+        affected = {event}
+        affected.update(self.block_events.get(self.event_to_block.get(event), ()))
+        affected.update(self.listed_in[student])
+        if freeing:
+            # dropping below a cap can make the student eligible again for events not currently listing them
+            if len(self.student_assignments[student]) >= self.event_limits[student]:
+                affected.update(self.event_slots_remaining)
+            elif event in self.build_events and self.build_counts[student] >= self.build_limits[student]:
+                affected.update(self.build_events)
+        if self.pair_map:
+            for e in list(affected):
+                affected.update(self.pair_map.get(e, ()))
+        self.dirty |= affected
+
+    def pair_mask(self, e: int, mask: int) -> int:
+        # the students of `mask` who can take event index `e` together with the rest of its pair group:
+        # each other event of the group they hold already or are eligible for, with room for them all
+        problem = self.problem
+        g = problem.pair_group[e]
+        mask &= problem.pair_able[g]
+        for p in problem.pair_groups[g]:
+            if p != e:
+                able = problem.all_students & ~self.unavailable(p) if self.event_slots_remaining[problem.events[p]] else 0
+                mask &= self.roster_masks[p] | able
+        if len(problem.pair_groups[g]) == 1 or not mask:
+            return mask
+        # taking a group at once needs a free event (and build) slot for each of its events not yet held
+        group_events = 0
+        group_builds = 0
+        for p in problem.pair_groups[g]:
+            group_events |= 1 << p
+            if problem.is_build[p]:
+                group_builds |= 1 << p
+        for s in problem.members(mask):
+            i = problem.student_index[s]
+            held = self.event_masks[i]
+            if (len(self.student_assignments[s]) + bin(group_events & ~held).count('1') > self.event_limits[s]
+                    or self.build_counts[s] + bin(group_builds & ~held).count('1') > self.build_limits[s]):
+                mask &= ~(1 << i)
+        return mask
+
+    def blame(self, student: str, event: str) -> List[List[tuple]]:
+        # Alternative explanations of why `student` is not a candidate for `event`, each a list of the
+        # placements (student, event) that rule them out. ('excluded', student, event) stands for a
+        # symmetry-breaking exclusion; an empty list means a static rule does it on its own.
+        if (student, event) in self.banned_student_event:
+            return [[]]
+        assigned = self.student_assignments[student]
+        roster = self.event_rosters[event]
+        reasons = []
+        if student in roster:
+            reasons.append([(student, event)])
+        if self.is_excluded(student, event):
+            reasons.append([('excluded', student, event)])
+        if len(assigned) >= self.event_limits[student]:
+            reasons.append([(student, e) for e in assigned])
+        block = self.event_to_block.get(event)
+        reasons.extend([(student, e)] for e in assigned if self.event_to_block.get(e) == block)
+        reasons.extend([(peer, event)] for peer in self.banned_peers.get(student, ()) if peer in roster)
+        if event in self.build_events and self.build_counts[student] >= self.build_limits[student]:
+            reasons.append([(student, e) for e in assigned if e in self.build_events])
+        if not reasons:
+            # only a pair_together partner keeps them out: blame everything that can touch the partners
+            reason = [(student, e) for e in assigned]
+            for partner in self.pair_map.get(event, ()):
+                reason.extend((s, partner) for s in self.event_rosters.get(partner, ()))
+                if self.is_excluded(student, partner):
+                    reason.append(('excluded', student, partner))
+            reasons.append(reason)
+        return reasons
+
+    def candidate_key(self, student: str, event: str):
+        ranks = self.ranks
+        # group match: prefer students who already have an assigned event in this event's group
+        group = ranks.event_to_group.get(event)
+        group_penalty = 0 if group and self.student_groups[student][group] > 0 else 1
+        # the static (preference rank, performance rank) part, looked up once per event
+        rank_keys = self.rank_keys.get(event)
+        if rank_keys is None:
+            # a pair group is taken whole, so its candidates are ranked over all of its events
+            evs = [event] + self.pair_map.get(event, [])
+            rank_keys = self.rank_keys[event] = {s: (sum(ranks.pref(s, x) for x in evs),
+                                                     sum(ranks.perf(s, x) for x in evs)) for s in self.students}
+        # preference rank, then performance rank, then group match, then current load
+        key = rank_keys[student] + (group_penalty, len(self.student_assignments[student]))
+        if self.weights is not None:
+            key = (sum(w * k for w, k in zip(self.weights, key)),)
+        if self.jitter is not None:
+            key += (self.jitter[student],)
+        return key
+
+    def set_ordering(self, seed: Optional[int] = None, weights: Optional[tuple] = None):
+        # Alternative value orderings for portfolio search: `weights` scores candidates by a weighted
+        # sum of (preference rank, performance rank, group penalty, load) instead of comparing them in
+        # that order, and `seed` breaks the remaining ties (students and MRV events) at random.
+        self.weights = weights
+        if seed is None:
+            self.jitter = None
+        else:
+            rng = random.Random(seed)
+            self.jitter = {name: rng.random() for name in list(self.students) + list(self.event_slots_remaining)}
+        if self.rank_arrays is not None:
+            self.rank_arrays.set_jitter(self.jitter)
+        self.dirty.update(self.event_slots_remaining)
+
+    def candidates(self, event: str) -> List[str]:
+        # eligible students for one seat of `event`, best first; recomputed only when invalidated
+        if event not in self.dirty:
+            return self.domains[event]
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+        for s in self.domains.get(event, ()):
+            self.listed_in[s].discard(event)
+        if self.event_slots_remaining[event] > 0:
+            e = self.problem.event_index[event]
+            mask = self.problem.all_students & ~self.unavailable(e)
+            if self.problem.pair_group[e] is not None:
+                mask = self.pair_mask(e, mask)
+        else:
+            mask = 0
+        if stats is not None:
+            self._count_rejections(event, bin(mask).count('1'))
+            sorted_at = time.perf_counter()
+            stats.timings['eligibility'] += sorted_at - start
+        if self.rank_arrays is not None:
+            cand = self.rank_arrays.order(event, mask, self.weights)
+        else:
+            cand = self.problem.members(mask)
+            cand.sort(key=lambda s: self.candidate_key(s, event))
+        if stats is not None:
+            stats.timings['sorting'] += time.perf_counter() - sorted_at
+            stats.domains += 1
+        for s in cand:
+            self.listed_in[s].add(event)
+        self.domains[event] = cand
+        self.bounds.pop(event, None)
+        self.dirty.discard(event)
+        self.hall_dirty.add(self.event_to_block.get(event))
+        return cand
 
-    # not already assigned
-    if event in student_assignments.get(student, []):
-        return False
+    def _count_rejections(self, event: str, kept: int):
+        # attribute every student missing from the new domain to the first rule that excludes them,
+        # in the order unavailable() lists them; whoever is left was dropped for a pair partner
+        rejections = self.stats.rejections
+        left = len(self.students) - kept
+        if self.event_slots_remaining[event] <= 0:
+            rejections['slot full'] += left
+            return
+        problem = self.problem
+        e = problem.event_index[event]
+        remaining = problem.all_students
+        reasons = [('already placed', self.roster_masks[e]), ('per-student limit', self.full_mask),
+                   ('tried in sibling branch', self.excluded_masks[e]), ('banned event', problem.banned[e]),
+                   ('banned peer', self.peer_masks[e]),
+                   ('block conflict', self.block_masks[problem.event_block[e]])]
+        if problem.is_build[e]:
+            reasons.append(('build cap', self.build_full_mask))
+        for reason, mask in reasons:
+            hit = bin(remaining & mask).count('1')
+            if hit:
+                rejections[reason] += hit
+                left -= hit
+                remaining &= ~mask
+        if left:
+            rejections['pair partner'] += left
+
+    def open_events(self) -> List[str]:
+        return [e for e, left in self.event_slots_remaining.items() if left > 0]
+
+    def seat_bound(self, event: str) -> int:
+        # cheapest possible cost of the event's open seats given its current domain
+        if event in self.dirty or event not in self.bounds:
+            costs = sorted(self.ranks.cost(s, event) for s in self.candidates(event))
+            self.bounds[event] = sum(costs[:self.event_slots_remaining[event]])
+        return self.bounds[event]
+
+    def lower_bound(self) -> int:
+        # admissible bound on the cost of any completion of the current placements
+        return self.total_cost + sum(self.seat_bound(e) for e in self.open_events())
+
+    def propagate(self) -> Optional[tuple]:
+        # Forward checking over the cached domains. Returns None while the remaining seats can still
+        # be covered, otherwise a (reason, subject) tuple describing the first violation found.
+        # paired events end up with identical rosters, so their remaining seats must line up
+        for a, b in self.pairs:
+            roster_a = self.event_rosters.get(a, set())
+            roster_b = self.event_rosters.get(b, set())
+            left_a = self.event_slots_remaining.get(a, 0)
+            left_b = self.event_slots_remaining.get(b, 0)
+            if (len(roster_a) + left_a != len(roster_b) + left_b
+                    or left_a < len(roster_b - roster_a) or left_b < len(roster_a - roster_b)):
+                return ('pair', (a, b))
+
+        open_events = self.open_events()
+        seats_left = 0
+        build_seats_left = 0
+        for e in open_events:
+            need = self.event_slots_remaining[e]
+            # each seat needs a distinct student
+            if len(self.candidates(e)) < need:
+                return ('seats', e)
+            seats_left += need
+            if e in self.build_events:
+                build_seats_left += need
+
+        # Hall check per block: a student sits in at most one event of a block, so the block's open
+        # seats must be coverable by a matching of distinct students
+        for block in self.hall_dirty:
+            evs = [e for e in self.block_events.get(block, ()) if self.event_slots_remaining[e] > 0]
+            if len(evs) > 1 and not self._block_matchable(evs):
+                return ('block', block)
+        self.hall_dirty.clear()
+
+        # total capacity: each student can still fill at most (limit - load) seats, one per block,
+        # and at most (build cap - builds) build seats
+        capacity = 0
+        build_capacity = 0
+        for s in self.students:
+            listed = [e for e in self.listed_in[s] if self.event_slots_remaining[e] > 0]
+            if not listed:
+                continue
+            room = self.event_limits[s] - len(self.student_assignments[s])
+            capacity += min(room, len({self.event_to_block.get(e) for e in listed}))
+            if build_seats_left:
+                build_blocks = {self.event_to_block.get(e) for e in listed if e in self.build_events}
+                build_capacity += min(room, self.build_limits[s] - self.build_counts[s], len(build_blocks))
+        if capacity < seats_left:
+            return ('capacity', None)
+        if build_capacity < build_seats_left:
+            return ('builds', None)
+        return None
 
-    # per-student limit
-    if len(student_assignments.get(student, [])) >= max_per_student:
-        return False
+    def _block_matchable(self, evs: List[str]) -> bool:
+        # augmenting-path matching of distinct students to every open seat of one block's events
+        seats = [e for e in evs for _ in range(self.event_slots_remaining[e])]
+        owner: Dict[str, int] = {}
 
-    # banned student-event pairs (rules structure: rules['banned']['student-event'] = [(student, event), ...])
-    for (s, e) in rules.get('banned', {}).get('student-event', []):
-        if s == student and e == event:
-            return False
-
-    # banned student-student pairs (rules['banned']['student-student'] = [(studentA, studentB), ...])
-    # prevent assigning `student` to `event` if a banned peer is already assigned to that same event
-    banned_pairs = rules.get('banned', {}).get('student-student', [])
-    if banned_pairs:
-        assigned_students_for_event = {s for s, evs in student_assignments.items() if event in evs}
-        for a, b in banned_pairs:
-            if student == a and b in assigned_students_for_event:
-                return False
-            if student == b and a in assigned_students_for_event:
-                return False
-
-    # block conflict
-    block = event_to_block.get(event)
-    for assigned_event in student_assignments.get(student, []):
-        if event_to_block.get(assigned_event) == block:
+        def try_seat(i: int, seen: set) -> bool:
+            for s in self.domains[seats[i]]:
+                if s in seen:
+                    continue
+                seen.add(s)
+                j = owner.get(s)
+                if j is None or try_seat(j, seen):
+                    owner[s] = i
+                    return True
             return False
 
-    current_build_count = sum(1 for ae in student_assignments.get(student, []) if ae in build_events)
-    if event in build_events and current_build_count >= MAX_BUILDS_PER_STUDENT:
-        return False
+        return all(try_seat(i, set()) for i in range(len(seats)))
 
-    return True
-
-def find_assignment(students: List[str], events: List[str], preferences: Dict[str, List[str]],
-                    blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
-                    rules: Dict, performance: Dict[str, List[str]] = None,
-                    max_per_student: int = MAX_EVENTS_PER_STUDENT) -> Optional[Dict[str, List[str]]]:
-    # prepare structures
+def build_solver_state(students: List[str], preferences: Dict[str, List[str]],
+                       blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
+                       rules: Dict, performance: Dict[str, List[str]] = None,
+                       max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                       build_events: List[str], similar_groups: Dict[str, List[str]],
+                       max_builds_per_student: int = MAX_BUILDS_PER_STUDENT) -> Optional[SolverState]:
+    # Solver state with the mandatory placements made and root propagation done; None when the
+    # rules are already unsatisfiable.
     event_to_block = build_event_to_block(blocks)
-    # build a map event -> group name from similar_groups (if defined)
-    event_to_group = {}
-    try:
-        for gname, evs in similar_groups.items():
-            for ev in evs:
-                event_to_group[ev] = gname
-    except NameError:
-        event_to_group = {}
 
-    # create list of slots (event repeated required times)
-    slots = []
-    for e, cnt in event_student_requirements.items():
-        for _ in range(cnt):
-            slots.append(e)
+    # rank tables are built once; candidate ordering then only does dict lookups
+    ranks = RankTables(preferences, performance, similar_groups)
 
-    # heuristic: sort events by fewer candidate students (we will recompute during search)
-
-    student_assignments: Dict[str, List[str]] = {s: [] for s in students}
-    event_slots_remaining = dict(event_student_requirements)
+    state = SolverState(students, event_student_requirements, event_to_block, rules, max_per_student,
+                        build_events, ranks, max_builds_per_student)
 
     # enforce mandatory student-event pairings from rules (if any)
     for (mand_student, mand_event) in rules.get('mandatory', {}).get('student-event', []):
         # student and event must exist
-        if mand_student not in student_assignments:
+        if mand_student not in state.student_assignments:
             return None
-        if mand_event not in event_slots_remaining:
+        if mand_event not in state.event_slots_remaining:
             return None
+        # already placed along with a paired event's mandatory seat
+        if mand_student in state.event_rosters[mand_event]:
+            continue
         # check eligibility under current state (slot availability, block conflicts, per-student limits, cannot rules, build limits)
-        if not eligible(mand_student, mand_event, student_assignments, event_slots_remaining, event_to_block, rules, max_per_student):
+        if not state.eligible(mand_student, mand_event):
             return None
         # perform assignment and consume one slot
-        student_assignments[mand_student].append(mand_event)
-        event_slots_remaining[mand_event] -= 1
-        # remove one occurrence of the event from slots (must exist)
-        try:
-            slots.remove(mand_event)
-        except ValueError:
-            return None
-
-    # helper to compute eligible students for a slot, ordered by preference, event performance, and current load
-    def candidates_for(event: str) -> List[str]:
-        cand = [s for s in students if eligible(s, event, student_assignments, event_slots_remaining, event_to_block, rules, max_per_student)]
-        # sort by preference rank (lower index = higher preference), then by current load
-        def pref_key(s):
-            # preference ranking (lower index = higher preference)
-            prefs = preferences.get(s, [])
-            try:
-                pref_rank = prefs.index(event)
-            except ValueError:
-                pref_rank = 999
+        state.assign(mand_student, mand_event)
+        # the rest of the event's pair group is mandatory too
+        for partner in state.pair_map.get(mand_event, ()):
+            if mand_student in state.event_rosters[partner]:
+                continue
+            if not state.eligible(mand_student, partner):
+                return None
+            state.assign(mand_student, partner)
 
-            # performance ranking for this event: lower index = better performer
-            perf_rank = 999
-            if performance:
-                perf_list = performance.get(event, [])
-                try:
-                    perf_rank = perf_list.index(s)
-                except ValueError:
-                    perf_rank = 999
+    # infeasible before any search (e.g. a block over-subscribed after mandatory placements)
+    if state.propagate() is not None:
+        return None
+    return state
+
+class Assignment(dict):
+    # Dict[str, List[str]] result of a solve, tagged with how the solve ended:
+    #   'optimal'     complete, with the minimum total tryout-rank cost
+    #   'feasible'    complete
+    #   'partial'     the time/node budget ran out first; the best partial assignment seen
+    #   'infeasible'  no complete assignment exists; the best partial assignment seen
+    # Partial assignments are ranked by seats filled, then by lower cost.
+    def __init__(self, assignments: Dict[str, List[str]], status: str, cost: Optional[int] = None):
+        super().__init__((s, list(evs)) for s, evs in assignments.items())
+        self.status = status
+        self.cost = cost
+
+    @property
+    def complete(self) -> bool:
+        return self.status in ('optimal', 'feasible')
+
+# bump whenever a solver change can alter its results, so schedules cached by older code stop matching
+CACHE_VERSION = 2
+
+def _canonical_rules(value, unordered: bool = False):
+    # rules with stripped names and entries sorted; pairs whose order carries no meaning sorted too
+    if isinstance(value, dict):
+        return {k.strip(): _canonical_rules(v, k in ('student-student', 'pair_together')) for k, v in value.items()}
+    entries = [[name.strip() if isinstance(name, str) else name for name in entry] for entry in value]
+    return sorted(sorted(entry) if unordered else entry for entry in entries)
+
+def problem_fingerprint(students: List[str], preferences: Dict[str, List[str]], blocks: Dict[str, List[str]],
+                        event_student_requirements: Dict[str, int], rules: Dict,
+                        performance: Dict[str, List[str]] = None,
+                        max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                        build_events: List[str], similar_groups: Dict[str, List[str]],
+                        max_builds_per_student: int = MAX_BUILDS_PER_STUDENT, solver: str = 'dfs') -> str:
+    # sha256 of a normalized problem: names stripped and every collection whose order carries no
+    # meaning sorted, so reformatted files, reordered rows and stray whitespace give the same key
+    canonical = {
+        'version': CACHE_VERSION,
+        'solver': solver,
+        'limits': [max_per_student, max_builds_per_student],
+        'students': sorted(s.strip() for s in students),
+        'preferences': sorted([s.strip(), [e.strip() for e in evs]] for s, evs in preferences.items()),
+        'performance': sorted([e.strip(), [s.strip() for s in ss]] for e, ss in (performance or {}).items()),
+        # only which events share a block matters to the solver, not what the blocks are called
+        'blocks': sorted(sorted(e.strip() for e in evs) for evs in blocks.values()),
+        'requirements': sorted([e.strip(), n] for e, n in event_student_requirements.items()),
+        'build_events': sorted(e.strip() for e in build_events),
+        'similar_groups': sorted(sorted(e.strip() for e in evs) for evs in similar_groups.values()),
+        'rules': _canonical_rules(rules),
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode('utf-8')).hexdigest()
 
-            # group match: prefer students who already have an assigned event in this event's group
-            group = event_to_group.get(event)
-            if group:
-                has_group = any(event_to_group.get(ae) == group for ae in student_assignments.get(s, []))
-                group_penalty = 0 if has_group else 1
-            else:
-                group_penalty = 1
+class SolutionCache:
+    # Finished solves on disk, one JSON file per problem fingerprint. Reading an entry refreshes its
+    # modification time, and storing past max_entries evicts the least recently used ones.
+    def __init__(self, path: str, max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(path, exist_ok=True)
 
-            # Order: performance first (highest priority), then preference, then group match, then current load
-            return (pref_rank, perf_rank, group_penalty, len(student_assignments.get(s, [])))
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + '.json')
 
-        cand.sort(key=pref_key)
-        return cand
+    def get(self, key: str, students: List[str], events: List[str]) -> Optional[Assignment]:
+        # the cached result in this caller's spelling of the student and event names, or None
+        try:
+            with open(self._file(key), encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(self._file(key))
+        except (OSError, ValueError):
+            return None
+        student_names = {s.strip(): s for s in students}
+        event_names = {e.strip(): e for e in events}
+        assignments = {s: [] for s in students}
+        for s, evs in entry['assignments'].items():
+            assignments[student_names[s]] = [event_names[e] for e in evs]
+        return Assignment(assignments, entry['status'], entry['cost'])
+
+    def put(self, key: str, result: Assignment):
+        entry = {'assignments': {s.strip(): [e.strip() for e in evs] for s, evs in result.items()},
+                 'status': result.status, 'cost': result.cost}
+        # written aside and renamed into place, so concurrent readers never see half a file
+        tmp = f'{self._file(key)}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._file(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                try:
+                    entries.append((os.path.getmtime(os.path.join(self.path, name)), name))
+                except OSError:
+                    pass
+        entries.sort()
+        for _, name in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
 
-    # utility to check pair_together feasibility: if event has a partner and student isn't already assigned to partner,
-    # ensure partner has at least one slot and student eligible for partner as well (ignoring partner-slot-consumption for now)
-    pair_map = defaultdict(list)
-    for a, b in rules.get('pair_together', []):
-        pair_map[a].append(b)
-        pair_map[b].append(a)
-
-    def pair_feasible(student: str, event: str) -> bool:
-        for partner in pair_map.get(event, []):
-            # if already assigned to partner, fine
-            if partner in student_assignments.get(student, []):
-                continue
-            # else check room for partner
-            if event_slots_remaining.get(partner, 0) <= 0:
-                return False
-            # and student must be eligible for partner (except slot count which we'll consume later)
-            # perform a light eligibility check: block and cannot and per-student limit
-            # create a shallow copy of assignments to check block conflict
-            if not eligible(student, partner, student_assignments, event_slots_remaining, event_to_block, rules, max_per_student):
-                return False
-        return True
-
-    # backtracking over slots using MRV heuristic
-    def backtrack(remaining_slots: List[str]) -> bool:
-        if not remaining_slots:
-            return True
+def find_assignment(students: List[str], events: List[str], preferences: Dict[str, List[str]],
+                    blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
+                    rules: Dict, performance: Dict[str, List[str]] = None,
+                    max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                    build_events: List[str], similar_groups: Dict[str, List[str]],
+                    max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+                    solver: str = 'dfs', time_limit: Optional[float] = None,
+                    node_limit: Optional[int] = None,
+                    cache: Optional[SolutionCache] = None,
+                    stats: Optional[SolverStats] = None,
+                    progress: Optional[Callable[[SolverProgress], None]] = None) -> Optional[Assignment]:
+    # solver: 'dfs'   first assignment reached by the heuristic backtracking search
+    #         'flow'  min-cost flow fast path, falling back to 'dfs' for rules it cannot express
+    #         'ilp'   minimum total tryout-rank cost, via an installed CP-SAT/MIP solver when available
+    #         'bnb'   minimum total tryout-rank cost, via the bundled branch-and-bound
+    # Without a budget an infeasible roster returns None. With time_limit (seconds) or node_limit
+    # (search nodes) the solve always returns an Assignment whose status says how it ended.
+    # With a SolutionCache, a finished result for the same normalized problem is returned straight
+    # from disk, and finished results are stored for next time.
+    # max_builds_per_student is the team-wide build cap, as max_per_student is the event cap.
+    # With a SolverStats, search counters, prune reasons and phase timings are recorded into it.
+    # With a progress callback, the search reports a SolverProgress every PROGRESS_INTERVAL seconds and
+    # each better complete schedule as it finds it; a complete result is always the last update.
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}; expected one of {', '.join(SOLVERS)}")
+    budgeted = time_limit is not None or node_limit is not None
+
+    begun = time.monotonic()
+    # the last update the callback saw, so the result is not reported twice
+    last: List[SolverProgress] = []
+    if progress is not None:
+        callback = progress
+
+        def progress(update: SolverProgress):
+            last[:] = [update]
+            callback(update)
+
+    key = None
+    result = None
+    if cache is not None:
+        key = problem_fingerprint(students, preferences, blocks, event_student_requirements, rules, performance,
+                                  max_per_student, build_events=build_events, similar_groups=similar_groups,
+                                  solver=solver, max_builds_per_student=max_builds_per_student)
+        result = cache.get(key, students, list(event_student_requirements))
+    if result is None:
+        start = time.perf_counter() if stats is not None else None
+        state = build_solver_state(students, preferences, blocks, event_student_requirements, rules, performance,
+                                   max_per_student, build_events=build_events, similar_groups=similar_groups,
+                                   max_builds_per_student=max_builds_per_student)
+        if stats is not None:
+            stats.timings['setup'] += time.perf_counter() - start
+        if state is None:
+            result = Assignment({s: [] for s in students}, 'infeasible')
+        else:
+            state.stats = stats
+            state.progress = progress
+            start = time.perf_counter() if stats is not None else None
+            result = SOLVERS[solver](state, time_limit=time_limit, node_limit=node_limit)
+            if stats is not None:
+                stats.timings['search'] += time.perf_counter() - start
+        # only verdicts more time would not change: proofs, and any complete first-found schedule
+        final = result.status in ('optimal', 'infeasible') or (result.complete and solver in ('dfs', 'flow'))
+        if key is not None and final:
+            cache.put(key, result)
+    if progress is not None and result.complete and not (last and last[0].assignment == result):
+        seats = sum(event_student_requirements.values())
+        progress(SolverProgress(time.monotonic() - begun, last[0].nodes if last else 0, seats, seats, result.cost,
+                                result))
+    if result.status == 'infeasible' and not budgeted:
+        return None
+    return result
+
+class _Frame:
+    # one branching point of the explicit-stack search: an event and its ordered candidates
+    __slots__ = ('event', 'candidates', 'next', 'tried', 'student', 'partners', 'level', 'conflicts', 'learnable',
+                 'split')
+
+    def __init__(self, event: str, candidates: List[str], level: int, split: bool = False):
+        self.event = event
+        self.candidates = candidates
+        self.next = 0
+        # a split frame tries only its candidates, then goes on once more with all of them excluded
+        self.split = split
+        self.tried: List[str] = []
+        self.student: Optional[str] = None
+        self.partners: List[str] = []
+        # stack depth, and the shallower levels whose placements are to blame for failures here;
+        # learnable while none of that blame rests on an incumbent's bound
+        self.level = level
+        self.conflicts: set = set()
+        self.learnable = True
+
+_LEAF = 'leaf'
+
+# learned nogoods: at most this many placement levels each, and this many kept per search
+NOGOOD_MAX_LEVELS = 10
+NOGOOD_LIMIT = 20000
+
+def solve_dfs(state: SolverState, optimize: bool = False, time_limit: Optional[float] = None,
+              node_limit: Optional[int] = None, stop: Optional[Callable[[], bool]] = None,
+              bound: Optional[int] = None) -> Assignment:
+    # Depth-first search over the open seats with an explicit stack, so depth is not bounded by the
+    # recursion limit. Stops at the first complete assignment, or with optimize=True runs as a
+    # branch-and-bound on total tryout-rank cost, looking only for assignments cheaper than `bound`
+    # when one is given. With a time/node budget, or when `stop()` turns true, it returns the best
+    # assignment seen so far.
+    #
+    # Dead ends are explained by the stack levels whose placements caused them (conflict-directed
+    # backjumping): the search unwinds straight to the deepest culprit instead of retrying every
+    # level in between, and small culprit sets are kept as nogoods that are never entered again.
+    # Under optimize=True every failure blames the whole stack, which is plain chronological
+    # backtracking, since bound prunes have no placement-level explanation.
+    ranks = state.ranks
+    event_slots_remaining = state.event_slots_remaining
+    # pair groups are super-slots: the search branches on the first event of each group with open seats,
+    # and a placement there fills the whole group (its candidates already fit the whole group)
+    pair_map = state.pair_map
+    compiled = state.problem
+    pair_leader = {compiled.events[e]: compiled.events[group[0]] for group in compiled.pair_groups for e in group}
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    # partial assignments are only worth snapshotting when the search may be cut short
+    track_partial = time_limit is not None or node_limit is not None or stop is not None
+    total_seats = sum(event_slots_remaining.values()) + sum(len(r) for r in state.event_rosters.values())
+    nodes = 0
+    incumbent = None  # (cost, assignment) of the best complete assignment
+    partial = None    # (filled, cost, assignment) of the best partial assignment
+    stack: List[_Frame] = []
+    # (student, event) -> stack level of the search placement; placements made before the search are
+    # fixed and never blamed. A symmetry-breaking exclusion (student, event) is blamed on the
+    # (levels, learnable) conflict that made the student's own try at the event fail.
+    level_of: Dict[tuple, int] = {}
+    exclusion_reasons: Dict[tuple, tuple] = {}
+    # placement -> learned nogoods (sets of placements that cannot all hold in a solution) containing it
+    nogoods: Dict[tuple, List[frozenset]] = defaultdict(list)
+    nogood_count = 0
+    stats = state.stats
+    progress = state.progress
+    started = time.monotonic()
+    next_report = started + PROGRESS_INTERVAL
+
+    def snapshot() -> Dict[str, List[str]]:
+        return {s: list(evs) for s, evs in state.student_assignments.items()}
+
+    def report(schedule: Optional[Assignment] = None):
+        # a progress snapshot, or the news of a better complete schedule
+        nonlocal next_report
+        now = time.monotonic()
+        next_report = now + PROGRESS_INTERVAL
+        best = schedule.cost if schedule is not None else None if incumbent is None else incumbent[0]
+        # a schedule fills every seat, even one the flow completed from a partial state
+        filled = total_seats if schedule is not None else total_seats - sum(event_slots_remaining.values())
+        progress(SolverProgress(now - started, nodes, filled, total_seats, best, schedule))
 
-        # MRV: pick the slot (event) with fewest candidates now
+    # helper to compute eligible students for a slot, ordered by preference, event performance, and current load
+    def candidates_for(event: str) -> List[str]:
+        cands = state.candidates(event)
+        if optimize:
+            # cheapest seats first so good incumbents are found early; ties keep the heuristic order
+            cands = sorted(cands, key=lambda s: ranks.cost(s, event))
+        return cands
+
+    def whole_stack():
+        # conflict blaming every level: always sound, never learned
+        return set(range(len(stack))), False
+
+    def explain(events) -> tuple:
+        # levels whose placements keep the non-candidates out of these events' domains
+        if optimize:
+            return whole_stack()
+        levels = set()
+        learnable = True
+        for ev in events:
+            domain = set(state.candidates(ev))
+            for s in state.students:
+                if s in domain:
+                    continue
+                best = None
+                for reason in state.blame(s, ev):
+                    blamed = set()
+                    reusable = True
+                    for culprit in reason:
+                        if len(culprit) == 3:
+                            # exclusions made outside this search are as fixed as its starting placements
+                            if culprit[1:] in exclusion_reasons:
+                                because, ok = exclusion_reasons[culprit[1:]]
+                                blamed |= because
+                                reusable = reusable and ok
+                        elif culprit in level_of:
+                            blamed.add(level_of[culprit])
+                    # the explanation reaching least deep gives the longest jump
+                    if best is None or max(blamed, default=-1) < max(best[0], default=-1):
+                        best = (blamed, reusable)
+                    if not blamed:
+                        break
+                levels |= best[0]
+                learnable = learnable and best[1]
+        return levels, learnable
+
+    def explain_failure(reason: tuple) -> tuple:
+        kind, subject = reason
+        if kind == 'seats':
+            return explain([subject])
+        if kind == 'block':
+            return explain([e for e in state.block_events.get(subject, ()) if event_slots_remaining[e] > 0])
+        # pair rosters and the global capacity checks depend on every load in play
+        return whole_stack()
+
+    def open_node():
+        # a _Frame to branch on, _LEAF when every seat is filled, or the (levels, learnable) conflict
+        # explaining a dead end
+        nonlocal partial, incumbent
+        if track_partial:
+            filled = total_seats - sum(event_slots_remaining.values())
+            if partial is None or (filled, -state.total_cost) > (partial[0], -partial[1]):
+                partial = (filled, state.total_cost, snapshot())
+
+        # bound: no completion of this branch can beat the incumbent
+        cutoff = bound if incumbent is None else incumbent[0]
+        if optimize and cutoff is not None and state.lower_bound() >= cutoff:
+            if stats is not None:
+                stats.prunes['bound'] += 1
+            return whole_stack()
+
+        # MRV: pick the event with fewest candidates now
         best_event = None
-        best_candidates = None
-        best_idx = 0
         best_key = None
-        for idx, ev in enumerate(remaining_slots):
-            cands = candidates_for(ev)
+        for ev in event_slots_remaining:
+            if event_slots_remaining[ev] <= 0:
+                continue
+            leader = pair_leader.get(ev, ev)
+            if leader != ev and event_slots_remaining[leader] > 0:
+                continue
+            cands = state.candidates(ev)
             # if any event has zero candidates, prune immediately
             if not cands:
-                return False
+                if stats is not None:
+                    stats.prunes['empty domain'] += 1
+                return explain([ev])
             # prioritize events where exactly one student tried out (performance list length == 1)
-            single_tryout = 0 if (performance and len(performance.get(ev, [])) == 1) else 1
+            single_tryout = 0 if ranks.tryout_counts.get(ev, 0) == 1 else 1
             key = (single_tryout, len(cands))
+            if state.jitter is not None:
+                key += (state.jitter[ev],)
             if best_key is None or key < best_key:
                 best_key = key
-                best_candidates = cands
                 best_event = ev
-                best_idx = idx
 
-        event = best_event
-        # try candidates in order
-        for student in best_candidates:
-            if not pair_feasible(student, event):
+        if best_event is None:
+            return _LEAF
+        if optimize:
+            # the min-cost flow over the open seats: a bound on every completion of this branch, and the
+            # cheapest completion itself when it breaks none of the rules the network leaves out
+            outcome, chosen = _flow_assignment(state)
+            if outcome == 'infeasible':
+                if stats is not None:
+                    stats.prunes['flow'] += 1
+                return whole_stack()
+            cost = state.total_cost + sum(ranks.cost(s, e) for s, e in chosen)
+            if cutoff is not None and cost >= cutoff:
+                if stats is not None:
+                    stats.prunes['bound'] += 1
+                return whole_stack()
+            if outcome == 'optimal':
+                schedule = snapshot()
+                for s, e in chosen:
+                    schedule[s].append(e)
+                incumbent = (cost, schedule)
+                if progress is not None:
+                    report(Assignment(schedule, 'feasible', cost))
+                return whole_stack()
+            # split on a placement the relaxation gets wrong: the student takes the event, or never does;
+            # either way the bound tightens on the way down
+            student, ev = _relaxation_conflict(state, chosen)
+            leader = pair_leader.get(ev, ev)
+            ev = leader if event_slots_remaining[leader] > 0 else ev
+            if student in state.candidates(ev):
+                return _Frame(ev, [student], len(stack), split=True)
+        return _Frame(best_event, candidates_for(best_event), len(stack))
+
+    def place(frame: _Frame, student: str):
+        state.assign(student, frame.event)
+        frame.student = student
+        level_of[(student, frame.event)] = frame.level
+        # the rest of the event's pair group comes along
+        for partner in pair_map.get(frame.event, ()):
+            if student in state.event_rosters[partner]:
                 continue
+            state.assign(student, partner)
+            level_of[(student, partner)] = frame.level
+            frame.partners.append(partner)
+
+    def undo(frame: _Frame):
+        for p in reversed(frame.partners):
+            state.unassign(frame.student, p)
+            del level_of[(frame.student, p)]
+        frame.partners = []
+        state.unassign(frame.student, frame.event)
+        del level_of[(frame.student, frame.event)]
+        frame.student = None
+
+    def release(frame: _Frame):
+        for s in frame.tried:
+            state.include(s, frame.event)
+            del exclusion_reasons[(s, frame.event)]
+
+    def placements(frame: _Frame) -> List[tuple]:
+        return [(frame.student, frame.event)] + [(frame.student, p) for p in frame.partners]
+
+    def nogood_hit(frame: _Frame) -> Optional[set]:
+        # levels of a learned nogood the frame's new placements complete, if any
+        for placement in placements(frame):
+            for nogood in nogoods.get(placement, ()):
+                if all(s in state.event_rosters[e] for s, e in nogood):
+                    return {level_of[p] for p in nogood}
+        return None
 
-            # place
-            student_assignments[student].append(event)
-            event_slots_remaining[event] -= 1
-
-            next_slots = remaining_slots[:best_idx] + remaining_slots[best_idx+1:]
-
-            # if event had pair partners that student is not yet assigned to, try to reserve a partner now
-            partners = [p for p in pair_map.get(event, []) if p not in student_assignments[student]]
-            partners_assigned = []
-            can_assign_partners = True
-            for partner in partners:
-                # find a candidate slot for partner in next_slots
-                if partner not in next_slots:
-                    can_assign_partners = False
-                    break
-                # check if student can take partner now
-                if not eligible(student, partner, student_assignments, event_slots_remaining, event_to_block, rules, max_per_student):
-                    can_assign_partners = False
+    def learn(levels: set):
+        nonlocal nogood_count
+        if nogood_count >= NOGOOD_LIMIT or len(levels) > NOGOOD_MAX_LEVELS:
+            return
+        nogood = frozenset(p for level in levels for p in placements(stack[level]))
+        for placement in nogood:
+            nogoods[placement].append(nogood)
+        nogood_count += 1
+
+    def out_of_budget() -> bool:
+        if node_limit is not None and nodes >= node_limit:
+            return True
+        if stop is not None and stop():
+            return True
+        return deadline is not None and time.monotonic() >= deadline
+
+    def descend():
+        # forward checking prunes the node before it opens when the rest cannot be covered
+        if stats is None:
+            reason = state.propagate()
+        else:
+            start = time.perf_counter()
+            reason = state.propagate()
+            stats.timings['propagation'] += time.perf_counter() - start
+            if reason is not None:
+                stats.prunes[reason[0]] += 1
+        if reason is not None:
+            return explain_failure(reason)
+        return open_node()
+
+    found = False
+    stopped = False
+    node = open_node()
+    while True:
+        conflict = None
+        if node is _LEAF:
+            if not optimize:
+                found = True
+                break
+            # record the incumbent and keep searching for a cheaper one
+            incumbent = (state.total_cost, snapshot())
+            if progress is not None:
+                report(Assignment(incumbent[1], 'feasible', incumbent[0]))
+            conflict = whole_stack()
+        elif isinstance(node, _Frame):
+            stack.append(node)
+            if stats is not None:
+                stats.max_depth = max(stats.max_depth, len(stack))
+        else:
+            conflict = node
+
+        # unwind to the deepest level the conflict blames and advance it to its next candidate
+        node = None
+        while stack and node is None:
+            if out_of_budget():
+                stopped = True
+                break
+            frame = stack[-1]
+            event = frame.event
+            if conflict is not None:
+                levels, learnable = conflict
+                conflict = None
+                if frame.level not in levels:
+                    # this level's choice played no part, so none of its other candidates can help
+                    if frame.student is not None:
+                        undo(frame)
+                    release(frame)
+                    stack.pop()
+                    if stats is not None:
+                        stats.backjumps += 1
+                    conflict = (levels, learnable)
+                    continue
+                levels = levels - {frame.level}
+                frame.conflicts |= levels
+                frame.learnable = frame.learnable and learnable
+            if frame.student is not None:
+                # Seats of an event are interchangeable, so its team is built as a set: once a student has
+                # been tried here and failed, later siblings exclude them from this event. Every team is
+                # then reached exactly once, through its first member in candidate order.
+                tried = frame.student
+                undo(frame)
+                state.exclude(tried, event)
+                exclusion_reasons[(tried, event)] = (levels, learnable)
+                frame.tried.append(tried)
+            if frame.split and frame.next >= len(frame.candidates):
+                # the other side of the split: none of the tried students takes the event
+                frame.split = False
+                nodes += 1
+                node = descend()
+                if not isinstance(node, _Frame) and node is not _LEAF:
+                    conflict = node
+                    node = None
+                continue
+            # out of candidates, or too few untried ones left to fill the event's open seats
+            if (frame.next >= len(frame.candidates)
+                    or len(frame.candidates) - len(frame.tried) < event_slots_remaining[event] and not frame.split):
+                release(frame)
+                stack.pop()
+                if stats is not None:
+                    stats.backtracks += 1
+                # the students ruled out of the event before any candidate was tried count against all of
+                # them; only explained now that the frame failed, when the state is back to how it opened
+                levels, learnable = explain([event])
+                frame.conflicts |= levels
+                frame.learnable = frame.learnable and learnable
+                # the placements at the blamed levels can never all stand together
+                if frame.learnable and frame.conflicts:
+                    learn(frame.conflicts)
+                conflict = (frame.conflicts, frame.learnable)
+                continue
+            student = frame.candidates[frame.next]
+            frame.next += 1
+            # every placement tried counts against node_limit, including ones pruned straight away
+            nodes += 1
+            if progress is not None and time.monotonic() >= next_report:
+                report()
+            place(frame, student)
+            if nogoods:
+                hit = nogood_hit(frame)
+                if hit is not None:
+                    if stats is not None:
+                        stats.prunes['nogood'] += 1
+                    conflict = (hit, True)
+                    continue
+            node = descend()
+            if not isinstance(node, _Frame) and node is not _LEAF:
+                conflict = node
+                node = None
+        if node is None:
+            break
+
+    if stats is not None:
+        stats.nodes += nodes
+        stats.nogoods += nogood_count
+    if found:
+        # the state keeps the solution; only the symmetry-breaking exclusions are lifted
+        for frame in stack:
+            release(frame)
+        result = Assignment(state.student_assignments, 'feasible', state.total_cost)
+        if progress is not None:
+            report(result)
+        return result
+
+    # put the state back to where the search started
+    for frame in reversed(stack):
+        if frame.student is not None:
+            undo(frame)
+        release(frame)
+    if incumbent is not None:
+        return Assignment(incumbent[1], 'feasible' if stopped else 'optimal', incumbent[0])
+    if partial is not None:
+        return Assignment(partial[2], 'partial' if stopped else 'infeasible', partial[1])
+    return Assignment(snapshot(), 'infeasible', state.total_cost)
+
+def solve_bnb(state: SolverState, time_limit: Optional[float] = None,
+              node_limit: Optional[int] = None, stop: Optional[Callable[[], bool]] = None) -> Assignment:
+    return solve_dfs(state, optimize=True, time_limit=time_limit, node_limit=node_limit, stop=stop)
+
+def _ilp_model(state: SolverState):
+    # 0/1 model of the remaining seats: one variable per (student, event) the student can still take,
+    # linear constraints as (terms, sense, rhs) with terms [(variable index, coefficient), ...].
+    # Returns None when some pair_together rule can already not be met.
+    pairs = []
+    index = {}
+    for e in state.open_events():
+        for s in state.candidates(e):
+            index[(s, e)] = len(pairs)
+            pairs.append((s, e))
+    costs = [state.ranks.cost(s, e) for s, e in pairs]
+
+    by_event = defaultdict(list)
+    by_student = defaultdict(list)
+    for i, (s, e) in enumerate(pairs):
+        by_event[e].append(i)
+        by_student[s].append(i)
+
+    constraints = []
+    # every open seat is filled
+    for e in state.open_events():
+        constraints.append(([(i, 1) for i in by_event[e]], '==', state.event_slots_remaining[e]))
+    for s, idxs in by_student.items():
+        # per-student limit
+        constraints.append(([(i, 1) for i in idxs], '<=', state.event_limits[s] - len(state.student_assignments[s])))
+        # block conflict: at most one event per block (occupied blocks are already out of the domains)
+        by_block = defaultdict(list)
+        for i in idxs:
+            by_block[state.event_to_block.get(pairs[i][1])].append(i)
+        for block_idxs in by_block.values():
+            if len(block_idxs) > 1:
+                constraints.append(([(i, 1) for i in block_idxs], '<=', 1))
+        # build cap
+        build_idxs = [i for i in idxs if pairs[i][1] in state.build_events]
+        room = state.build_limits[s] - state.build_counts[s]
+        if len(build_idxs) > room:
+            constraints.append(([(i, 1) for i in build_idxs], '<=', room))
+    # banned student-student pairs never share an event
+    for a, peers in state.banned_peers.items():
+        for b in peers:
+            if a < b:
+                for e in by_event:
+                    if (a, e) in index and (b, e) in index:
+                        constraints.append(([(index[(a, e)], 1), (index[(b, e)], 1)], '<=', 1))
+    # pair_together events get identical rosters
+    for a, b in state.pairs:
+        roster_a = state.event_rosters.get(a, set())
+        roster_b = state.event_rosters.get(b, set())
+        for s in state.students:
+            terms = []
+            rhs = 0
+            if s in roster_a:
+                rhs -= 1
+            elif (s, a) in index:
+                terms.append((index[(s, a)], 1))
+            if s in roster_b:
+                rhs += 1
+            elif (s, b) in index:
+                terms.append((index[(s, b)], -1))
+            if terms:
+                constraints.append((terms, '==', rhs))
+            elif rhs != 0:
+                return None
+    return pairs, costs, constraints
+
+def _solve_cp_sat(cp_model, model, time_limit: Optional[float] = None):
+    # (status, placements) with status 'optimal', 'feasible', 'infeasible' or 'partial' (nothing found in time)
+    pairs, costs, constraints = model
+    m = cp_model.CpModel()
+    x = [m.NewBoolVar(f'x{i}') for i in range(len(pairs))]
+    for terms, sense, rhs in constraints:
+        expr = sum(c * x[i] for i, c in terms)
+        m.Add(expr == rhs if sense == '==' else expr <= rhs)
+    m.Minimize(sum(c * x[i] for i, c in enumerate(costs)))
+    cp_solver = cp_model.CpSolver()
+    if time_limit is not None:
+        cp_solver.parameters.max_time_in_seconds = time_limit
+    status = cp_solver.Solve(m)
+    if status == cp_model.INFEASIBLE:
+        return 'infeasible', None
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return 'partial', None
+    chosen = [pairs[i] for i in range(len(pairs)) if cp_solver.Value(x[i])]
+    return ('optimal' if status == cp_model.OPTIMAL else 'feasible'), chosen
+
+def _solve_pulp(pulp, model, time_limit: Optional[float] = None):
+    # (status, placements) with status 'optimal', 'feasible', 'infeasible' or 'partial' (nothing found in time)
+    pairs, costs, constraints = model
+    prob = pulp.LpProblem('roster', pulp.LpMinimize)
+    x = [pulp.LpVariable(f'x{i}', cat='Binary') for i in range(len(pairs))]
+    prob += pulp.lpSum(c * x[i] for i, c in enumerate(costs))
+    for terms, sense, rhs in constraints:
+        expr = pulp.lpSum(c * x[i] for i, c in terms)
+        prob += (expr == rhs) if sense == '==' else (expr <= rhs)
+    prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+    outcome = pulp.LpStatus[prob.status]
+    if outcome == 'Infeasible':
+        return 'infeasible', None
+    if prob.sol_status == pulp.LpSolutionIntegerFeasible:
+        return 'feasible', [pairs[i] for i in range(len(pairs)) if x[i].value() > 0.5]
+    if outcome != 'Optimal':
+        return 'partial', None
+    return 'optimal', [pairs[i] for i in range(len(pairs)) if x[i].value() > 0.5]
+
+class MinCostFlow:
+    # Min-cost flow by successive shortest paths (Dijkstra on reduced costs). Edge costs must be
+    # non-negative; edges are stored in pairs so `eid ^ 1` is the reverse edge.
+    def __init__(self, n: int):
+        self.n = n
+        self.graph: List[List[int]] = [[] for _ in range(n)]
+        self.to: List[int] = []
+        self.cap: List[int] = []
+        self.cost: List[int] = []
+
+    def add_node(self) -> int:
+        self.graph.append([])
+        self.n += 1
+        return self.n - 1
+
+    def add_edge(self, u: int, v: int, cap: int, cost: int) -> int:
+        eid = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.graph[u].append(eid)
+        self.graph[v].append(eid + 1)
+        return eid
+
+    def flow(self, eid: int) -> int:
+        return self.cap[eid ^ 1]
+
+    def solve(self, source: int, sink: int, limit: int):
+        # pushes up to `limit` units; returns (flow, cost) of a min-cost flow of that value
+        n = self.n
+        inf = float('inf')
+        potential = [0] * n
+        flow = cost = 0
+        while flow < limit:
+            dist = [inf] * n
+            prev = [-1] * n
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                if u == sink:
+                    # nodes not yet settled are at least this far; capping them there keeps costs reduced
                     break
-                # assign partner tentatively: consume one occurrence from next_slots and from slots remaining
-                # remove first occurrence
-                next_slots.remove(partner)
-                student_assignments[student].append(partner)
-                event_slots_remaining[partner] -= 1
-                partners_assigned.append(partner)
-
-            if can_assign_partners and backtrack(next_slots):
-                return True
-
-            # undo partner assignments
-            for p in partners_assigned:
-                student_assignments[student].remove(p)
-                event_slots_remaining[p] += 1
-            # undo placement
-            student_assignments[student].remove(event)
-            event_slots_remaining[event] += 1
+                for eid in self.graph[u]:
+                    if self.cap[eid] > 0:
+                        v = self.to[eid]
+                        nd = d + self.cost[eid] + potential[u] - potential[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            prev[v] = eid
+                            heapq.heappush(heap, (nd, v))
+            if dist[sink] == inf:
+                break
+            reach = dist[sink]
+            for v in range(n):
+                potential[v] += min(dist[v], reach)
+            push = limit - flow
+            v = sink
+            while v != source:
+                eid = prev[v]
+                push = min(push, self.cap[eid])
+                v = self.to[eid ^ 1]
+            v = sink
+            while v != source:
+                eid = prev[v]
+                self.cap[eid] -= push
+                self.cap[eid ^ 1] += push
+                v = self.to[eid ^ 1]
+            flow += push
+            cost += push * (potential[sink] - potential[source])
+        return flow, cost
+
+def _flow_assignment(state: SolverState):
+    # Transportation relaxation of the remaining seats as a min-cost flow:
+    #   source -> student (room left) -> (student, block) (1) -> event (1, rank cost) -> sink (open seats)
+    # Build-only blocks hang off a per-student build node capped at the builds the student has left.
+    # Returns ('infeasible', None) when even the relaxation cannot fill every seat, ('optimal', placements)
+    # when its min-cost answer also satisfies what the network leaves out (bans, pairs, builds in mixed
+    # blocks), and ('relaxed', placements) otherwise; the relaxed placements cost no more than any
+    # completion of the state, so they bound the branch-and-bound.
+    open_events = state.open_events()
+    seats = sum(state.event_slots_remaining[e] for e in open_events)
+    net = MinCostFlow(2)
+    source, sink = 0, 1
+    event_node = {}
+    by_student = defaultdict(list)
+    for e in open_events:
+        event_node[e] = net.add_node()
+        net.add_edge(event_node[e], sink, state.event_slots_remaining[e], 0)
+        for s in state.candidates(e):
+            by_student[s].append(e)
+
+    seat_edges = []
+    for s, evs in by_student.items():
+        student_node = net.add_node()
+        net.add_edge(source, student_node, state.event_limits[s] - len(state.student_assignments[s]), 0)
+        by_block = defaultdict(list)
+        for e in evs:
+            by_block[state.event_to_block.get(e)].append(e)
+        build_only = [b for b, bevs in by_block.items() if all(e in state.build_events for e in bevs)]
+        build_room = state.build_limits[s] - state.build_counts[s]
+        build_node = student_node
+        if len(build_only) > build_room:
+            build_node = net.add_node()
+            net.add_edge(student_node, build_node, build_room, 0)
+        build_only = set(build_only)
+        for block, bevs in by_block.items():
+            parent = build_node if block in build_only else student_node
+            if len(bevs) > 1:
+                block_node = net.add_node()
+                net.add_edge(parent, block_node, 1, 0)
+                parent = block_node
+            for e in bevs:
+                eid = net.add_edge(parent, event_node[e], 1, state.ranks.cost(s, e))
+                seat_edges.append((eid, s, e))
+
+    flow, _ = net.solve(source, sink, seats)
+    if flow < seats:
+        return 'infeasible', None
+    chosen = [(s, e) for eid, s, e in seat_edges if net.flow(eid)]
+
+    return ('relaxed' if _relaxation_conflict(state, chosen) else 'optimal'), chosen
+
+def _relaxation_conflict(state: SolverState, chosen: List[tuple]) -> Optional[tuple]:
+    # A relaxed placement (student, event) that breaks a rule the flow network does not model (build
+    # caps, bans, pairs), or None when the placements complete the state as they are.
+    placed = set(chosen)
+    builds = defaultdict(int)
+    rosters = {e: set(r) for e, r in state.event_rosters.items()}
+    for s, e in chosen:
+        rosters[e].add(s)
+        if e in state.build_events:
+            builds[s] += 1
+    for s, e in chosen:
+        if e in state.build_events and state.build_counts[s] + builds[s] > state.build_limits[s]:
+            return s, e
+    for s, e in chosen:
+        if not state.banned_peers.get(s, set()).isdisjoint(rosters[e]):
+            return s, e
+    for a, b in state.pairs:
+        apart = sorted(rosters.get(a, set()) ^ rosters.get(b, set()))
+        if apart:
+            s = apart[0]
+            return s, (a if (s, a) in placed else b)
+    return None
+
+def solve_flow(state: SolverState, time_limit: Optional[float] = None,
+               node_limit: Optional[int] = None) -> Assignment:
+    # Polynomial-time fast path for rosters the flow network captures (no pair rules or student-student
+    # bans in practice); anything it cannot express goes to the backtracking search.
+    outcome, chosen = _flow_assignment(state)
+    if outcome == 'infeasible':
+        return Assignment(state.student_assignments, 'infeasible', state.total_cost)
+    if outcome == 'relaxed':
+        return solve_dfs(state, time_limit=time_limit, node_limit=node_limit)
+    for s, e in chosen:
+        state.assign(s, e)
+    return Assignment(state.student_assignments, 'optimal', state.total_cost)
+
+def exact_placements(state: SolverState, time_limit: Optional[float] = None, node_limit: Optional[int] = None):
+    # Cheapest (student, event) placements completing the current state, as (status, placements).
+    # Tries the min-cost flow fast path, then OR-Tools CP-SAT or PuLP/CBC when one is installed, then
+    # the bundled branch-and-bound. Placements are None unless the status is 'optimal' or 'feasible'
+    # (the budget ran out with an incumbent). The state is left as it was.
+    outcome, chosen = _flow_assignment(state)
+    if outcome == 'infeasible':
+        return 'infeasible', None
+    if outcome == 'optimal':
+        return 'optimal', chosen
 
-        return False
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError:
+        cp_model = None
+    pulp = None
+    if cp_model is None:
+        try:
+            import pulp
+        except ImportError:
+            best = solve_bnb(state, time_limit=time_limit, node_limit=node_limit)
+            if not best.complete:
+                return best.status, None
+            return best.status, [(s, e) for s, evs in best.items() for e in evs if s not in state.event_rosters[e]]
+
+    model = _ilp_model(state)
+    if model is None:
+        return 'infeasible', None
+    if cp_model is not None:
+        return _solve_cp_sat(cp_model, model, time_limit)
+    return _solve_pulp(pulp, model, time_limit)
+
+def solve_ilp(state: SolverState, time_limit: Optional[float] = None,
+              node_limit: Optional[int] = None) -> Assignment:
+    # Exact minimum-cost assignment (see exact_placements for the engines it uses). The node budget
+    # only applies to the bundled branch-and-bound.
+    status, chosen = exact_placements(state, time_limit, node_limit)
+    if chosen is None:
+        return Assignment(state.student_assignments, status, state.total_cost)
+    for s, e in chosen:
+        state.assign(s, e)
+    return Assignment(state.student_assignments, status, state.total_cost)
+
+SOLVERS = {
+    'dfs': solve_dfs,
+    'ilp': solve_ilp,
+    'bnb': solve_bnb,
+    'flow': solve_flow,
+}
+
+def enumerate_assignments(students: List[str], events: List[str], preferences: Dict[str, List[str]],
+                           blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
+                           rules: Dict, performance: Dict[str, List[str]] = None,
+                           max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                           build_events: List[str], similar_groups: Dict[str, List[str]],
+                           max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+                           k: int = 20) -> Iterator[Dict[str, List[str]]]:
+    # Yields up to k distinct complete assignments, cheapest total tryout-rank cost first.
+    # Ranked enumeration by partitioning (Lawler/Murty): after yielding a schedule with placements
+    # p1..pm, the rest of its subspace splits into "p1..p(i-1) kept, pi dropped" for each i, and each
+    # part's cheapest completion is solved lazily on the shared SolverState, only when it could be next.
+    state = build_solver_state(students, preferences, blocks, event_student_requirements, rules, performance,
+                               max_per_student, build_events=build_events, similar_groups=similar_groups,
+                               max_builds_per_student=max_builds_per_student)
+    if state is None:
+        return
+    order = {e: i for i, e in enumerate(event_student_requirements)}
+
+    def solve_part(kept: List[tuple], dropped: List[tuple]):
+        # cheapest completion with `kept` placed and `dropped` excluded, as (cost, placements)
+        placed = []
+        result = None
+        for s, e in dropped:
+            state.exclude(s, e)
+        for s, e in kept:
+            if not state.eligible(s, e):
+                break
+            state.assign(s, e)
+            placed.append((s, e))
+        else:
+            if state.propagate() is None:
+                status, chosen = exact_placements(state)
+                if status == 'optimal':
+                    chosen.sort(key=lambda p: (order[p[1]], p[0]))
+                    cost = state.total_cost + sum(state.ranks.cost(s, e) for s, e in chosen)
+                    result = (cost, kept + chosen)
+        for s, e in reversed(placed):
+            state.unassign(s, e)
+        for s, e in dropped:
+            state.include(s, e)
+        return result
+
+    first = solve_part([], [])
+    if first is None:
+        return
+    tie = itertools.count()
+    # (cost or lower bound, tiebreak, solved?, placements or kept prefix, kept count, dropped)
+    heap = [(first[0], next(tie), True, first[1], 0, [])]
+    seen = set()
+    while heap and len(seen) < k:
+        cost, _, solved, placements, kept_count, dropped = heapq.heappop(heap)
+        if not solved:
+            part = solve_part(placements, dropped)
+            if part is not None:
+                heapq.heappush(heap, (part[0], next(tie), True, part[1], kept_count, dropped))
+            continue
+
+        # seat order never matters: a schedule is its set of (student, event) placements
+        key = frozenset(placements)
+        if key in seen:
+            continue
+        seen.add(key)
+        assignment = {s: list(evs) for s, evs in state.student_assignments.items()}
+        for s, e in placements:
+            assignment[s].append(e)
+        yield assignment
+
+        # children inherit this schedule's cost as their lower bound until solved
+        for i in range(kept_count, len(placements)):
+            heapq.heappush(heap, (cost, next(tie), False, placements[:i], i, dropped + [placements[i]]))
+
+def _merge_rules(rules: Dict, extra: Dict, removed: set) -> Dict:
+    # rules of the same shape merged entry by entry, dropping entries that name a removed student
+    merged = {}
+    for key in list(rules) + [k for k in extra if k not in rules]:
+        a, b = rules.get(key), extra.get(key)
+        if isinstance(a, dict) or isinstance(b, dict):
+            merged[key] = _merge_rules(a or {}, b or {}, removed)
+        else:
+            merged[key] = [entry for entry in list(a or []) + list(b or []) if removed.isdisjoint(entry)]
+    return merged
+
+def apply_delta(problem: Dict, delta: Dict) -> Dict:
+    # The build_solver_state keyword arguments in `problem` with a roster change applied. `delta` may hold:
+    #   'remove_students'            students who dropped out
+    #   'add_students'               new students (give their preferences under 'preferences')
+    #   'preferences'                student -> preference list, replacing the old one
+    #   'performance'                event -> performance list, replacing the old one
+    #   'event_student_requirements' event -> seat count, replacing the old one (0 drops the event)
+    #   'rules'                      extra rules in the `rules` shape, merged into the existing ones
+    removed = set(delta.get('remove_students', ()))
+    students = [s for s in problem['students'] if s not in removed]
+    students += [s for s in delta.get('add_students', ()) if s not in students]
+    preferences = {s: evs for s, evs in problem['preferences'].items() if s not in removed}
+    preferences.update(delta.get('preferences', {}))
+    performance = problem.get('performance')
+    if performance is not None or 'performance' in delta:
+        performance = {e: [s for s in ss if s not in removed] for e, ss in (performance or {}).items()}
+        performance.update(delta.get('performance', {}))
+    requirements = dict(problem['event_student_requirements'])
+    requirements.update(delta.get('event_student_requirements', {}))
+    rules = _merge_rules(problem['rules'], delta.get('rules', {}), removed)
+    return dict(problem, students=students, preferences=preferences, performance=performance,
+                event_student_requirements=requirements, rules=rules)
+
+def _rule_names(rules: Dict) -> Iterator[str]:
+    for value in rules.values():
+        if isinstance(value, dict):
+            yield from _rule_names(value)
+        else:
+            for entry in value:
+                yield from entry
+
+# search nodes a repair may spend before its neighbourhood is widened
+REPAIR_NODE_LIMIT = 20000
+
+def resolve(previous_assignment: Dict[str, List[str]], delta: Dict, students: List[str], events: List[str],
+            preferences: Dict[str, List[str]], blocks: Dict[str, List[str]],
+            event_student_requirements: Dict[str, int], rules: Dict, performance: Dict[str, List[str]] = None,
+            max_per_student: int = MAX_EVENTS_PER_STUDENT, *, build_events: List[str],
+            similar_groups: Dict[str, List[str]], max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+            time_limit: Optional[float] = None) -> Optional[Assignment]:
+    # Repairs `previous_assignment`, solved for the roster given by the other arguments, after the
+    # change `delta` (see apply_delta) instead of solving again from scratch. Placements the change
+    # leaves valid stay fixed and only the freed seats are searched; each time a repair fails, the
+    # placements around the change (its students' and events' seats, then their neighbours and
+    # block-mates) are freed too, down to nothing kept at all. Returns like find_assignment does for
+    # the changed roster.
+    problem = apply_delta(dict(students=students, preferences=preferences, blocks=blocks,
+                               event_student_requirements=event_student_requirements, rules=rules,
+                               performance=performance, max_per_student=max_per_student,
+                               max_builds_per_student=max_builds_per_student, build_events=build_events,
+                               similar_groups=similar_groups), delta)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    event_to_block = build_event_to_block(blocks)
 
-    ok = backtrack(slots)
-    if ok:
-        return student_assignments
+    placements = [(s, e) for s, evs in previous_assignment.items() for e in evs]
+    # what the change touches directly
+    near_students = set(delta.get('remove_students', ())) | set(delta.get('add_students', ()))
+    near_students |= set(delta.get('preferences', {}))
+    near_events = set(delta.get('event_student_requirements', {})) | set(delta.get('performance', {}))
+    for name in _rule_names(delta.get('rules', {})):
+        (near_events if name in problem['event_student_requirements'] else near_students).add(name)
+
+    radius = 0
+    result = None
+    while True:
+        # radius 0 keeps every placement still valid; wider radii free everything near the change
+        if radius == 0:
+            kept = placements
+        else:
+            kept = [(s, e) for s, e in placements if s not in near_students and e not in near_events]
+        state = build_solver_state(**problem)
+        if state is None:
+            break
+        for s, e in kept:
+            if s in state.event_rosters.get(e, ()):
+                continue
+            if s in state.student_assignments and state.eligible(s, e):
+                state.assign(s, e)
+
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if state.propagate() is None:
+            result = solve_dfs(state, time_limit=remaining, node_limit=REPAIR_NODE_LIMIT if kept else None)
+            if result.complete:
+                return result
+        if not kept or (remaining is not None and remaining <= 0):
+            break
+
+        if radius > 0:
+            # the conflict neighbourhood: whoever shares an event with the freed seats, their events,
+            # and the events competing for the same block
+            grown_students = near_students | {s for s, e in placements if e in near_events}
+            grown_events = near_events | {e for s, e in placements if s in grown_students}
+            grown_events |= {x for e in grown_events for x in blocks.get(event_to_block.get(e), ())}
+            if grown_students == near_students and grown_events == near_events:
+                placements = []
+            near_students, near_events = grown_students, grown_events
+        radius += 1
+
+    if time_limit is None:
+        return None
+    if result is None:
+        return Assignment({s: [] for s in problem['students']}, 'infeasible')
+    return result
+
+# search nodes one neighbourhood repair of improve_assignment may spend
+LNS_NODE_LIMIT = 100
+# non-improving neighbourhoods in a row after which improve_assignment frees one more unit at once
+LNS_PATIENCE = 50
+LNS_MAX_UNITS = 4
+# students who tried out for a unit's event but do not hold it, whose events are freed along with it
+LNS_RIVALS = 1
+
+def improve_assignment(assignment: Dict[str, List[str]], students: List[str], events: List[str],
+                       preferences: Dict[str, List[str]], blocks: Dict[str, List[str]],
+                       event_student_requirements: Dict[str, int], rules: Dict,
+                       performance: Dict[str, List[str]] = None,
+                       max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                       build_events: List[str], similar_groups: Dict[str, List[str]],
+                       max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+                       time_limit: float = 10.0, seed: int = 0,
+                       iterations: Optional[int] = None,
+                       progress: Optional[Callable[[SolverProgress], None]] = None) -> Assignment:
+    # Large neighbourhood search on total tryout-rank cost, starting from a complete `assignment` of
+    # this roster (e.g. find_assignment's). Each step frees the seats of a neighbourhood (the events
+    # of one block, one event's team, or one student's events; more of them at once after
+    # LNS_PATIENCE fruitless steps), refills them by branch and bound under the usual eligibility
+    # rules, and keeps the refill only if it lowers the total. Mandatory placements stay put.
+    # Runs for time_limit seconds or `iterations` steps, whichever ends first; the same seed draws the
+    # same neighbourhoods, so with `iterations` alone a run is reproducible. Returns the best schedule
+    # as a 'feasible' Assignment with its cost. A progress callback gets a SolverProgress every
+    # PROGRESS_INTERVAL seconds and each cheaper schedule as it is kept.
+    state = build_solver_state(students, preferences, blocks, event_student_requirements, rules, performance,
+                               max_per_student, build_events=build_events, similar_groups=similar_groups,
+                               max_builds_per_student=max_builds_per_student)
+    if state is None:
+        raise ValueError("the roster has no schedule to improve")
+    fixed = {(s, e) for s, evs in state.student_assignments.items() for e in evs}
+    for s, evs in assignment.items():
+        for e in evs:
+            if s in state.event_rosters.get(e, ()):
+                continue
+            if s not in state.student_assignments or not state.eligible(s, e):
+                raise ValueError(f"{s} in {e} breaks the roster's rules")
+            state.assign(s, e)
+    if state.open_events():
+        raise ValueError("the schedule to improve leaves seats empty")
+
+    rng = random.Random(seed)
+    ranks = state.ranks
+    started = time.monotonic()
+    deadline = started + time_limit
+    next_report = started + PROGRESS_INTERVAL
+    if progress is not None:
+        # counts the repair searches' nodes for the reports
+        state.stats = SolverStats()
+    seats = sum(event_student_requirements.values())
+    units = 1
+    stale = 0
+    step = 0
+    while time.monotonic() < deadline and (iterations is None or step < iterations):
+        step += 1
+        # the neighbourhood: events whose seats are freed, pair partners included. Each unit is centred
+        # on a placement, half the time one drawn by its cost so that expensive seats get reworked (by
+        # cost + 1, as a schedule of top picks costs nothing at all), and also frees the events of
+        # students who tried out for its event but do not hold it
+        placements = [(s, e) for s, evs in state.student_assignments.items() for e in evs if (s, e) not in fixed]
+        if not placements:
+            break
+        freed = set()
+        for _ in range(units):
+            if rng.random() < 0.5:
+                s, e = rng.choices(placements, weights=[ranks.cost(*p) + 1 for p in placements])[0]
+            else:
+                s, e = rng.choice(placements)
+            kind = rng.choice(('block', 'event', 'student'))
+            if kind == 'block':
+                freed.update(state.block_events.get(state.event_to_block.get(e), (e,)))
+            elif kind == 'event':
+                freed.add(e)
+            else:
+                freed.update(state.student_assignments[s])
+            rivals = [t for t in ranks.perf_rank.get(e, ()) if t in state.student_assignments
+                      and t not in state.event_rosters[e]]
+            for t in rivals[:LNS_RIVALS]:
+                freed.update(state.student_assignments[t])
+        for e in list(freed):
+            freed.update(state.pair_map.get(e, ()))
+        destroyed = [(s, e) for e in freed for s in list(state.event_rosters.get(e, ())) if (s, e) not in fixed]
+        if not destroyed:
+            continue
+
+        cost = state.total_cost
+        for s, e in destroyed:
+            state.unassign(s, e)
+        remaining = max(0.0, deadline - time.monotonic())
+        repair = None
+        if state.propagate() is None:
+            repair = solve_dfs(state, optimize=True, bound=cost, time_limit=remaining, node_limit=LNS_NODE_LIMIT)
+        if repair is not None and repair.complete and repair.cost < cost:
+            for s, evs in repair.items():
+                for e in evs:
+                    if s not in state.event_rosters[e]:
+                        state.assign(s, e)
+            units = 1
+            stale = 0
+            if progress is not None:
+                next_report = time.monotonic() + PROGRESS_INTERVAL
+                progress(SolverProgress(time.monotonic() - started, state.stats.nodes, seats, seats, state.total_cost,
+                                        Assignment(state.student_assignments, 'feasible', state.total_cost)))
+        else:
+            for s, e in destroyed:
+                state.assign(s, e)
+            stale += 1
+            if stale >= LNS_PATIENCE:
+                units = min(units + 1, LNS_MAX_UNITS)
+                stale = 0
+        if progress is not None and time.monotonic() >= next_report:
+            next_report = time.monotonic() + PROGRESS_INTERVAL
+            progress(SolverProgress(time.monotonic() - started, state.stats.nodes, seats, seats, state.total_cost))
+    return Assignment(state.student_assignments, 'feasible', state.total_cost)
+
+# search nodes each feasibility check of explain_infeasibility may spend when it has a time_limit,
+# so one hard check cannot eat the whole budget; a check that runs out counts as "could not tell",
+# and the constraint it was testing is kept. Without a time_limit every check runs to the end.
+EXPLAIN_NODE_LIMIT = 5000
+
+def _explain_constraints(problem: Dict) -> List[tuple]:
+    # every constraint explain_infeasibility may drop, in the order it tries dropping them: roster
+    # rules first, then seat counts, then the team-wide structure
+    rules = problem['rules']
+    constraints = [('pair', a, b) for a, b in rules.get('pair_together', [])]
+    constraints += [('banned', s, e) for s, e in rules.get('banned', {}).get('student-event', [])]
+    constraints += [('apart', a, b) for a, b in rules.get('banned', {}).get('student-student', [])]
+    constraints += [('mandatory', s, e) for s, e in rules.get('mandatory', {}).get('student-event', [])]
+    constraints += [('seats', e) for e, n in problem['event_student_requirements'].items() if n > 0]
+    constraints += [('block', b) for b, evs in problem['blocks'].items() if len(evs) > 1]
+    if any(problem['event_student_requirements'].get(e, 0) > 0 for e in problem['build_events']):
+        constraints.append(('build cap',))
+    constraints.append(('event limit',))
+    return constraints
+
+def _relaxed_problem(problem: Dict, kept: set) -> Dict:
+    # the problem with every constraint outside `kept` lifted
+    mandatory = [(s, e) for s, e in problem['rules'].get('mandatory', {}).get('student-event', [])
+                 if ('mandatory', s, e) in kept]
+    forced = defaultdict(int)
+    for s, e in mandatory:
+        forced[e] += 1
+    # only events needing students have a seat constraint to lift; the others keep their count of 0
+    lifted = {e for e, n in problem['event_student_requirements'].items() if n > 0 and ('seats', e) not in kept}
+    banned = problem['rules'].get('banned', {})
+    rules = {'mandatory': {'student-event': mandatory},
+             'banned': {'student-event': [(s, e) for s, e in banned.get('student-event', [])
+                                          if ('banned', s, e) in kept],
+                        'student-student': [(a, b) for a, b in banned.get('student-student', [])
+                                            if ('apart', a, b) in kept]},
+             # a pairing with a lifted seat count would force its partner's roster down too
+             'pair_together': [(a, b) for a, b in problem['rules'].get('pair_together', [])
+                               if ('pair', a, b) in kept and a not in lifted and b not in lifted],
+             # per-student caps go with the team-wide ones
+             'limits': {key: entries for key, entries in problem['rules'].get('limits', {}).items()
+                        if ('event limit' if key == 'student-events' else 'build cap',) in kept}}
+    # a lifted seat count leaves only the seats mandatory placements still need
+    requirements = {e: n if ('seats', e) in kept else min(n, forced[e])
+                    for e, n in problem['event_student_requirements'].items()}
+    # a lifted block lets its events share students: each becomes a block of its own
+    blocks = {}
+    for b, evs in problem['blocks'].items():
+        if ('block', b) in kept or len(evs) == 1:
+            blocks[b] = evs
+        else:
+            blocks.update({f'{b}: {e}': [e] for e in evs})
+    return dict(problem, rules=rules, event_student_requirements=requirements, blocks=blocks,
+                build_events=problem['build_events'] if ('build cap',) in kept else [],
+                max_per_student=problem['max_per_student'] if ('event limit',) in kept
+                else len(requirements))
+
+def _explain_feasible(problem: Dict, kept: set, deadline: Optional[float]) -> Optional[bool]:
+    # True or False once the relaxed problem is decided, None when the check ran out of budget
+    state = build_solver_state(**_relaxed_problem(problem, kept))
+    if state is None:
+        return False
+    if deadline is None:
+        result = solve_dfs(state)
     else:
+        result = solve_dfs(state, time_limit=max(0.0, deadline - time.monotonic()), node_limit=EXPLAIN_NODE_LIMIT)
+    if result.status == 'infeasible':
+        return False
+    return True if result.complete else None
+
+def describe_constraint(constraint: tuple, problem: Dict) -> str:
+    # one constraint of explain_infeasibility in the CSV's terms
+    kind = constraint[0]
+    if kind == 'seats':
+        seats = problem['event_student_requirements'][constraint[1]]
+        build = ' (build event)' if constraint[1] in problem['build_events'] else ''
+        team = f" (the team has {len(problem['students'])})" if seats > len(problem['students']) else ''
+        return f"{constraint[1]} needs {seats} student{'s' if seats != 1 else ''}{build}{team}"
+    if kind == 'block':
+        return f"{constraint[1]} events cannot share a student ({', '.join(problem['blocks'][constraint[1]])})"
+    if kind == 'build cap':
+        return f"each student has at most {problem['max_builds_per_student']} build events"
+    if kind == 'event limit':
+        return f"each of the {len(problem['students'])} students has at most {problem['max_per_student']} events"
+    if kind == 'pair':
+        return f"{constraint[1]} and {constraint[2]} must have the same students"
+    a, b = constraint[1], constraint[2]
+    unknown = [x for x in (a, b) if x not in problem['students'] and x not in problem['event_student_requirements']]
+    suffix = f" (no student or event named {', '.join(unknown)})" if unknown else ''
+    if kind == 'mandatory':
+        return f"{a} must be in {b}{suffix}"
+    if kind == 'banned':
+        return f"{a} may not be in {b}{suffix}"
+    return f"{a} and {b} may not share an event{suffix}"
+
+def explain_infeasibility(students: List[str], events: List[str], preferences: Dict[str, List[str]],
+                          blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
+                          rules: Dict, performance: Dict[str, List[str]] = None,
+                          max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                          build_events: List[str], similar_groups: Dict[str, List[str]],
+                          max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+                          time_limit: Optional[float] = None) -> Optional[List[tuple]]:
+    # Why a roster has no schedule: a small set of its constraints that already cannot all hold,
+    # as (constraint, description) pairs, e.g. (('seats', 'Codebusters'), 'Codebusters needs 3 students').
+    # Constraints are seat counts, block conflicts, the event and build caps, and each rule. Every
+    # event and block is first checked on its own seats, which finds Hall violations (a block
+    # needing more distinct students than can take it) at once; from the smallest failing set, each
+    # constraint is then dropped in turn and stays dropped while the rest still fail. Without a
+    # time_limit the set returned is minimal: dropping any one of its constraints leaves a roster with
+    # a schedule. With one, a check that runs out of nodes or time keeps its constraint, so the set is
+    # still unsatisfiable but may be larger. Returns None if the roster has a schedule, or if its
+    # infeasibility could not be shown within time_limit.
+    problem = dict(students=students, preferences=preferences, blocks=blocks,
+                   event_student_requirements=event_student_requirements, rules=rules,
+                   performance=performance, max_per_student=max_per_student,
+                   max_builds_per_student=max_builds_per_student, build_events=build_events,
+                   similar_groups=similar_groups)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    constraints = _explain_constraints(problem)
+    everything = set(constraints)
+
+    # focus: the seats of one event, then of one block, with every other constraint still in force;
+    # busiest blocks first, as they are the likeliest Hall violations
+    focus = None
+    seat_constraints = {c for c in constraints if c[0] == 'seats'}
+    groups = [[e] for e in event_student_requirements]
+    groups += sorted((evs for evs in blocks.values() if len(evs) > 1),
+                     key=lambda evs: -sum(event_student_requirements.get(e, 0) for e in evs))
+    for evs in groups:
+        kept = everything - seat_constraints | {('seats', e) for e in evs if ('seats', e) in everything}
+        if _explain_feasible(problem, kept, deadline) is False:
+            focus = kept
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+    if focus is None:
+        if _explain_feasible(problem, everything, deadline) is not False:
+            return None
+        focus = everything
+
+    # deletion: a constraint whose removal leaves the rest unsatisfiable is not needed
+    core = set(focus)
+    for constraint in constraints:
+        if constraint not in core:
+            continue
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if _explain_feasible(problem, core - {constraint}, deadline) is False:
+            core.discard(constraint)
+    return [(c, describe_constraint(c, problem)) for c in constraints if c in core]
+
+# value orderings tried by solve_portfolio, cycled across workers: None keeps the default
+# lexicographic (preference, performance, group, load) order, tuples weight those four terms
+PORTFOLIO_WEIGHTS = [None, (1, 1, 0, 0), (0, 1, 0, 0), (1, 0, 0, 0), (1, 1, 5, 0), (1, 1, 0, 5)]
+
+# set in each portfolio worker process; tells the search to wrap up
+_portfolio_stop = None
+
+def _portfolio_init(stop_event):
+    global _portfolio_stop
+    _portfolio_stop = stop_event
+
+def _portfolio_worker(problem: Dict, optimize: bool, seed: Optional[int], weights: Optional[tuple],
+                      time_limit: Optional[float]) -> Assignment:
+    state = build_solver_state(**problem)
+    if state is None:
+        return Assignment({s: [] for s in problem['students']}, 'infeasible')
+    state.set_ordering(seed, weights)
+    return solve_dfs(state, optimize=optimize, time_limit=time_limit, stop=_portfolio_stop.is_set)
+
+def solve_portfolio(students: List[str], events: List[str], preferences: Dict[str, List[str]],
+                    blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
+                    rules: Dict, performance: Dict[str, List[str]] = None,
+                    max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                    build_events: List[str], similar_groups: Dict[str, List[str]],
+                    max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+                    workers: Optional[int] = None, time_limit: Optional[float] = None,
+                    optimize: bool = False) -> Optional[Assignment]:
+    # Runs differently seeded/weighted variants of the search on a process pool. Returns the first
+    # complete assignment, or with optimize=True the cheapest one found by the time limit (stopping
+    # early if a variant proves optimality); the other workers are told to stop either way. As with
+    # find_assignment, an infeasible roster returns None unless a time limit is given.
+    problem = dict(students=students, preferences=preferences, blocks=blocks,
+                   event_student_requirements=event_student_requirements, rules=rules, performance=performance,
+                   max_per_student=max_per_student, max_builds_per_student=max_builds_per_student,
+                   build_events=build_events, similar_groups=similar_groups)
+    workers = workers or os.cpu_count() or 1
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+
+    ctx = multiprocessing.get_context()
+    stop_event = ctx.Event()
+    results: List[Assignment] = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_portfolio_init,
+                             initargs=(stop_event,)) as pool:
+        # variant 0 is the plain deterministic search
+        pending = {pool.submit(_portfolio_worker, problem, optimize, None if i == 0 else i,
+                               PORTFOLIO_WEIGHTS[i % len(PORTFOLIO_WEIGHTS)], time_limit)
+                   for i in range(workers)}
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            results.extend(f.result() for f in done)
+            # every variant searches the whole space, so one finished verdict settles it
+            if any(r.status in ('optimal', 'infeasible') or (r.complete and not optimize) for r in results):
+                break
+        # the rest wrap up with their best so far; the pool waits for them on exit
+        stop_event.set()
+        results.extend(f.result() for f in pending)
+
+    complete = [r for r in results if r.complete]
+    if complete:
+        best = min(complete, key=lambda r: r.cost)
+        # a tie with a proven optimum is optimal too
+        if any(r.status == 'optimal' for r in complete):
+            best.status = 'optimal'
+        return best
+    if time_limit is None:
+        return None
+    # nothing complete: the partial assignment with the most seats filled, then the lowest cost
+    best = max(results, key=lambda r: (sum(len(evs) for evs in r.values()), -(r.cost or 0)))
+    best.status = 'infeasible' if any(r.status == 'infeasible' for r in results) else 'partial'
+    return best
+
+# Seats above which a connected part of the roster is split further, into pieces that only share the
+# students' event and build caps; each piece's search gets up to DECOMPOSE_PIECE_NODE_LIMIT nodes
+# before its part is retried another way
+DECOMPOSE_PART_SEATS = 60
+DECOMPOSE_PIECE_NODE_LIMIT = 5000
+
+def _connected(links) -> List[List]:
+    # items grouped by the chains of links (tuples of items) joining them, in first-seen order
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for link in links:
+        roots = []
+        for item in link:
+            parent.setdefault(item, item)
+            roots.append(find(item))
+        for root in roots[1:]:
+            parent[root] = roots[0]
+    groups: Dict[object, List] = {}
+    for item in parent:
+        groups.setdefault(find(item), []).append(item)
+    return list(groups.values())
+
+def independent_components(students: List[str], event_student_requirements: Dict[str, int],
+                           rules: Dict) -> List[tuple]:
+    # (students, events) of the parts of the roster that share nothing: a student is linked to every
+    # event with seats they are not banned from (and to their mandatory ones), and pair_together events
+    # to each other. Students linked to no event come last, as a part without events.
+    banned = {tuple(pair) for pair in rules.get('banned', {}).get('student-event', [])}
+    links = [(('event', e),) for e in event_student_requirements]
+    links += [(('student', s),) for s in students]
+    links += [(('student', s), ('event', e)) for s in students for e, n in event_student_requirements.items()
+              if n > 0 and (s, e) not in banned]
+    links += [(('student', s), ('event', e)) for s, e in rules.get('mandatory', {}).get('student-event', [])
+              if s in students and e in event_student_requirements]
+    links += [(('event', a), ('event', b)) for a, b in rules.get('pair_together', [])
+              if a in event_student_requirements and b in event_student_requirements]
+    parts = []
+    idle = []
+    for group in _connected(links):
+        part_events = [name for kind, name in group if kind == 'event']
+        part_students = [name for kind, name in group if kind == 'student']
+        if part_events:
+            parts.append((part_students, part_events))
+        else:
+            idle += part_students
+    if idle:
+        parts.append((idle, []))
+    return parts
+
+def _part_problem(problem: Dict, students: List[str], events: List[str], caps: Optional[Dict[str, tuple]] = None) -> Dict:
+    # the problem cut down to some of its students and events; caps adds (events, builds) limits per student
+    people, evs = set(students), set(events)
+    rules = problem['rules']
+    banned = rules.get('banned', {})
+    limits = {key: [(s, n) for s, n in entries if s in people] for key, entries in rules.get('limits', {}).items()}
+    for s, (n, builds) in (caps or {}).items():
+        limits.setdefault('student-events', []).append((s, n))
+        limits.setdefault('student-builds', []).append((s, builds))
+    part_rules = {'mandatory': {'student-event': [(s, e) for s, e in rules.get('mandatory', {}).get('student-event', [])
+                                                  if s in people and e in evs]},
+                  'banned': {'student-event': [(s, e) for s, e in banned.get('student-event', [])
+                                               if s in people and e in evs],
+                             'student-student': [(a, b) for a, b in banned.get('student-student', [])
+                                                 if a in people and b in people]},
+                  # a pairing with an unknown event stays, so its group stays untakeable
+                  'pair_together': [(a, b) for a, b in rules.get('pair_together', []) if a in evs or b in evs],
+                  'limits': limits}
+    blocks = {b: [e for e in block if e in evs] for b, block in problem['blocks'].items()}
+    return dict(problem, students=[s for s in problem['students'] if s in people],
+                preferences={s: ranked for s, ranked in problem['preferences'].items() if s in people},
+                performance={e: ranked for e, ranked in (problem['performance'] or {}).items() if e in evs},
+                blocks={b: block for b, block in blocks.items() if block},
+                event_student_requirements={e: n for e, n in problem['event_student_requirements'].items() if e in evs},
+                rules=part_rules, build_events=[e for e in problem['build_events'] if e in evs])
+
+def _split_component(problem: Dict, students: List[str], events: List[str]) -> Optional[List[tuple]]:
+    # One connected part of the roster as pieces (students, events, caps) of about DECOMPOSE_PART_SEATS
+    # seats each. Blocks, with their pair partners, are dealt out whole, largest first to the emptiest
+    # piece, so the pieces only interact through the students' caps. Those are shared out by a relaxed
+    # schedule of the whole part: the seats students tried out for, cheapest first, then a flow of the
+    # room they have left over the seats still open. A student may take in each piece what this gives
+    # them there, plus any spare in the piece where they do the most. A part the relaxed schedule cannot
+    # fill comes back as one piece; None when its rules are already unsatisfiable.
+    part = _part_problem(problem, students, events)
+    count = math.ceil(sum(part['event_student_requirements'].values()) / DECOMPOSE_PART_SEATS)
+    if count < 2:
+        return [(students, events, None)]
+    state = build_solver_state(**part)
+    if state is None:
         return None
 
-def pretty_print(assignments: Dict[str, List[str]]):
+    units = _connected([tuple(evs) for evs in state.block_events.values()]
+                       + [(e, *partners) for e, partners in state.pair_map.items()])
+    units.sort(key=lambda unit: -sum(part['event_student_requirements'][e] for e in unit))
+    piece_events: List[List[str]] = [[] for _ in range(count)]
+    piece_seats = [0] * count
+    piece_of = {}
+    for unit in units:
+        i = piece_seats.index(min(piece_seats))
+        piece_events[i] += unit
+        piece_seats[i] += sum(part['event_student_requirements'][e] for e in unit)
+        piece_of.update((e, i) for e in unit)
+
+    # the seats students tried out for, cheapest first, as far as seats, room, blocks and builds allow
+    load = {s: [0] * count for s in state.students}
+    builds = {s: [0] * count for s in state.students}
+    room = {s: state.event_limits[s] - len(evs) for s, evs in state.student_assignments.items()}
+    build_room = {s: state.build_limits[s] - state.build_counts[s] for s in state.students}
+    taken = {s: set() for s in state.students}
+    left = {}
+    tried = []
+    for e in state.open_events():
+        left[e] = state.event_slots_remaining[e]
+        tried += [(state.ranks.cost(s, e), s, e) for s in state.candidates(e)
+                  if e in state.ranks.pref_rank.get(s, {}) or s in state.ranks.perf_rank.get(e, {})]
+    for _, s, e in sorted(tried):
+        block = state.event_to_block.get(e)
+        build = e in state.build_events
+        if left[e] and room[s] and block not in taken[s] and (not build or build_room[s]):
+            left[e] -= 1
+            room[s] -= 1
+            build_room[s] -= build
+            taken[s].add(block)
+            load[s][piece_of[e]] += 1
+            builds[s][piece_of[e]] += build
+
+    # the rest of everyone's room spread over the seats still open, builds and other seats apart:
+    #   source -> student (room) -> piece (blocks the student can still take there) -> sink (seats)
+    # with build seats reached through a per-student node capped at the builds the student has left
+    reach = defaultdict(set)
+    seats = defaultdict(int)
+    for e in state.open_events():
+        key = (piece_of[e], e in state.build_events)
+        seats[key] += left[e]
+        block = state.event_to_block.get(e)
+        for s in state.candidates(e):
+            if block not in taken[s]:
+                reach[(s,) + key].add(block)
+    net = MinCostFlow(2)
+    source, sink = 0, 1
+    seat_node = {}
+    for key, n in seats.items():
+        seat_node[key] = net.add_node()
+        net.add_edge(seat_node[key], sink, n, 0)
+    student_node = {}
+    for s in state.students:
+        student_node[s] = net.add_node()
+        net.add_edge(source, student_node[s], room[s], 0)
+        student_node[(s, True)] = net.add_node()
+        net.add_edge(student_node[s], student_node[(s, True)], build_room[s], 0)
+    sent = []
+    for (s, i, build), blocks_reached in reach.items():
+        parent = student_node[(s, True)] if build else student_node[s]
+        sent.append((net.add_edge(parent, seat_node[(i, build)], len(blocks_reached), 0), s, i, build))
+    flow, _ = net.solve(source, sink, sum(seats.values()))
+    if flow < sum(seats.values()):
+        # the greedy start left no way to share the caps out; search the part whole
+        return [(students, events, None)]
+
+    for s, evs in state.student_assignments.items():
+        for e in evs:
+            load[s][piece_of[e]] += 1
+            builds[s][piece_of[e]] += e in state.build_events
+    for eid, s, i, build in sent:
+        load[s][i] += net.flow(eid)
+        if build:
+            builds[s][i] += net.flow(eid)
+    caps: List[Dict[str, tuple]] = [{} for _ in range(count)]
+    for s in state.students:
+        home = load[s].index(max(load[s]))
+        load[s][home] += state.event_limits[s] - sum(load[s])
+        builds[s][home] += state.build_limits[s] - sum(builds[s])
+        for i in range(count):
+            if load[s][i]:
+                caps[i][s] = (load[s][i], builds[s][i])
+    return [(list(caps[i]), piece_events[i], caps[i]) for i in range(count)]
+
+def _part_worker(problem: Dict, solver: str, time_limit: Optional[float], node_limit: Optional[int],
+                 measure: bool) -> tuple:
+    stats = SolverStats() if measure else None
+    state = build_solver_state(**problem)
+    if state is None:
+        return Assignment({s: [] for s in problem['students']}, 'infeasible'), stats
+    state.stats = stats
+    return SOLVERS[solver](state, time_limit=time_limit, node_limit=node_limit), stats
+
+def solve_decomposed(students: List[str], events: List[str], preferences: Dict[str, List[str]],
+                     blocks: Dict[str, List[str]], event_student_requirements: Dict[str, int],
+                     rules: Dict, performance: Dict[str, List[str]] = None,
+                     max_per_student: int = MAX_EVENTS_PER_STUDENT, *,
+                     build_events: List[str], similar_groups: Dict[str, List[str]],
+                     max_builds_per_student: int = MAX_BUILDS_PER_STUDENT,
+                     solver: str = 'dfs', workers: Optional[int] = None, time_limit: Optional[float] = None,
+                     node_limit: Optional[int] = None, stats: Optional[SolverStats] = None) -> Optional[Assignment]:
+    # Solves the roster part by part and merges the results, so the search grows with the largest part
+    # rather than with the whole roster. Parts that share nothing (see independent_components) are solved
+    # as they are, keeping the verdict and, with the exact solvers, optimality. Parts over
+    # DECOMPOSE_PART_SEATS seats are split into pieces that share only student caps (see
+    # _split_component); a piece its share of the caps cannot fill is retried with whatever the other
+    # pieces left over, and failing that its part is solved whole. Such merged schedules are 'feasible'.
+    # Pieces are solved on a process pool of `workers` (default one per CPU) when there are several.
+    # time_limit covers the whole solve and node_limit each search; returns as find_assignment does.
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}; expected one of {', '.join(SOLVERS)}")
+    problem = dict(students=students, preferences=preferences, blocks=blocks,
+                   event_student_requirements=event_student_requirements, rules=rules, performance=performance,
+                   max_per_student=max_per_student, max_builds_per_student=max_builds_per_student,
+                   build_events=build_events, similar_groups=similar_groups)
+    budgeted = time_limit is not None or node_limit is not None
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    workers = workers or os.cpu_count() or 1
+
+    def remaining() -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def solve(parts: List[tuple]) -> List[Assignment]:
+        # (problem, node limit) pairs, solved in order or on the pool
+        args = [(part, solver, remaining(), limit, stats is not None) for part, limit in parts]
+        if workers == 1 or len(parts) < 2:
+            outcomes = [_part_worker(*arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(parts))) as pool:
+                outcomes = list(pool.map(_part_worker, *zip(*args)))
+        for _, part_stats in outcomes:
+            if part_stats is not None:
+                stats.add(part_stats)
+        return [result for result, _ in outcomes]
+
+    # a mandatory rule naming an unknown student or event fails the roster as a whole
+    infeasible = Assignment({s: [] for s in students}, 'infeasible')
+    for s, e in rules.get('mandatory', {}).get('student-event', []):
+        if s not in students or e not in event_student_requirements:
+            return infeasible if budgeted else None
+
+    components = []
+    for part_students, part_events in independent_components(students, event_student_requirements, rules):
+        pieces = _split_component(problem, part_students, part_events)
+        if pieces is None:
+            return infeasible if budgeted else None
+        components.append((part_students, part_events, pieces))
+    piece_limit = min(node_limit or DECOMPOSE_PIECE_NODE_LIMIT, DECOMPOSE_PIECE_NODE_LIMIT)
+    results = solve([(_part_problem(problem, *piece), node_limit if len(pieces) == 1 else piece_limit)
+                     for _, _, pieces in components for piece in pieces])
+
+    event_limits, build_limits = student_limits(students, rules, max_per_student, max_builds_per_student)
+    build_set = set(build_events)
+    merged = []
+    for part_students, part_events, pieces in components:
+        outcomes, results = results[:len(pieces)], results[len(pieces):]
+        if len(pieces) > 1:
+            # capacity coordination: each unfilled piece gets what the others leave each student,
+            # counting the filled pieces' placements and the unfilled ones' shares
+            for i, (_, piece_events, _) in enumerate(pieces):
+                if outcomes[i].complete or remaining() == 0:
+                    continue
+                used = defaultdict(int)
+                used_builds = defaultdict(int)
+                for j, (_, _, caps) in enumerate(pieces):
+                    if j == i:
+                        continue
+                    if outcomes[j].complete:
+                        for s, evs in outcomes[j].items():
+                            used[s] += len(evs)
+                            used_builds[s] += sum(e in build_set for e in evs)
+                    else:
+                        for s, (n, builds) in caps.items():
+                            used[s] += n
+                            used_builds[s] += builds
+                caps = {s: (event_limits[s] - used[s], build_limits[s] - used_builds[s])
+                        for s in part_students if event_limits[s] > used[s]}
+                outcomes[i] = solve([(_part_problem(problem, list(caps), piece_events, caps), piece_limit)])[0]
+            if all(result.complete for result in outcomes):
+                outcomes = [Assignment(result, 'feasible', result.cost) for result in outcomes]
+            elif remaining() != 0:
+                outcomes = solve([(_part_problem(problem, part_students, part_events), node_limit)])
+            else:
+                # out of time: a piece short of capacity proves nothing about the roster
+                outcomes = [Assignment(result, 'partial' if result.status == 'infeasible' else result.status,
+                                       result.cost) for result in outcomes]
+        merged += outcomes
+
+    assignments = {s: [] for s in students}
+    cost = 0
+    for result in merged:
+        for s, evs in result.items():
+            assignments[s] += evs
+        cost += result.cost or 0
+    statuses = {result.status for result in merged}
+    status = next((st for st in ('infeasible', 'partial', 'feasible') if st in statuses), 'optimal')
+    if status == 'infeasible' and not budgeted:
+        return None
+    return Assignment(assignments, status, cost)
+
+class ProblemFormatError(ValueError):
+    # a tryouts CSV that cannot be read as written; `line` is the 1-based line at fault, when there is one
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message if line is None else f'line {line}: {message}')
+        self.line = line
+
+class Problem(dict):
+    # The find_assignment keyword arguments for one roster, also readable as typed attributes:
+    # find_assignment(**problem) and problem.students both work.
+    @property
+    def students(self) -> List[str]:
+        return self['students']
+
+    @property
+    def events(self) -> List[str]:
+        return self['events']
+
+    @property
+    def preferences(self) -> Dict[str, List[str]]:
+        return self['preferences']
+
+    @property
+    def blocks(self) -> Dict[str, List[str]]:
+        return self['blocks']
+
+    @property
+    def event_student_requirements(self) -> Dict[str, int]:
+        return self['event_student_requirements']
+
+    @property
+    def rules(self) -> Dict:
+        return self['rules']
+
+    @property
+    def performance(self) -> Dict[str, List[str]]:
+        return self['performance']
+
+    @property
+    def build_events(self) -> List[str]:
+        return self['build_events']
+
+    @property
+    def similar_groups(self) -> Dict[str, List[str]]:
+        return self['similar_groups']
+
+def load_problem(source: Union[str, os.PathLike, TextIO]) -> Problem:
+    # The tryouts CSV (a path or an open text file) read in one pass, a row at a time. Sections, in order:
+    #   Students        header row starting "Student", then name,event,rank,event,rank,...
+    #   Event           header row starting "Event", then event,seats,block,type ("No Conflict" block;
+    #                   a type containing "Build" marks a build event)
+    #   Rules           optional; Mandatory (student,event) and Banned (student,event or student,student)
+    #   Paired Events   optional; one row per group of events that must have the same students
+    #   Similar Events  optional; one group of related events per row
+    # Rows above the Students header are ignored; blank rows anywhere are skipped. A bad rank or seat
+    # count, a duplicate, or a name that is neither a known student nor event raises ProblemFormatError
+    # with the line it is on.
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline='', encoding='utf-8') as f:
+            return load_problem(f)
+
+    tryouts: Dict[str, List[tuple]] = {}
+    # event -> (line, student) of its first tryout, checked once the Event table is in
+    first_tryout: Dict[str, tuple] = {}
+    no_conflict_events = []
+    blocks: Dict[str, List[str]] = {}
+    event_student_requirements: Dict[str, int] = {}
+    build_events = []
+    rules = {"mandatory": {"student-event": []}, "banned": {"student-event": [], "student-student": []}}
+    similar_groups: Dict[str, List[str]] = {}
+
+    section = None
+    reader = csv.reader(source)
+    for cols in reader:
+        line = reader.line_num
+        cols = [c.strip() for c in cols]
+        while cols and not cols[-1]:
+            cols.pop()
+        if not cols:
+            continue
+        head = cols[0].lower()
+
+        # section headers
+        if section is None:
+            if head.startswith('student'):
+                section = 'students'
+            continue
+        if section == 'students' and head.startswith('event'):
+            section = 'events'
+            continue
+        if section != 'students' and head in ('rules', 'mandatory', 'banned', 'paired events', 'similar events'):
+            section = head
+            continue
+        if section in ('mandatory', 'banned') and head == 'student' and len(cols) == 2 \
+                and cols[1].lower() in ('event', 'student'):
+            continue
+        if section == 'paired events' and all(c.lower() == 'event' for c in cols):
+            continue
+
+        if section == 'students':
+            name = cols[0]
+            if name in tryouts:
+                raise ProblemFormatError(f"student {name} is listed twice", line)
+            if len(cols) % 2 == 0:
+                raise ProblemFormatError(f"{name}: {cols[-1]} has no rank", line)
+            pairs = []
+            for ev, rank in zip(cols[1::2], cols[2::2]):
+                if not ev and not rank:
+                    continue
+                if not ev:
+                    raise ProblemFormatError(f"{name}: rank {rank} has no event", line)
+                try:
+                    pairs.append((ev, int(rank)))
+                except ValueError:
+                    raise ProblemFormatError(f"{name}: rank {rank!r} for {ev} is not a whole number", line) from None
+                first_tryout.setdefault(ev, (line, name))
+            tryouts[name] = pairs
+
+        elif section == 'events':
+            ev = cols[0]
+            if ev in event_student_requirements:
+                raise ProblemFormatError(f"event {ev} is listed twice", line)
+            seats = cols[1] if len(cols) > 1 else ''
+            try:
+                count = int(seats)
+            except ValueError:
+                count = None
+            if count is None or count < 0:
+                raise ProblemFormatError(f"{ev}: number of students {seats!r} is not a whole number", line)
+            event_student_requirements[ev] = count
+            blk = cols[2] if len(cols) > 2 else ''
+            if blk.lower() == 'no conflict':
+                no_conflict_events.append(ev)
+            else:
+                # events without a block share a default unnamed one
+                blocks.setdefault(blk or 'Block: Unspecified', []).append(ev)
+            if len(cols) > 3 and 'build' in cols[3].lower():
+                build_events.append(ev)
+
+        elif section in ('mandatory', 'banned'):
+            if len(cols) != 2:
+                raise ProblemFormatError(f"{section.capitalize()} rows need two names, got {len(cols)}", line)
+            a, b = cols
+            if a not in tryouts:
+                raise ProblemFormatError(f"unknown student {a}", line)
+            if b in event_student_requirements:
+                # a banned row names an event or, for students kept apart, another student
+                rules[section]['student-event'].append((a, b))
+            elif section == 'banned' and b in tryouts:
+                rules['banned']['student-student'].append((a, b))
+            else:
+                raise ProblemFormatError(f"unknown {'event' if section == 'mandatory' else 'student or event'} {b}",
+                                         line)
+
+        elif section == 'paired events':
+            evs = [ev for ev in cols if ev]
+            for ev in evs:
+                if ev not in event_student_requirements:
+                    raise ProblemFormatError(f"unknown event {ev} in paired events", line)
+            if len(evs) < 2:
+                raise ProblemFormatError(f"paired events need at least two events, got {len(evs)}", line)
+            rules.setdefault('pair_together', []).extend((evs[0], ev) for ev in evs[1:])
+
+        elif section == 'similar events':
+            for ev in cols:
+                if ev and ev not in event_student_requirements:
+                    raise ProblemFormatError(f"unknown event {ev} in similar events", line)
+            similar_groups[f'Group{len(similar_groups) + 1}'] = [ev for ev in cols if ev]
+
+        else:
+            raise ProblemFormatError(f"expected Mandatory, Banned, Paired Events or Similar Events, got {cols[0]}",
+                                     line)
+
+    if section is None:
+        raise ProblemFormatError("no Students section")
+    if not event_student_requirements:
+        raise ProblemFormatError("no Event table")
+    for ev, (line, name) in first_tryout.items():
+        if ev not in event_student_requirements:
+            raise ProblemFormatError(f"{name} tried out for {ev}, which is not in the Event table", line)
+    return problem_from_tables(tryouts, no_conflict_events, blocks, event_student_requirements, build_events, rules,
+                               similar_groups)
+
+def problem_from_tables(tryouts: Dict[str, List[tuple]], no_conflict_events: List[str], blocks: Dict[str, List[str]],
+                        event_student_requirements: Dict[str, int], build_events: List[str], rules: Dict,
+                        similar_groups: Dict[str, List[str]]) -> Problem:
+    # find_assignment keyword arguments derived from the raw tables
+    blocks = dict(blocks)
+    # add a unique NoConflict block for each no-conflict event
+    for ev in no_conflict_events:
+        blocks[f'NoConflict: {ev}'] = [ev]
+
+    # flatten events list
+    events = [e for evs in blocks.values() for e in evs]
+
+    # derive preferences: student -> [events ordered best->worst]
+    preferences = {}
+    for student, evs in tryouts.items():
+        ordered = [e for e, r in sorted(evs, key=lambda x: x[1])]
+        preferences[student] = ordered
+
+    # derive performance: event -> [students ordered best->worst]
+    perf_temp = {}
+    for student, evs in tryouts.items():
+        for event, rank in evs:
+            perf_temp.setdefault(event, []).append((student, rank))
+    performance = {}
+    for event, entries in perf_temp.items():
+        entries.sort(key=lambda x: x[1])
+        performance[event] = [s for s, r in entries]
+
+    # derive students list from tryouts
+    students = list(tryouts.keys())
+    return Problem(students=students, events=events, preferences=preferences, blocks=blocks,
+                   event_student_requirements=event_student_requirements, rules=rules, performance=performance,
+                   build_events=build_events, similar_groups=similar_groups)
+
+def load_scenarios(source: str) -> List[Dict]:
+    # Scenarios to run: a folder runs each *.csv in it once with the defaults, a JSON manifest lists them
+    #   {"defaults": {"solver": "dfs", "time_limit": 60},
+    #    "scenarios": [{"name": "A team", "csv": "a.csv"},
+    #                  {"name": "A team, 3 events each", "csv": "a.csv", "max_per_student": 3},
+    #                  {"name": "A team, no X on Codebusters", "csv": "a.csv",
+    #                   "rules": {"banned": {"student-event": [["StudentX", "Codebusters"]]}}}]}
+    # Keys other than name/csv override the defaults: solver, time_limit, max_per_student,
+    # max_builds_per_student, and rules (merged into the CSV's own). CSV paths are relative to the manifest.
+    if os.path.isdir(source):
+        return [{'name': os.path.splitext(name)[0], 'csv': os.path.join(source, name)}
+                for name in sorted(os.listdir(source)) if name.lower().endswith('.csv')]
+    with open(source, encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(source))
+    scenarios = []
+    for i, entry in enumerate(manifest.get('scenarios', [])):
+        scenario = dict(manifest.get('defaults', {}), **entry)
+        scenario['csv'] = os.path.join(base, scenario['csv'])
+        scenario.setdefault('name', f"{os.path.splitext(os.path.basename(scenario['csv']))[0]} #{i + 1}")
+        scenarios.append(scenario)
+    return scenarios
+
+def _batch_worker(problem: Dict, settings: Dict) -> Dict:
+    # one scenario in a pool process
+    problem = dict(problem)
+    for key in ('max_per_student', 'max_builds_per_student'):
+        if key in settings:
+            problem[key] = settings[key]
+    if settings.get('rules'):
+        problem['rules'] = _merge_rules(problem['rules'], settings['rules'], set())
+    start = time.monotonic()
+    result = find_assignment(**problem, solver=settings.get('solver', 'dfs'), time_limit=settings.get('time_limit'))
+    seconds = time.monotonic() - start
+    if result is None:
+        return {'status': 'infeasible', 'cost': None, 'seconds': seconds, 'assignments': {}}
+    return {'status': result.status, 'cost': result.cost, 'seconds': seconds, 'assignments': dict(result)}
+
+def run_batch(scenarios: List[Dict], workers: Optional[int] = None) -> List[Dict]:
+    # Solves the scenarios (see load_scenarios) on one process pool. Each distinct CSV is parsed once
+    # up front and shared by every scenario built on it. Returns one record per scenario, in order,
+    # with its status, cost, solve time and schedule; failures are recorded as status 'error'.
+    problems: Dict[str, Dict] = {}
+    parse_seconds: Dict[str, float] = {}
+    for scenario in scenarios:
+        path = scenario['csv']
+        if path in problems:
+            continue
+        start = time.monotonic()
+        try:
+            problems[path] = load_problem(path)
+        except (OSError, ValueError) as exc:
+            problems[path] = exc
+        parse_seconds[path] = time.monotonic() - start
+
+    records = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [None if isinstance(problems[s['csv']], Exception)
+                   else pool.submit(_batch_worker, problems[s['csv']], s) for s in scenarios]
+        for scenario, future in zip(scenarios, futures):
+            record = {'name': scenario['name'], 'csv': scenario['csv'],
+                      'parse_seconds': parse_seconds[scenario['csv']]}
+            try:
+                if future is None:
+                    raise problems[scenario['csv']]
+                record.update(future.result())
+            except Exception as exc:
+                record.update(status='error', error=f'{type(exc).__name__}: {exc}')
+            records.append(record)
+    return records
+
+def write_batch_results(records: List[Dict], path: str):
+    # the consolidated results of run_batch as one JSON file
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'generated': datetime.now().isoformat(timespec='seconds'), 'scenarios': records}, f, indent=2)
+
+def pretty_print(assignments: Dict[str, List[str]], preferences: Dict[str, List[str]]):
     # Column-formatted output. Events for each student are printed in the order of their preferences.
 
     # determine how many event columns to show
@@ -284,29 +2838,101 @@ def pretty_print(assignments: Dict[str, List[str]]):
             row += "  " + val.ljust(w)
         print(row)
 
-def csv_output(assignments: Dict[str, List[str]]):
-	#Write assignments to time-stamped csv file
-
-	out_path = os.path.join(os.path.dirname(__file__), "science_olympiad_event_scheduler_output_" + datetime.now().strftime("%H:%M:%S") + ".csv")
-	# determine max events assigned to size the header
-	max_assigned = max((len(evs) for evs in assignments.values()), default=0)
-	fieldnames = ['Student'] + [f'Event{i+1}' for i in range(max_assigned)]
-
-	with open(out_path, 'w', newline='', encoding='utf-8') as f:
-		writer = csv.writer(f)
-		writer.writerow(fieldnames)
-		# rows: sorted student names for stable output
-		for student in sorted(assignments.keys()):
-			evs = assignments.get(student, [])
-			# pad to max_assigned with empty strings
-			row = [student] + evs + [''] * (max_assigned - len(evs))
-			writer.writerow(row)
-	# optional confirmation
-	print(f"\nWrote assignments to {out_path}")
+OUTPUT_PREFIX = "science_olympiad_event_scheduler_output"
+
+def unique_output_path(directory: str, extension: str, prefix: str = OUTPUT_PREFIX) -> str:
+    # A new file named by the date and time, with a counter when that name is taken; the file is
+    # created here, so runs started in the same second, or side by side, never share one.
+    stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    for n in itertools.count(1):
+        path = os.path.join(directory, f"{prefix}_{stamp}{'' if n == 1 else f'_{n}'}{extension}")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return path
+
+def write_csv(assignments: Dict[str, List[str]], path: str):
+    # one row per student (sorted by name), padded to the most events anyone holds; the file is replaced
+    # in one step, so a reader never sees half a schedule
+    max_assigned = max((len(evs) for evs in assignments.values()), default=0)
+    fieldnames = ['Student'] + [f'Event{i+1}' for i in range(max_assigned)]
+    partial_path = path + '.part'
+    with open(partial_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        for student in sorted(assignments.keys()):
+            evs = assignments.get(student, [])
+            writer.writerow([student] + evs + [''] * (max_assigned - len(evs)))
+    os.replace(partial_path, path)
+
+# Output sinks: progress callbacks for find_assignment(progress=...) and improve_assignment(progress=...)
+# that record a solve while it runs. Several can be combined with fan_out.
+
+class CsvSink:
+    # Keeps the latest schedule found in one CSV file, created on the first schedule, so stopping a long
+    # solve early still leaves its best schedule on disk.
+    def __init__(self, directory: Optional[str] = None, path: Optional[str] = None):
+        self.directory = directory if directory is not None else os.path.dirname(os.path.abspath(__file__))
+        self.path = path
+
+    def write(self, assignments: Dict[str, List[str]]) -> str:
+        if self.path is None:
+            self.path = unique_output_path(self.directory, '.csv')
+        write_csv(assignments, self.path)
+        return self.path
+
+    def __call__(self, update: SolverProgress):
+        if update.assignment is not None:
+            self.write(update.assignment)
+
+class JsonLinesSink:
+    # Appends every update to a JSON lines file as it arrives: snapshots for plotting convergence, and
+    # each schedule found in full.
+    def __init__(self, path: Optional[str] = None, directory: Optional[str] = None):
+        if path is None:
+            path = unique_output_path(directory if directory is not None else os.getcwd(), '.jsonl')
+        self.path = path
+
+    def __call__(self, update: SolverProgress):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(update.to_dict()) + '\n')
+
+class TableSink:
+    # Prints a status line per update to stdout, and with tables=True the pretty_print table of each
+    # schedule found.
+    def __init__(self, preferences: Dict[str, List[str]], tables: bool = True):
+        self.preferences = preferences
+        self.tables = tables
+
+    def __call__(self, update: SolverProgress):
+        best = '-' if update.best_cost is None else update.best_cost
+        found = 'found schedule, ' if update.assignment is not None else ''
+        print(f"[{update.elapsed:7.1f}s] {found}{update.filled}/{update.seats} seats, best cost {best}, "
+              f"{update.nodes} nodes ({update.nodes_per_second:.0f}/s)", flush=True)
+        if self.tables and update.assignment is not None:
+            pretty_print(update.assignment, self.preferences)
+
+def fan_out(*sinks: Callable[[SolverProgress], None]) -> Callable[[SolverProgress], None]:
+    # one progress callback feeding several sinks
+    def progress(update: SolverProgress):
+        for sink in sinks:
+            sink(update)
+    return progress
 
 if __name__ == '__main__':
     #data to be specified
     data_path = "example.csv" #can be "user" or "file_name.csv"
+    solver = "dfs" #"dfs" (first valid schedule), "flow", "ilp" or "bnb" (best schedule by tryout rank)
+    time_limit = None #seconds; when set, the best schedule found so far is returned once it runs out
+    cache_dir = None #folder for cached schedules (e.g. ".schedule_cache"); reruns on the same data return at once
+    stats_path = None #file for solver statistics (e.g. "solver_stats.json"): nodes, prune reasons, phase timings
+    explain = True #when no schedule exists, list a smallest set of constraints that cannot all hold
+    improve_time = None #seconds spent lowering the total tryout rank of the schedule found (e.g. 10)
+    seed = 0 #seed for the improvement search; the same seed explores the same way
+    decompose = False #solve independent parts of a large roster separately (in parallel) and merge them
+    show_progress = False #print a status line every second while solving, and each better schedule found
+    progress_path = None #file logging the progress, one JSON object per line (e.g. "progress.jsonl")
 
     if data_path == "user":
         tryouts = {
@@ -365,259 +2991,104 @@ if __name__ == '__main__':
             'Group10': ['Helicopter', 'Hovercraft', 'Boomilever', 'Machines'],
             'Group11': ['Quantum Quandaries'],
         }
+
+        # event requirements provided by the user
+        event_student_requirements = {
+            'Anatomy and Physiology': 2,
+            'Astronomy': 2,
+            'Boomilever': 2,
+            'Chemistry Lab': 2,
+            'Circuit Lab': 2,
+            'Codebusters': 3,
+            'Designer Genes': 2,
+            'Disease Detectives': 2,
+            'Dynamic Planet': 2,
+            'Electric Vehicle': 2,
+            'Engineering CAD': 2,
+            'Entomology': 2,
+            'Experimental Design': 3,
+            'Forensics': 2,
+            'Hovercraft': 2,
+            'Helicopter': 2,
+            'Machines': 2,
+            'Material Science': 2,
+            'Quantum Quandaries': 2,
+            'Remote Sensing': 2,
+            'Robot Tour': 2,
+            'Rocks and Minerals': 2,
+            'Sustainable Energy': 2,
+            'Water Quality': 2,
+        }
+
+        problem = problem_from_tables(tryouts, no_conflict_events, blocks, event_student_requirements, build_events,
+                                      rules, similar_groups)
     else: #data needs to be collected from data.csv
         # if relative, resolve next to this script
         if not os.path.isabs(data_path):
             data_path = os.path.join(os.path.dirname(__file__), data_path)
-
-        rows = []
-        with open(data_path, newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for r in reader:
-                # normalize row: strip each cell; keep empty strings for missing cols
-                rows.append([c.strip() for c in r])
-
-        n = len(rows)
-        idx = 0
-
-        # find Students header (first row whose first cell startswith 'Student' case-insensitive)
-        while idx < n and (len(rows[idx]) == 0 or not rows[idx][0].lower().startswith('student')):
-            idx += 1
-
-        tryouts = {}
-        no_conflict_events = []
-        blocks = {}
-        event_student_requirements = {}
-        build_events = []
-        rules = {"mandatory": {"student-event": []}, "banned": {"student-event": [], "student-student": []}}
-        similar_groups = {}
-
-        # parse student tryouts section
-        if idx < n:
-            # header row consumed
-            idx += 1
-            while idx < n:
-                if len(rows[idx]) == 0 or (len(rows[idx]) > 0 and rows[idx][0] == ''):
-                    idx += 1
-                    continue
-                # stop when we hit Event header
-                if rows[idx][0].lower().startswith('event'):
-                    break
-                cols = rows[idx]
-                name = cols[0]
-                pairs = []
-                # parse Event/Rank pairs from remaining columns (assume event, rank, event, rank, ...)
-                j = 1
-                while j + 1 < len(cols):
-                    ev = cols[j].strip()
-                    rk = cols[j + 1].strip()
-                    if ev:
-                        try:
-                            rank = int(rk) if rk != '' else None
-                        except ValueError:
-                            rank = None
-                        if rank is None:
-                            # if no numeric rank, keep a high sentinel (so present but low priority)
-                            pairs.append((ev, 999))
-                        else:
-                            pairs.append((ev, rank))
-                    j += 2
-                tryouts[name] = pairs
-                idx += 1
-
-        # parse events table
-        while idx < n and not (len(rows[idx]) > 0 and rows[idx][0].lower().startswith('event')):
-            idx += 1
-        if idx < n and rows[idx][0].lower().startswith('event'):
-            # skip header
-            idx += 1
-            while idx < n:
-                if len(rows[idx]) == 0 or rows[idx][0] == '':
-                    idx += 1
-                    continue
-                first = rows[idx][0].strip()
-                # stop at Rules header (if present)
-                if first.lower() == 'rules':
-                    break
-                cols = rows[idx]
-                ev = cols[0].strip()
-                num = 0
-                blk = ''
-                typ = ''
-                if len(cols) > 1 and cols[1].strip() != '':
-                    try:
-                        num = int(cols[1].strip())
-                    except ValueError:
-                        num = 0
-                if len(cols) > 2:
-                    blk = cols[2].strip()
-                # optional Type column (e.g. "Build", "Knowledge", etc.)
-                if len(cols) > 3:
-                    typ = cols[3].strip()
-                event_student_requirements[ev] = num
-                if blk.lower() == 'no conflict':
-                    no_conflict_events.append(ev)
-                else:
-                    if blk == '':
-                        # put into a default unnamed block if no block provided
-                        blk = 'Block: Unspecified'
-                    blocks.setdefault(blk, []).append(ev)
-                # if the event type contains "build" (case-insensitive), record it as a build event
-                if typ and 'build' in typ.lower():
-                    build_events.append(ev)
-                idx += 1
-
-        # parse Rules section (if present)
-        while idx < n and not (len(rows[idx]) > 0 and rows[idx][0].strip().lower() == 'rules'):
-            idx += 1
-        if idx < n and rows[idx][0].strip().lower() == 'rules':
-            idx += 1
-            # Expect subsections Mandatory, Banned, etc.
-            while idx < n:
-                if len(rows[idx]) == 0 or rows[idx][0] == '':
-                    idx += 1
-                    continue
-                section = rows[idx][0].strip().lower()
-                idx += 1
-                if section == 'mandatory':
-                    # skip possible header line 'Student,Event'
-                    if idx < n and len(rows[idx]) > 0 and rows[idx][0].strip().lower() == 'student':
-                        idx += 1
-                    # read entries until blank line or next known section
-                    while idx < n:
-                        if len(rows[idx]) == 0 or rows[idx][0].strip() == '':
-                            idx += 1
-                            break
-                        if rows[idx][0].strip().lower() in ('banned', 'similar events'):
-                            break
-                        cols = rows[idx]
-                        if len(cols) > 1 and cols[0].strip() and cols[1].strip():
-                            rules['mandatory']['student-event'].append((cols[0].strip(), cols[1].strip()))
-                        idx += 1
-                elif section == 'banned':
-                    # parse two banned subsections: Student,Event and Student,Student
-                    # skip possible header
-                    # parse student-event banned
-                    if idx < n and len(rows[idx]) > 0 and rows[idx][0].strip().lower() == 'student':
-                        # could be header 'Student,Event'
-                        idx += 1
-                    # collect student-event bans until a blank line or a header that starts with 'student' and second col 'student'
-                    while idx < n:
-                        if len(rows[idx]) == 0 or rows[idx][0].strip() == '':
-                            idx += 1
-                            break
-                        # detect start of student-student subsection
-                        if len(rows[idx]) > 1 and rows[idx][0].strip().lower() == 'student' and rows[idx][1].strip().lower() == 'student':
-                            idx += 1
-                            break
-                        cols = rows[idx]
-                        if len(cols) > 1 and cols[0].strip() and cols[1].strip():
-                            rules['banned']['student-event'].append((cols[0].strip(), cols[1].strip()))
-                        idx += 1
-                    # parse student-student bans (if present)
-                    # skip header if still present
-                    if idx < n and len(rows[idx]) > 1 and rows[idx][0].strip().lower() == 'student' and rows[idx][1].strip().lower() == 'student':
-                        idx += 1
-                    while idx < n:
-                        if len(rows[idx]) == 0 or rows[idx][0].strip() == '':
-                            idx += 1
-                            break
-                        # stop on Similar Events
-                        if rows[idx][0].strip().lower() == 'similar events':
-                            break
-                        cols = rows[idx]
-                        if len(cols) > 1 and cols[0].strip() and cols[1].strip():
-                            rules['banned']['student-student'].append((cols[0].strip(), cols[1].strip()))
-                        idx += 1
-                else:
-                    # unknown subsection: stop
-                    break
-
-        # parse Similar Events
-        while idx < n and not (len(rows[idx]) > 0 and rows[idx][0].strip().lower() == 'similar events'):
-            idx += 1
-        if idx < n and rows[idx][0].strip().lower() == 'similar events':
-            idx += 1
-            group_idx = 1
-            while idx < n:
-                if len(rows[idx]) == 0:
-                    idx += 1
-                    continue
-                # collect non-empty cells as group members
-                members = [c for c in rows[idx] if c and c.strip()]
-                members = [m.strip() for m in members]
-                if members:
-                    similar_groups[f'Group{group_idx}'] = members
-                    group_idx += 1
-                idx += 1
-
-        # ensure variables exist for downstream code
-        # (tryouts, no_conflict_events, blocks, event_student_requirements, rules, similar_groups are now set)
+        try:
+            problem = load_problem(data_path)
+        except ProblemFormatError as exc:
+            raise SystemExit(f"{data_path}: {exc}")
 
     #derived data
-    # add a unique NoConflict block for each no-conflict event
-    for ev in no_conflict_events:
-        blocks[f'NoConflict: {ev}'] = [ev]
-
-    # flatten events list
-    events = [e for evs in blocks.values() for e in evs]
-
-    # event requirements provided by the user
-    event_student_requirements = {
-        'Anatomy and Physiology': 2,
-        'Astronomy': 2,
-        'Boomilever': 2,
-        'Chemistry Lab': 2,
-        'Circuit Lab': 2,
-        'Codebusters': 3,
-        'Designer Genes': 2,
-        'Disease Detectives': 2,
-        'Dynamic Planet': 2,
-        'Electric Vehicle': 2,
-        'Engineering CAD': 2,
-        'Entomology': 2,
-        'Experimental Design': 3,
-        'Forensics': 2,
-        'Hovercraft': 2,
-        'Helicopter': 2,
-        'Machines': 2,
-        'Material Science': 2,
-        'Quantum Quandaries': 2,
-        'Remote Sensing': 2,
-        'Robot Tour': 2,
-        'Rocks and Minerals': 2,
-        'Sustainable Energy': 2,
-        'Water Quality': 2,
-    }
-
-    # derive preferences: student -> [events ordered best->worst]
-    preferences = {}
-    for student, evs in tryouts.items():
-        ordered = [e for e, r in sorted(evs, key=lambda x: x[1])]
-        preferences[student] = ordered
-
-    # derive performance: event -> [students ordered best->worst]
-    perf_temp = {}
-    for student, evs in tryouts.items():
-        for event, rank in evs:
-            perf_temp.setdefault(event, []).append((student, rank))
-    performance = {}
-    for event, entries in perf_temp.items():
-        entries.sort(key=lambda x: x[1])
-        performance[event] = [s for s, r in entries]
-
-    # derive students list from tryouts
-    students = list(tryouts.keys())
-    total_slots = (sum(event_student_requirements.values()))
-    minimum_events = math.ceil(total_slots / len(students))
+    students, events, blocks = problem.students, problem.events, problem.blocks
+    preferences, performance = problem.preferences, problem.performance
+    event_student_requirements, rules = problem.event_student_requirements, problem.rules
+    build_events, similar_groups = problem.build_events, problem.similar_groups
 
     # Similar-event groupings (least-priority clustering). These groups are used as a final
     # tie-breaker after performance and preference: students who already have an event in the
     # same group are slightly preferred so related events cluster where possible.
 
-    assignments = find_assignment(students, events, preferences, blocks, event_student_requirements, rules, performance)
+    stats = SolverStats() if stats_path else None
+    # every better schedule goes straight to the output CSV, so stopping early keeps the best one so far
+    output = CsvSink()
+    sinks = [output]
+    if show_progress:
+        sinks.append(TableSink(preferences, tables=False))
+    if progress_path:
+        sinks.append(JsonLinesSink(progress_path))
+    progress = fan_out(*sinks)
+    try:
+        if decompose:
+            assignments = solve_decomposed(students, events, preferences, blocks, event_student_requirements, rules,
+                                           performance, build_events=build_events, similar_groups=similar_groups,
+                                           solver=solver, time_limit=time_limit, stats=stats)
+        else:
+            assignments = find_assignment(students, events, preferences, blocks, event_student_requirements, rules,
+                                          performance, build_events=build_events, similar_groups=similar_groups,
+                                          solver=solver, time_limit=time_limit,
+                                          cache=SolutionCache(cache_dir) if cache_dir else None, stats=stats,
+                                          progress=progress)
+        if stats is not None:
+            stats.to_json(stats_path)
+        if improve_time and assignments is not None and assignments.status == 'feasible':
+            assignments = improve_assignment(assignments, students, events, preferences, blocks,
+                                             event_student_requirements, rules, performance, build_events=build_events,
+                                             similar_groups=similar_groups, time_limit=improve_time, seed=seed,
+                                             progress=progress)
+    except KeyboardInterrupt:
+        if output.path is None:
+            raise SystemExit("\nStopped before any complete assignment was found.")
+        raise SystemExit(f"\nStopped; the best assignment found so far is in {output.path}")
     if assignments is None:
         print("Failed to find a complete assignment with given constraints.")
+    elif not assignments.complete:
+        if assignments.status == 'infeasible':
+            print("Failed to find a complete assignment with given constraints. Closest partial assignment:")
+        else:
+            print("Time limit reached before a complete assignment was found. Best partial assignment:")
+        pretty_print(assignments, preferences)
     else:
-        pretty_print(assignments)
-        csv_output(assignments)
\ No newline at end of file
+        pretty_print(assignments, preferences)
+        print(f"\nWrote assignments to {output.write(assignments)}")
+
+    if explain and (assignments is None or assignments.status == 'infeasible'):
+        conflict = explain_infeasibility(students, events, preferences, blocks, event_student_requirements, rules,
+                                         performance, build_events=build_events, similar_groups=similar_groups,
+                                         time_limit=time_limit)
+        if conflict:
+            print("\nThese constraints cannot all hold; relax at least one of them:")
+            for constraint, text in conflict:
+                print(f"  - {text}")
\ No newline at end of file
@@ -0,0 +1,393 @@
+# Local scheduling service for front ends that need answers at interactive latency. Problems are parsed
+# once and kept in memory by id, small edits (a ban, a seat count) make a new version of a problem
+# without re-reading anything, and solves run on a process pool of warm workers off the event loop, so
+# the server keeps answering while they search. Identical solves in flight at the same time share one
+# search, and verdicts more time would not change are remembered per version.
+#
+#   python3 server.py                              serve on 127.0.0.1:8765
+#   python3 server.py example.csv --port 9000      preload example.csv as problem "example"
+#   python3 server.py --data-dir rosters/          also let clients load CSVs from rosters/ by path
+#
+# Requests and responses are JSON:
+#   POST   /problems               {"csv": "<file contents>"} or, with --data-dir, {"path": "team.csv"} inside
+#                                  that folder; optionally with an "id"
+#   GET    /problems               ids, versions and sizes
+#   GET    /problems/<id>          the problem's tables
+#   DELETE /problems/<id>
+#   POST   /problems/<id>/edits    a change in the shape event.apply_delta takes, e.g.
+#                                    {"rules": {"banned": {"student-event": [["StudentA", "Codebusters"]]}}}
+#                                    {"event_student_requirements": {"Codebusters": 2}}
+#   POST   /problems/<id>/solve    {"solver": "dfs", "time_limit": 5, "node_limit": null, "decompose": false,
+#                                   "repair": false}, every field optional
+# A solve answers with its status, cost, seconds and schedule. With "repair": true, a solve right after
+# an edit repairs the schedule of the version before (see event.resolve), keeping it as close as the
+# change allows. Errors answer with {"error": message} and a 4xx/5xx status.
+import argparse
+import asyncio
+import io
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+from event import (SOLVERS, Problem, ProblemFormatError, apply_delta, find_assignment, load_problem, resolve,
+                   solve_decomposed)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+PROBLEM_ID = re.compile(r'[A-Za-z0-9_.-]{1,64}$')
+DELTA_KEYS = ('remove_students', 'add_students', 'preferences', 'performance', 'event_student_requirements',
+              'rules')
+
+class RequestError(Exception):
+    # answered as {"error": message} with an HTTP status
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def solve_problem(problem: Dict, settings: Dict, previous: Optional[tuple] = None) -> Dict:
+    # One solve in a pool process, as a JSON-ready record. previous = (schedule, base problem, delta)
+    # repairs that schedule of `base` after `delta` instead of solving `problem` from scratch.
+    start = time.monotonic()
+    if previous is not None:
+        schedule, base, delta = previous
+        result = resolve(schedule, delta, **base, time_limit=settings['time_limit'])
+    else:
+        solve = solve_decomposed if settings['decompose'] else find_assignment
+        result = solve(**problem, solver=settings['solver'], time_limit=settings['time_limit'],
+                       node_limit=settings['node_limit'])
+    seconds = time.monotonic() - start
+    if result is None:
+        return {'status': 'infeasible', 'cost': None, 'seconds': seconds, 'assignments': {}}
+    return {'status': result.status, 'cost': result.cost, 'seconds': seconds, 'assignments': dict(result)}
+
+# what each kind of rule entry names, by (rules section, kind); pair_together is a plain list
+RULE_ENTRIES = {('mandatory', 'student-event'): ('student', 'event'),
+                ('banned', 'student-event'): ('student', 'event'),
+                ('banned', 'student-student'): ('student', 'student'),
+                ('pair_together', None): ('event', 'event'),
+                ('limits', 'student-events'): ('student', 'count'),
+                ('limits', 'student-builds'): ('student', 'count')}
+
+def check_object(value, field: str) -> Dict:
+    if not isinstance(value, dict):
+        raise RequestError(400, f"{field} must be an object")
+    return value
+
+def check_names(value, field: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise RequestError(400, f"{field} must be a list of names")
+    return value
+
+def check_delta(problem: Dict, delta) -> Dict:
+    # the edit, if it is one apply_delta can make to this problem; RequestError(400) otherwise. Every
+    # field is checked for shape as well as names, since a stored bad value would break each later solve.
+    if not isinstance(delta, dict) or not delta:
+        raise RequestError(400, "an edit is a non-empty JSON object")
+    unknown = [key for key in delta if key not in DELTA_KEYS]
+    if unknown:
+        raise RequestError(400, f"unknown edit field {unknown[0]!r}; expected {', '.join(DELTA_KEYS)}")
+    added = check_names(delta.get('add_students', []), 'add_students')
+    students = set(problem['students']) | set(added)
+    events = set(problem['event_student_requirements'])
+    for s in check_names(delta.get('remove_students', []), 'remove_students'):
+        if s not in problem['students']:
+            raise RequestError(400, f"unknown student {s!r}")
+    for e, n in check_object(delta.get('event_student_requirements', {}), 'event_student_requirements').items():
+        if e not in events:
+            raise RequestError(400, f"unknown event {e!r}")
+        if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+            raise RequestError(400, f"{e}: seat count {n!r} is not a whole number")
+    for s, evs in check_object(delta.get('preferences', {}), 'preferences').items():
+        if s not in students:
+            raise RequestError(400, f"unknown student {s!r}")
+        for e in check_names(evs, f"preferences of {s}"):
+            if e not in events:
+                raise RequestError(400, f"{s}: unknown event {e!r}")
+    for e, ss in check_object(delta.get('performance', {}), 'performance').items():
+        if e not in events:
+            raise RequestError(400, f"unknown event {e!r}")
+        for s in check_names(ss, f"performance of {e}"):
+            if s not in students:
+                raise RequestError(400, f"{e}: unknown student {s!r}")
+    for section, kinds in check_object(delta.get('rules', {}), 'rules').items():
+        if section == 'pair_together':
+            kinds = {None: kinds}
+        else:
+            kinds = check_object(kinds, f"rules.{section}")
+        for kind, entries in kinds.items():
+            field = f"rules.{section}" + (f".{kind}" if kind else '')
+            shape = RULE_ENTRIES.get((section, kind))
+            if shape is None:
+                raise RequestError(400, f"unknown rule {field}")
+            if not isinstance(entries, list):
+                raise RequestError(400, f"{field} must be a list of [{shape[0]}, {shape[1]}] pairs")
+            for entry in entries:
+                if not isinstance(entry, list) or len(entry) != 2:
+                    raise RequestError(400, f"{field}: {entry!r} is not a [{shape[0]}, {shape[1]}] pair")
+                for what, value in zip(shape, entry):
+                    if what == 'count':
+                        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                            raise RequestError(400, f"{field}: limit {value!r} is not a whole number")
+                    elif not isinstance(value, str) or value not in (students if what == 'student' else events):
+                        raise RequestError(400, f"{field}: unknown {what} {value!r}")
+    return delta
+
+def check_settings(body: Dict, time_limit: Optional[float]) -> Dict:
+    # the solve settings of a request, defaults filled in; RequestError(400) on a bad value
+    settings = {'solver': body.get('solver', 'dfs'), 'time_limit': body.get('time_limit', time_limit),
+                'node_limit': body.get('node_limit'), 'decompose': body.get('decompose', False),
+                'repair': body.get('repair', False)}
+    if settings['solver'] not in SOLVERS:
+        raise RequestError(400, f"unknown solver {settings['solver']!r}; expected one of {', '.join(SOLVERS)}")
+    limit = settings['time_limit']
+    if limit is not None and (not isinstance(limit, (int, float)) or isinstance(limit, bool) or limit <= 0):
+        raise RequestError(400, f"time_limit {limit!r} is not a positive number of seconds")
+    nodes = settings['node_limit']
+    if nodes is not None and (not isinstance(nodes, int) or isinstance(nodes, bool) or nodes <= 0):
+        raise RequestError(400, f"node_limit {nodes!r} is not a positive whole number")
+    for flag in ('decompose', 'repair'):
+        if not isinstance(settings[flag], bool):
+            raise RequestError(400, f"{flag} must be true or false")
+    return settings
+
+class SchedulerService:
+    # The problems in memory and the solves in flight. Every method runs on the event loop; only
+    # solve_problem runs elsewhere, on the pool.
+    def __init__(self, pool: ProcessPoolExecutor, time_limit: Optional[float] = None, cors: Optional[str] = None,
+                 data_dir: Optional[str] = None):
+        self.pool = pool
+        self.time_limit = time_limit
+        self.cors = cors
+        # the only folder clients may name files in; without one, rosters come as CSV text only
+        self.data_dir = None if data_dir is None else os.path.realpath(data_dir)
+        # id -> {'problem', 'version', 'results': settings key -> record,
+        #        'edit': (base problem, delta) that made this version, 'schedule': (version, schedule)}
+        self.problems: Dict[str, Dict] = {}
+        # (id, version, settings key) -> the pool future every identical request awaits
+        self.inflight: Dict[tuple, asyncio.Future] = {}
+
+    def add(self, problem: Problem, problem_id: Optional[str] = None) -> str:
+        problem_id = problem_id or uuid.uuid4().hex[:12]
+        self.problems[problem_id] = {'problem': problem, 'version': 1, 'results': {}, 'edit': None,
+                                     'schedule': None}
+        return problem_id
+
+    def data_path(self, path: str) -> str:
+        # `path` resolved inside the data directory, links included; RequestError(403) for anywhere else
+        if self.data_dir is None:
+            raise RequestError(403, "loading by path is off; send the roster as \"csv\"")
+        resolved = os.path.realpath(os.path.join(self.data_dir, path))
+        if os.path.commonpath([resolved, self.data_dir]) != self.data_dir:
+            raise RequestError(403, f"{path} is outside the data directory")
+        return resolved
+
+    def entry(self, problem_id: str) -> Dict:
+        if problem_id not in self.problems:
+            raise RequestError(404, f"no problem {problem_id!r}")
+        return self.problems[problem_id]
+
+    def summary(self, problem_id: str) -> Dict:
+        entry = self.problems[problem_id]
+        problem = entry['problem']
+        return {'id': problem_id, 'version': entry['version'], 'students': len(problem['students']),
+                'events': len(problem['event_student_requirements']),
+                'seats': sum(problem['event_student_requirements'].values())}
+
+    def create(self, body: Dict) -> Dict:
+        problem_id = body.get('id')
+        if problem_id is not None:
+            if not isinstance(problem_id, str) or not PROBLEM_ID.match(problem_id):
+                raise RequestError(400, "id may only use letters, digits, '_', '.' and '-' (at most 64)")
+            if problem_id in self.problems:
+                raise RequestError(409, f"problem {problem_id!r} already exists")
+        try:
+            if isinstance(body.get('csv'), str):
+                problem = load_problem(io.StringIO(body['csv']))
+            elif isinstance(body.get('path'), str):
+                problem = load_problem(self.data_path(body['path']))
+            else:
+                raise RequestError(400, "give the roster as \"csv\" (file contents) or \"path\"")
+        except ProblemFormatError as exc:
+            raise RequestError(400, str(exc))
+        except OSError as exc:
+            raise RequestError(400, f"{body['path']}: {exc.strerror or exc}")
+        return self.summary(self.add(problem, problem_id))
+
+    def edit(self, problem_id: str, body) -> Dict:
+        entry = self.entry(problem_id)
+        base = entry['problem']
+        try:
+            delta = check_delta(base, body)
+            problem = Problem(apply_delta(base, delta))
+        except (TypeError, ValueError, AttributeError):
+            raise RequestError(400, "malformed edit; see event.apply_delta for its shape")
+        entry['problem'] = problem
+        entry['version'] += 1
+        entry['results'] = {}
+        entry['edit'] = (base, delta)
+        return self.summary(problem_id)
+
+    async def solve(self, problem_id: str, body: Dict) -> Dict:
+        entry = self.entry(problem_id)
+        settings = check_settings(body, self.time_limit)
+        key = json.dumps(settings, sort_keys=True)
+        version = entry['version']
+        known = entry['results'].get(key)
+        if known is not None:
+            return dict(known, id=problem_id, version=version, cached=True)
+
+        previous = None
+        if settings['repair'] and entry['edit'] is not None and entry['schedule'] is not None:
+            schedule_version, schedule = entry['schedule']
+            if schedule_version == version - 1:
+                previous = (schedule,) + entry['edit']
+        flight = (problem_id, version, key)
+        future = self.inflight.get(flight)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, solve_problem, entry['problem'], settings, previous)
+            self.inflight[flight] = future
+            future.add_done_callback(lambda _: self.inflight.pop(flight, None))
+        try:
+            # shielded, so a client hanging up does not cancel the search others are waiting on
+            record = await asyncio.shield(future)
+        except Exception as exc:
+            raise RequestError(500, f"solve failed: {type(exc).__name__}: {exc}")
+
+        # an edit may have landed while it ran; the result still belongs to the version it was asked for
+        if entry['version'] == version and self.problems.get(problem_id) is entry:
+            complete = record['status'] in ('optimal', 'feasible')
+            if complete:
+                entry['schedule'] = (version, record['assignments'])
+            final = record['status'] in ('optimal', 'infeasible') or (
+                complete and settings['solver'] in ('dfs', 'flow') and previous is None)
+            if final:
+                entry['results'][key] = record
+        return dict(record, id=problem_id, version=version, cached=False)
+
+    async def dispatch(self, method: str, path: List[str], body) -> Tuple[int, object]:
+        if path[:1] != ['problems'] or len(path) > 3:
+            raise RequestError(404, f"no such resource /{'/'.join(path)}")
+        if len(path) > 1:
+            entry = self.entry(path[1])
+        if len(path) == 1:
+            if method == 'GET':
+                return 200, {'problems': [self.summary(problem_id) for problem_id in self.problems]}
+            if method == 'POST':
+                return 201, self.create(self.object_body(body))
+        elif len(path) == 2:
+            if method == 'GET':
+                return 200, {'id': path[1], 'version': entry['version'], 'problem': entry['problem']}
+            if method == 'DELETE':
+                del self.problems[path[1]]
+                return 200, {'id': path[1], 'deleted': True}
+        elif path[2] == 'edits' and method == 'POST':
+            return 200, self.edit(path[1], body)
+        elif path[2] == 'solve' and method == 'POST':
+            return 200, await self.solve(path[1], self.object_body(body))
+        elif path[2] not in ('edits', 'solve'):
+            raise RequestError(404, f"no such resource /{'/'.join(path)}")
+        raise RequestError(405, f"{method} is not supported on /{'/'.join(path)}")
+
+    @staticmethod
+    def object_body(body) -> Dict:
+        if body is None:
+            return {}
+        if not isinstance(body, dict):
+            raise RequestError(400, "the request body must be a JSON object")
+        return body
+
+    async def read_request(self, reader: asyncio.StreamReader) -> Tuple[str, List[str], object]:
+        # (method, path segments, parsed JSON body or None) of one HTTP/1.1 request
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise RequestError(400, "malformed request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise RequestError(400, "malformed Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, f"request body over {MAX_BODY_BYTES} bytes")
+        body = None
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except (asyncio.IncompleteReadError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+                raise RequestError(400, f"the request body is not JSON: {exc}")
+        path = [part for part in target.split('?', 1)[0].split('/') if part]
+        return method.upper(), path, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # one request per connection
+        headers = {'Content-Type': 'application/json', 'Connection': 'close'}
+        if self.cors:
+            headers['Access-Control-Allow-Origin'] = self.cors
+        try:
+            method, path, body = await self.read_request(reader)
+            if method == 'OPTIONS':
+                # CORS preflight
+                status, payload = 204, None
+                headers.update({'Access-Control-Allow-Methods': 'GET, POST, DELETE',
+                                'Access-Control-Allow-Headers': 'Content-Type'})
+            else:
+                status, payload = await self.dispatch(method, path, body)
+        except RequestError as exc:
+            status, payload = exc.status, {'error': str(exc)}
+        except ConnectionError:
+            writer.close()
+            return
+        data = b'' if payload is None else json.dumps(payload).encode()
+        headers['Content-Length'] = str(len(data))
+        head = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}'] + [f'{k}: {v}' for k, v in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(host: str, port: int, workers: Optional[int], time_limit: Optional[float], cors: Optional[str],
+                preload: Dict[str, Problem], data_dir: Optional[str] = None):
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        service = SchedulerService(pool, time_limit, cors, data_dir)
+        for problem_id, problem in preload.items():
+            service.add(problem, problem_id)
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Serving {len(service.problems)} problems on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve schedules over a local JSON API.")
+    parser.add_argument('csv', nargs='*', help="rosters to load at start, each under its file name")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="solver processes (default: all cores)")
+    parser.add_argument('--time-limit', type=float, default=10.0, help="seconds per solve unless a request says")
+    parser.add_argument('--cors', default=None, help="origin allowed to call from a browser, e.g. http://localhost:3000")
+    parser.add_argument('--data-dir', default=None, help="folder clients may load CSVs from by path (default: none)")
+    args = parser.parse_args()
+
+    preload = {}
+    for path in args.csv:
+        try:
+            preload[os.path.splitext(os.path.basename(path))[0]] = load_problem(path)
+        except (OSError, ProblemFormatError) as exc:
+            raise SystemExit(f"{path}: {exc}")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.time_limit, args.cors, preload, args.data_dir))
+    except KeyboardInterrupt:
+        pass
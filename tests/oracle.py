@@ -0,0 +1,82 @@
+# Brute-force reference for tiny rosters: every valid schedule, checked rule by rule straight from the
+# find_assignment arguments, with none of the solver's data structures.
+import itertools
+import random
+from typing import Dict, List
+
+import benchmark
+from event import MAX_BUILDS_PER_STUDENT
+
+def cost(problem: Dict, placements) -> int:
+    total = 0
+    for s, e in placements:
+        prefs = problem['preferences'].get(s, [])
+        perf = (problem['performance'] or {}).get(e, [])
+        total += (prefs.index(e) if e in prefs else 999) + (perf.index(s) if s in perf else 999)
+    return total
+
+def violations(problem: Dict, placements, max_per_student: int,
+               max_builds_per_student: int = MAX_BUILDS_PER_STUDENT) -> List[str]:
+    # the rules a set of (student, event) placements breaks; an empty list for a valid schedule
+    rosters = {e: {s for s, x in placements if x == e} for e in problem['event_student_requirements']}
+    events_of = {s: [e for t, e in placements if t == s] for s in problem['students']}
+    block_of = {e: b for b, evs in problem['blocks'].items() for e in evs}
+    rules = problem['rules']
+    # per-student limits can only tighten the team-wide caps
+    event_cap = {s: max_per_student for s in problem['students']}
+    build_cap = {s: max_builds_per_student for s in problem['students']}
+    for caps, key in ((event_cap, 'student-events'), (build_cap, 'student-builds')):
+        for s, n in rules.get('limits', {}).get(key, []):
+            caps[s] = min(caps[s], n)
+    found = []
+    for e, n in problem['event_student_requirements'].items():
+        if len(rosters[e]) != n:
+            found.append(f"{e} has {len(rosters[e])} of {n} students")
+    for s, evs in events_of.items():
+        if len(evs) > event_cap[s]:
+            found.append(f"{s} has {len(evs)} events")
+        if sum(e in problem['build_events'] for e in evs) > build_cap[s]:
+            found.append(f"{s} has too many builds")
+        blocks = [block_of.get(e) for e in evs]
+        if len(set(blocks)) < len(blocks):
+            found.append(f"{s} has two events in one block")
+    for s, e in rules.get('banned', {}).get('student-event', []):
+        if s in rosters.get(e, ()):
+            found.append(f"{s} is banned from {e}")
+    for a, b in rules.get('banned', {}).get('student-student', []):
+        if any(a in r and b in r for r in rosters.values()):
+            found.append(f"{a} and {b} share an event")
+    for s, e in rules.get('mandatory', {}).get('student-event', []):
+        if s not in rosters.get(e, ()):
+            found.append(f"{s} must take {e}")
+    for a, b in rules.get('pair_together', []):
+        if rosters.get(a) != rosters.get(b):
+            found.append(f"{a} and {b} have different rosters")
+    return found
+
+def schedules(problem: Dict, max_per_student: int,
+              max_builds_per_student: int = MAX_BUILDS_PER_STUDENT) -> Dict[frozenset, int]:
+    # every valid schedule, as a set of placements, with its cost
+    events = list(problem['event_student_requirements'])
+    choices = [itertools.combinations(problem['students'], problem['event_student_requirements'][e]) for e in events]
+    found = {}
+    for teams in itertools.product(*choices):
+        placements = frozenset((s, e) for e, team in zip(events, teams) for s in team)
+        if not violations(problem, placements, max_per_student, max_builds_per_student):
+            found[placements] = cost(problem, placements)
+    return found
+
+def placements(assignment: Dict[str, List[str]]) -> frozenset:
+    return frozenset((s, e) for s, evs in assignment.items() for e in evs)
+
+def tiny_roster(seed: int, bans: bool = True, pairs: bool = True) -> Dict:
+    # a random roster small enough to enumerate, with a mandatory placement now and then
+    r = random.Random(seed)
+    problem = benchmark.generate_roster(seed, students=r.randint(3, 4), blocks=2, events_per_block=2,
+                                        no_conflict=r.randint(0, 1), seats=(1, 2), build_ratio=0.3,
+                                        ban_density=0.15 if bans else 0.0, tryouts_per_student=(1, 3),
+                                        pairs=r.randint(0, 1) if pairs else 0)
+    if bans and r.random() < 0.3:
+        problem['rules']['mandatory']['student-event'].append(
+            (r.choice(problem['students']), r.choice(list(problem['event_student_requirements']))))
+    return problem
@@ -0,0 +1,27 @@
+import event
+from event import MAX_BUILDS_PER_STUDENT, _batch_worker, find_assignment, problem_from_tables
+
+def build_roster():
+    # one student who must take both build events
+    tryouts = {'StudentA': [('Boomilever', 1), ('Helicopter', 2)]}
+    return problem_from_tables(tryouts, ['Boomilever', 'Helicopter'], {}, {'Boomilever': 1, 'Helicopter': 1},
+                               ['Boomilever', 'Helicopter'], {}, {})
+
+def test_build_cap_is_a_solver_parameter():
+    problem = build_roster()
+    assert find_assignment(**problem).complete
+    assert find_assignment(**problem, max_builds_per_student=1) is None
+
+def test_batch_build_cap_leaves_the_module_constant_alone():
+    problem = build_roster()
+    record = _batch_worker(problem, {'max_builds_per_student': 1})
+    assert record['status'] == 'infeasible'
+    assert event.MAX_BUILDS_PER_STUDENT == MAX_BUILDS_PER_STUDENT
+    assert _batch_worker(problem, {})['status'] == 'feasible'
+    assert _batch_worker(problem, {'max_builds_per_student': 3})['status'] == 'feasible'
+
+def test_build_cap_is_part_of_the_cache_key(tmp_path):
+    problem = build_roster()
+    cache = event.SolutionCache(str(tmp_path))
+    assert find_assignment(**problem, cache=cache).complete
+    assert find_assignment(**problem, cache=cache, max_builds_per_student=1) is None
@@ -0,0 +1,52 @@
+# A build cap other than MAX_BUILDS_PER_STUDENT reaches every entry point, not just find_assignment
+import pytest
+
+from event import (MAX_EVENTS_PER_STUDENT, enumerate_assignments, explain_infeasibility, find_assignment,
+                   improve_assignment, problem_from_tables, resolve, solve_decomposed, solve_portfolio)
+from oracle import placements, schedules, violations
+
+def roster(students=('StudentA', 'StudentB')):
+    # StudentA is best at both build events, so with two builds allowed they take both
+    tryouts = {'StudentA': [('Boomilever', 1), ('Helicopter', 2)], 'StudentB': [('Boomilever', 5), ('Helicopter', 6)]}
+    tryouts = {s: tryouts[s] for s in students}
+    return problem_from_tables(tryouts, ['Boomilever', 'Helicopter'], {}, {'Boomilever': 1, 'Helicopter': 1},
+                               ['Boomilever', 'Helicopter'], {}, {})
+
+BOTH = {'StudentA': ['Boomilever', 'Helicopter'], 'StudentB': []}
+SPLIT = {'StudentA': ['Boomilever'], 'StudentB': ['Helicopter']}
+
+def valid_with_one_build(result):
+    return violations(roster(), placements(result), MAX_EVENTS_PER_STUDENT, 1) == []
+
+def test_the_default_cap_lets_one_student_take_both_builds():
+    assert find_assignment(**roster(), solver='bnb') == BOTH
+    assert placements(BOTH) in schedules(roster(), MAX_EVENTS_PER_STUDENT)
+    assert placements(BOTH) not in schedules(roster(), MAX_EVENTS_PER_STUDENT, 1)
+
+@pytest.mark.parametrize('solver', ['dfs', 'bnb', 'flow', 'ilp'])
+def test_find_assignment(solver):
+    assert valid_with_one_build(find_assignment(**roster(), solver=solver, max_builds_per_student=1))
+
+def test_enumerate_assignments():
+    found = [placements(a) for a in enumerate_assignments(**roster(), max_builds_per_student=1)]
+    assert sorted(found, key=sorted) == sorted(schedules(roster(), MAX_EVENTS_PER_STUDENT, 1), key=sorted)
+
+def test_resolve():
+    # the schedule made under the default cap is repaired to fit the tighter one
+    result = resolve(BOTH, {}, **roster(), max_builds_per_student=1)
+    assert valid_with_one_build(result)
+
+def test_improve_assignment():
+    # moving StudentB's build to StudentA would be cheaper, but not allowed
+    result = improve_assignment(SPLIT, **roster(), max_builds_per_student=1, time_limit=5, iterations=20)
+    assert valid_with_one_build(result)
+
+def test_explain_infeasibility():
+    conflict = explain_infeasibility(**roster(['StudentA']), max_builds_per_student=1)
+    assert (('build cap',), 'each student has at most 1 build events') in conflict
+
+def test_solve_portfolio():
+    assert valid_with_one_build(solve_portfolio(**roster(), max_builds_per_student=1, workers=1))
+
+def test_solve_decomposed():
+    assert valid_with_one_build(solve_decomposed(**roster(), max_builds_per_student=1, workers=1))
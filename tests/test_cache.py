@@ -0,0 +1,22 @@
+import os
+
+import event
+from event import SolutionCache, find_assignment, load_problem, problem_fingerprint
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example.csv')
+
+def test_cache_entries_are_keyed_by_cache_version(tmp_path, monkeypatch):
+    problem = load_problem(EXAMPLE)
+    cache = SolutionCache(str(tmp_path))
+    first = find_assignment(**problem, cache=cache)
+    assert first is not None
+    key = problem_fingerprint(problem['students'], problem['preferences'], problem['blocks'],
+                              problem['event_student_requirements'], problem['rules'], problem['performance'],
+                              build_events=problem['build_events'], similar_groups=problem['similar_groups'])
+    assert cache.get(key, problem['students'], problem['events']) == first
+    monkeypatch.setattr(event, 'CACHE_VERSION', event.CACHE_VERSION + 1)
+    newer = problem_fingerprint(problem['students'], problem['preferences'], problem['blocks'],
+                                problem['event_student_requirements'], problem['rules'], problem['performance'],
+                                build_events=problem['build_events'], similar_groups=problem['similar_groups'])
+    assert newer != key
+    assert cache.get(newer, problem['students'], problem['events']) is None
@@ -0,0 +1,78 @@
+# solve_decomposed: schedules merged from split pieces keep every rule, and keep the verdict of the
+# whole-roster search
+import zlib
+
+import pytest
+
+import benchmark
+import event
+from event import MAX_EVENTS_PER_STUDENT, find_assignment, solve_decomposed
+from oracle import placements, schedules, tiny_roster, violations
+
+SEEDS = range(40)
+
+@pytest.fixture
+def pieces(monkeypatch):
+    # how many pieces each part of the roster was split into
+    counts = []
+    split = event._split_component
+
+    def spy(*args):
+        result = split(*args)
+        counts.append(0 if result is None else len(result))
+        return result
+
+    monkeypatch.setattr(event, '_split_component', spy)
+    return counts
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    # parts of more than two seats are split, so even tiny rosters are solved as several pieces
+    monkeypatch.setattr(event, 'DECOMPOSE_PART_SEATS', 2)
+
+def generated(name: str):
+    params = next(params for case, params, _ in benchmark.CASES if case == name)
+    return benchmark.generate_roster(zlib.crc32(name.encode()), **params)
+
+def test_tiny_rosters_do_split(small_parts, pieces):
+    split = 0
+    for seed in SEEDS:
+        pieces.clear()
+        solve_decomposed(**tiny_roster(seed), workers=1)
+        split += max(pieces, default=0) > 1
+    assert split >= len(SEEDS) // 2
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_split_schedules_are_valid_exactly_when_the_roster_has_one(small_parts, seed):
+    problem = tiny_roster(seed)
+    result = solve_decomposed(**problem, workers=1)
+    assert (result is None) == (find_assignment(**problem) is None)
+    if not schedules(problem, MAX_EVENTS_PER_STUDENT):
+        assert result is None
+    else:
+        assert result is not None and result.status == 'feasible'
+        assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT) == []
+
+@pytest.mark.parametrize('case, part_seats', [('search-bans-0.15-3', 8), ('search-bans-0.20-1', 12),
+                                              ('search-bans-0.20-2', 24), ('search-bans-0.25-1', 8)])
+def test_verdict_matches_the_whole_roster_search(monkeypatch, pieces, case, part_seats):
+    # 48 seats in pieces of about part_seats each, which the relaxed schedule manages to share out
+    monkeypatch.setattr(event, 'DECOMPOSE_PART_SEATS', part_seats)
+    problem = generated(case)
+    expected = find_assignment(**problem)
+    result = solve_decomposed(**problem, workers=1)
+    assert max(pieces) > 1
+    assert (result is None) == (expected is None)
+    if result is not None:
+        assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT) == []
+
+@pytest.mark.parametrize('case, max_builds_per_student', [('builds-0.50', 2), ('builds-0.25', 1)])
+def test_caps_shared_between_pieces_hold_after_the_merge(pieces, case, max_builds_per_student):
+    # over twice DECOMPOSE_PART_SEATS seats with many builds: several pieces drawing on every cap
+    problem = generated(case)
+    result = solve_decomposed(**problem, max_builds_per_student=max_builds_per_student, workers=1, time_limit=60)
+    assert max(pieces) > 1 and result.complete
+    assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT, max_builds_per_student) == []
+    builds = set(problem['build_events'])
+    assert max(len(evs) for evs in result.values()) <= MAX_EVENTS_PER_STUDENT
+    assert max(sum(e in builds for e in evs) for evs in result.values()) <= max_builds_per_student
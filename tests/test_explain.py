@@ -0,0 +1,50 @@
+import zlib
+
+import pytest
+
+import benchmark
+import event
+from event import (MAX_BUILDS_PER_STUDENT, MAX_EVENTS_PER_STUDENT, build_solver_state, explain_infeasibility,
+                   find_assignment, problem_from_tables, solve_dfs)
+
+def paired_roster(seats_a: int, seats_b: int):
+    tryouts = {'StudentA': [('Astronomy', 1), ('Codebusters', 1)], 'StudentB': [('Astronomy', 2), ('Codebusters', 2)]}
+    rules = {'pair_together': [('Astronomy', 'Codebusters')]}
+    return problem_from_tables(tryouts, ['Astronomy', 'Codebusters'], {},
+                               {'Astronomy': seats_a, 'Codebusters': seats_b}, [], rules, {})
+
+def test_a_feasible_roster_has_no_explanation():
+    assert explain_infeasibility(**paired_roster(1, 1), time_limit=10) is None
+
+@pytest.mark.parametrize('seats', [(0, 2), (2, 0), (1, 2)])
+def test_a_pair_with_mismatched_seats_is_blamed(seats):
+    problem = paired_roster(*seats)
+    assert find_assignment(**problem) is None
+    conflict = explain_infeasibility(**problem, time_limit=10)
+    assert conflict is not None
+    assert ('pair', 'Astronomy', 'Codebusters') in [c for c, _ in conflict]
+
+def test_overfull_block_is_explained_by_its_seats():
+    params = dict(benchmark.BASE, overfull_block=True)
+    problem = benchmark.generate_roster(zlib.crc32(b'infeasible-overfull-block'), **params)
+    conflict = explain_infeasibility(**problem, time_limit=30)
+    assert conflict is not None
+    assert ('block', 'Block 1') in [c for c, _ in conflict]
+
+def test_without_a_time_limit_every_constraint_of_the_core_is_needed(monkeypatch):
+    # four students banned from each other cannot fill three seats; showing it takes search, which a
+    # node cap this small would cut short, and with no time_limit the cap must not apply
+    monkeypatch.setattr(event, 'EXPLAIN_NODE_LIMIT', 1)
+    tryouts = {s: [('Codebusters', 1), ('Optics', 1)] for s in ('StudentA', 'StudentB', 'StudentC', 'StudentD')}
+    apart = [(a, b) for a in tryouts for b in tryouts if a < b]
+    problem = problem_from_tables(tryouts, ['Codebusters', 'Optics'], {}, {'Codebusters': 3, 'Optics': 1}, [],
+                                  {'banned': {'student-student': apart}}, {})
+    conflict = explain_infeasibility(**problem)
+    assert conflict is not None
+    core = {c for c, _ in conflict}
+    assert ('seats', 'Codebusters') in core
+    tables = {k: v for k, v in problem.items() if k != 'events'}
+    tables.update(max_per_student=MAX_EVENTS_PER_STUDENT, max_builds_per_student=MAX_BUILDS_PER_STUDENT)
+    for constraint in core:
+        state = build_solver_state(**event._relaxed_problem(tables, core - {constraint}))
+        assert state is not None and solve_dfs(state).complete, constraint
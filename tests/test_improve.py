@@ -0,0 +1,28 @@
+from event import find_assignment, improve_assignment, problem_from_tables
+
+def perfect_roster():
+    # every student's first choice, where they are also the best at it: the only schedule costs 0
+    tryouts = {'StudentA': [('Astronomy', 1), ('Forensics', 2)],
+               'StudentB': [('Forensics', 1), ('Astronomy', 2)],
+               'StudentC': [('Codebusters', 1)]}
+    blocks = {'Block 1': ['Astronomy', 'Forensics']}
+    requirements = {'Astronomy': 1, 'Forensics': 1, 'Codebusters': 1}
+    return problem_from_tables(tryouts, ['Codebusters'], blocks, requirements, [], {}, {})
+
+def test_improve_keeps_a_schedule_that_costs_nothing():
+    problem = perfect_roster()
+    start = find_assignment(**problem)
+    assert start.cost == 0
+    result = improve_assignment(start, **problem, time_limit=5, iterations=50, seed=1)
+    assert result.status == 'feasible'
+    assert result.cost == 0
+    assert result == start
+
+def test_improve_never_returns_a_worse_schedule():
+    tryouts = {'StudentA': [('Astronomy', 1), ('Forensics', 1)],
+               'StudentB': [('Astronomy', 2), ('Forensics', 2)]}
+    blocks = {'Block 1': ['Astronomy', 'Forensics']}
+    problem = problem_from_tables(tryouts, [], blocks, {'Astronomy': 1, 'Forensics': 1}, [], {}, {})
+    start = find_assignment(**problem)
+    result = improve_assignment(start, **problem, time_limit=5, iterations=50, seed=2)
+    assert result.cost <= start.cost
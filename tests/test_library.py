@@ -0,0 +1,45 @@
+# Entry points called as a library get every table from their arguments, never from script globals.
+import pytest
+
+from event import (build_solver_state, enumerate_assignments, explain_infeasibility, find_assignment,
+                   improve_assignment, pretty_print, problem_fingerprint, problem_from_tables, resolve,
+                   solve_decomposed, solve_portfolio)
+
+def roster():
+    tryouts = {'StudentA': [('Boomilever', 1), ('Astronomy', 2)], 'StudentB': [('Astronomy', 1)]}
+    return problem_from_tables(tryouts, ['Boomilever'], {'Block 1': ['Astronomy']},
+                               {'Boomilever': 1, 'Astronomy': 1}, ['Boomilever'], {}, {'Group1': ['Astronomy']})
+
+def without(problem, *keys):
+    return {k: v for k, v in problem.items() if k not in keys}
+
+SCHEDULE = {'StudentA': ['Boomilever'], 'StudentB': ['Astronomy']}
+
+# every entry point taking the roster tables, called with the roster as keyword arguments
+ENTRY_POINTS = {
+    'find_assignment': lambda problem: find_assignment(**problem),
+    'build_solver_state': lambda problem: build_solver_state(**without(problem, 'events')),
+    'problem_fingerprint': lambda problem: problem_fingerprint(**without(problem, 'events')),
+    'enumerate_assignments': lambda problem: list(enumerate_assignments(**problem)),
+    'resolve': lambda problem: resolve(SCHEDULE, {'remove_students': ['StudentB']}, **problem),
+    'improve_assignment': lambda problem: improve_assignment(SCHEDULE, **problem, iterations=1),
+    'explain_infeasibility': lambda problem: explain_infeasibility(**problem),
+    'solve_portfolio': lambda problem: solve_portfolio(**problem, workers=1),
+    'solve_decomposed': lambda problem: solve_decomposed(**problem, workers=1),
+}
+
+@pytest.mark.parametrize('missing', [('build_events',), ('similar_groups',), ('build_events', 'similar_groups')])
+@pytest.mark.parametrize('entry_point', ENTRY_POINTS)
+def test_entry_points_need_build_events_and_similar_groups(entry_point, missing):
+    with pytest.raises(TypeError) as raised:
+        ENTRY_POINTS[entry_point](without(roster(), *missing))
+    assert all(f"'{name}'" in str(raised.value) for name in missing)
+
+def test_empty_tables_are_accepted():
+    result = find_assignment(**dict(roster(), build_events=[], similar_groups={}))
+    assert result == SCHEDULE
+
+def test_pretty_print_orders_events_by_the_preferences_given(capsys):
+    pretty_print({'StudentA': ['Boomilever', 'Astronomy']}, {'StudentA': ['Astronomy', 'Boomilever']})
+    row = capsys.readouterr().out.splitlines()[-1]
+    assert row.split() == ['StudentA', 'Astronomy', 'Boomilever']
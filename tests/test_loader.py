@@ -0,0 +1,99 @@
+# load_problem on small CSVs: a good one, and each way a row can be wrong
+import io
+
+import pytest
+
+from event import ProblemFormatError, load_problem
+
+# line 1 is the Students header; the Event header is on line 6 and Rules start on line 11
+GOOD = """Student,Event,Rank,Event,Rank
+Ann,Optics,1,Towers,2
+Ben,Optics,2,Fossils,1
+Cy,Towers,1,Fossils,3
+
+Event,Number of Students,Block,Type
+Optics,1,Block 1,Lab
+Fossils,1,Block 2,Knowledge
+Towers,1,No Conflict,Build
+
+Rules
+Mandatory
+Ann,Optics
+Banned
+Ben,Towers
+Ben,Cy
+Paired Events
+Optics,Fossils
+Similar Events
+Optics,Towers
+"""
+
+def load(text: str):
+    return load_problem(io.StringIO(text))
+
+def replace_line(number: int, row: str) -> str:
+    lines = GOOD.splitlines()
+    lines[number - 1] = row
+    return '\n'.join(lines) + '\n'
+
+def test_good_file():
+    problem = load(GOOD)
+    assert problem.students == ['Ann', 'Ben', 'Cy']
+    assert problem['preferences']['Cy'] == ['Towers', 'Fossils']
+    assert problem['performance']['Fossils'] == ['Ben', 'Cy']
+    assert problem['blocks']['NoConflict: Towers'] == ['Towers']
+    assert problem['build_events'] == ['Towers']
+    assert problem['rules']['mandatory']['student-event'] == [('Ann', 'Optics')]
+    assert problem['rules']['banned'] == {'student-event': [('Ben', 'Towers')], 'student-student': [('Ben', 'Cy')]}
+    assert problem['rules']['pair_together'] == [('Optics', 'Fossils')]
+    assert problem['similar_groups'] == {'Group1': ['Optics', 'Towers']}
+
+@pytest.mark.parametrize('line, row, message', [
+    (2, 'Ann,Optics,first,Towers,2', "Ann: rank 'first' for Optics is not a whole number"),
+    (2, 'Ann,Optics,1,Towers', 'Ann: Towers has no rank'),
+    (2, 'Ann,Optics,1,,2', 'Ann: rank 2 has no event'),
+    (3, 'Ann,Optics,2', 'student Ann is listed twice'),
+    (8, 'Optics,1,Block 2,Knowledge', 'event Optics is listed twice'),
+    (7, 'Optics,one,Block 1,Lab', "Optics: number of students 'one' is not a whole number"),
+    (7, 'Optics,-1,Block 1,Lab', "Optics: number of students '-1' is not a whole number"),
+    (7, 'Optics,²,Block 1,Lab', "Optics: number of students '²' is not a whole number"),
+    (7, 'Optics,,Block 1,Lab', "Optics: number of students '' is not a whole number"),
+    (13, 'Dee,Optics', 'unknown student Dee'),
+    (13, 'Ann,Chess', 'unknown event Chess'),
+    (13, 'Ann,Optics,Towers', 'Mandatory rows need two names, got 3'),
+    (15, 'Ben,Chess', 'unknown student or event Chess'),
+    (18, 'Optics', 'paired events need at least two events, got 1'),
+    (18, 'Optics,Chess', 'unknown event Chess in paired events'),
+    (20, 'Optics,Chess', 'unknown event Chess in similar events'),
+    (12, 'Preferences', 'expected Mandatory, Banned, Paired Events or Similar Events, got Preferences'),
+])
+def test_bad_row_names_its_line(line, row, message):
+    with pytest.raises(ProblemFormatError) as raised:
+        load(replace_line(line, row))
+    assert raised.value.line == line
+    assert str(raised.value) == f'line {line}: {message}'
+
+def test_tryout_for_an_event_missing_from_the_event_table():
+    with pytest.raises(ProblemFormatError) as raised:
+        load(replace_line(4, 'Cy,Towers,1,Chess,3'))
+    assert raised.value.line == 4
+    assert 'Cy tried out for Chess, which is not in the Event table' in str(raised.value)
+
+def test_no_students_section():
+    with pytest.raises(ProblemFormatError, match='no Students section') as raised:
+        load('Name,Event,Rank\nAnn,Optics,1\n')
+    assert raised.value.line is None
+
+def test_no_event_table():
+    with pytest.raises(ProblemFormatError, match='no Event table') as raised:
+        load(GOOD[:GOOD.index('\nEvent,')])
+    assert raised.value.line is None
+
+def test_rows_above_the_students_header_and_blank_rows_are_skipped():
+    problem = load('Tryouts 2026,,\n,,\n' + GOOD.replace('\n\n', '\n,,,\n\n'))
+    assert problem == load(GOOD)
+
+def test_path_and_open_file_read_the_same(tmp_path):
+    path = tmp_path / 'tryouts.csv'
+    path.write_text(GOOD, encoding='utf-8')
+    assert load_problem(str(path)) == load_problem(path) == load(GOOD)
@@ -0,0 +1,100 @@
+# find_assignment against the brute-force oracle on tiny random rosters
+import pytest
+
+from event import (MAX_EVENTS_PER_STUDENT, apply_delta, build_solver_state, enumerate_assignments, find_assignment,
+                   resolve, solve_flow)
+from oracle import placements, schedules, tiny_roster, violations
+
+SEEDS = range(40)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_dfs_finds_a_valid_schedule_exactly_when_one_exists(seed):
+    problem = tiny_roster(seed)
+    result = find_assignment(**problem)
+    if not schedules(problem, MAX_EVENTS_PER_STUDENT):
+        assert result is None
+    else:
+        assert result is not None and result.status == 'feasible'
+        assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT) == []
+
+@pytest.mark.parametrize('solver', ['bnb', 'ilp'])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_exact_solvers_find_the_cheapest_schedule(seed, solver):
+    problem = tiny_roster(seed)
+    valid = schedules(problem, MAX_EVENTS_PER_STUDENT)
+    result = find_assignment(**problem, solver=solver)
+    if not valid:
+        assert result is None
+        return
+    assert result.status == 'optimal'
+    assert placements(result) in valid
+    assert result.cost == valid[placements(result)] == min(valid.values())
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_tighter_event_cap(seed):
+    problem = tiny_roster(seed)
+    valid = schedules(problem, 2)
+    result = find_assignment(**problem, max_per_student=2, solver='bnb')
+    if not valid:
+        assert result is None
+    else:
+        assert result.cost == min(valid.values())
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_flow_is_optimal_when_the_network_models_every_rule(seed):
+    # no bans, pairs or builds: the min-cost flow is the whole problem, so it never falls back
+    problem = dict(tiny_roster(seed, bans=False, pairs=False), build_events=[])
+    valid = schedules(problem, MAX_EVENTS_PER_STUDENT)
+    state = build_solver_state(**{k: v for k, v in problem.items() if k != 'events'})
+    if state is None:
+        assert not valid
+        return
+    result = solve_flow(state)
+    if not valid:
+        assert result.status == 'infeasible'
+    else:
+        assert result.status == 'optimal'
+        assert result.cost == valid[placements(result)] == min(valid.values())
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_flow_falls_back_to_a_valid_schedule_with_rules(seed):
+    problem = tiny_roster(seed)
+    valid = schedules(problem, MAX_EVENTS_PER_STUDENT)
+    result = find_assignment(**problem, solver='flow')
+    if not valid:
+        assert result is None
+    else:
+        assert placements(result) in valid
+        if result.status == 'optimal':
+            assert result.cost == min(valid.values())
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_enumeration_walks_the_schedules_cheapest_first(seed):
+    problem = tiny_roster(seed)
+    valid = schedules(problem, MAX_EVENTS_PER_STUDENT)
+    found = [placements(a) for a in enumerate_assignments(**problem, k=8)]
+    assert len(set(found)) == len(found) == min(8, len(valid))
+    assert all(p in valid for p in found)
+    assert [valid[p] for p in found] == sorted(valid.values())[:len(found)]
+
+def _deltas(problem, previous):
+    # a dropout, and a ban on one of the placements just made
+    student = problem['students'][0]
+    yield {'remove_students': [student]}
+    s, e = sorted(placements(previous))[0]
+    yield {'rules': {'banned': {'student-event': [(s, e)]}}}
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_resolve_repairs_to_a_valid_schedule_exactly_when_one_exists(seed):
+    problem = tiny_roster(seed)
+    previous = find_assignment(**problem)
+    if previous is None:
+        return
+    for delta in _deltas(problem, previous):
+        changed = apply_delta(problem, delta)
+        result = resolve(previous, delta, **problem)
+        if not schedules(changed, MAX_EVENTS_PER_STUDENT):
+            assert result is None
+        else:
+            assert result is not None
+            assert violations(changed, placements(result), MAX_EVENTS_PER_STUDENT) == []
@@ -0,0 +1,43 @@
+# solve_portfolio: the variants race on a process pool; whichever answers, the answer must hold
+import os
+
+import pytest
+
+from event import MAX_EVENTS_PER_STUDENT, find_assignment, load_problem, problem_from_tables, solve_portfolio
+from oracle import placements, schedules, tiny_roster, violations
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example.csv')
+
+def banned_trio():
+    # three seats, and only four students, all banned from each other: infeasible, but only search shows it
+    tryouts = {s: [('Codebusters', 1), ('Optics', 1)] for s in ('StudentA', 'StudentB', 'StudentC', 'StudentD')}
+    apart = [(a, b) for a in tryouts for b in tryouts if a < b]
+    return problem_from_tables(tryouts, ['Codebusters', 'Optics'], {}, {'Codebusters': 3, 'Optics': 1}, [],
+                               {'banned': {'student-student': apart}}, {})
+
+@pytest.mark.parametrize('seed', range(12))
+def test_first_result_is_a_valid_schedule(seed):
+    problem = tiny_roster(seed)
+    result = solve_portfolio(**problem, workers=3)
+    if not schedules(problem, MAX_EVENTS_PER_STUDENT):
+        assert result is None
+    else:
+        assert result is not None and result.complete
+        assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT) == []
+
+def test_optimize_is_never_worse_than_the_first_schedule():
+    problem = load_problem(EXAMPLE)
+    first = find_assignment(**problem)
+    result = solve_portfolio(**problem, workers=2, time_limit=20, optimize=True)
+    assert result.complete and result.cost <= first.cost
+    assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT) == []
+    # the example's optimum, which the min-cost flow bound proves at once
+    assert result.status == 'optimal' and result.cost == find_assignment(**problem, solver='flow').cost
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_infeasible_roster_is_none_or_infeasible_never_partial(optimize):
+    problem = banned_trio()
+    assert find_assignment(**problem) is None
+    assert solve_portfolio(**problem, workers=2, optimize=optimize) is None
+    result = solve_portfolio(**problem, workers=2, time_limit=20, optimize=optimize)
+    assert result.status == 'infeasible'
@@ -0,0 +1,95 @@
+# Progress callbacks and the output sinks they feed
+import csv
+import json
+import os
+from datetime import datetime
+
+import event
+from event import (CsvSink, JsonLinesSink, SolverProgress, TableSink, fan_out, find_assignment, improve_assignment,
+                   load_problem, unique_output_path)
+from oracle import placements, tiny_roster
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example.csv')
+
+SCHEDULE = event.Assignment({'StudentB': ['Optics'], 'StudentA': ['Towers', 'Fossils']}, 'feasible', 7)
+
+def found(updates):
+    return [u for u in updates if u.assignment is not None]
+
+def test_find_assignment_reports_each_better_schedule():
+    updates = []
+    result = find_assignment(**tiny_roster(13), solver='bnb', progress=updates.append)
+    schedules = found(updates)
+    assert schedules and schedules[-1].assignment == result
+    costs = [u.best_cost for u in schedules]
+    assert costs == sorted(costs, reverse=True) and len(set(costs)) == len(costs)
+    assert all(u.filled == u.seats for u in schedules)
+
+def test_first_found_schedule_is_reported_once():
+    updates = []
+    result = find_assignment(**load_problem(EXAMPLE), progress=updates.append)
+    assert [u.assignment for u in found(updates)] == [result]
+
+def test_improve_assignment_reports_each_cheaper_schedule():
+    problem = load_problem(EXAMPLE)
+    start = find_assignment(**problem)
+    updates = []
+    result = improve_assignment(start, **problem, time_limit=10, iterations=200, seed=1, progress=updates.append)
+    schedules = found(updates)
+    # the same schedule, whatever order the repairs left each student's events in
+    assert schedules and placements(schedules[-1].assignment) == placements(result)
+    costs = [start.cost] + [u.best_cost for u in schedules]
+    assert costs == sorted(costs, reverse=True) and len(set(costs)) == len(costs)
+
+def test_csv_sink_keeps_the_latest_schedule_in_one_file(tmp_path):
+    sink = CsvSink(str(tmp_path))
+    sink(SolverProgress(0.5, 10, 2, 3, None))
+    assert sink.path is None
+    sink(SolverProgress(1.0, 20, 3, 3, 9, event.Assignment({'StudentA': ['Towers']}, 'feasible', 9)))
+    first = sink.path
+    sink(SolverProgress(2.0, 30, 3, 3, 7, SCHEDULE))
+    assert sink.path == first and os.listdir(tmp_path) == [os.path.basename(first)]
+    with open(first, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows == [['Student', 'Event1', 'Event2'], ['StudentA', 'Towers', 'Fossils'], ['StudentB', 'Optics', '']]
+
+def test_json_lines_sink_writes_one_object_per_update(tmp_path):
+    sink = JsonLinesSink(directory=str(tmp_path))
+    sink(SolverProgress(0.5, 10, 2, 3, None))
+    sink(SolverProgress(2.0, 30, 3, 3, 7, SCHEDULE))
+    with open(sink.path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records[0] == {'elapsed': 0.5, 'nodes': 10, 'nodes_per_second': 20, 'filled': 2, 'seats': 3,
+                          'best_cost': None}
+    assert records[1]['status'] == 'feasible' and records[1]['assignment'] == dict(SCHEDULE)
+
+def test_table_sink_prints_a_status_line_and_the_schedule(capsys):
+    sink = TableSink({'StudentA': ['Fossils', 'Towers']})
+    sink(SolverProgress(2.0, 30, 3, 3, 7, SCHEDULE))
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == '[    2.0s] found schedule, 3/3 seats, best cost 7, 30 nodes (15/s)'
+    assert lines[-2].split() == ['StudentA', 'Fossils', 'Towers']
+    TableSink({}, tables=False)(SolverProgress(0.5, 10, 2, 3, None))
+    assert capsys.readouterr().out == '[    0.5s] 2/3 seats, best cost -, 10 nodes (20/s)\n'
+
+def test_fan_out_feeds_every_sink():
+    first, second = [], []
+    update = SolverProgress(0.5, 10, 2, 3, None)
+    fan_out(first.append, second.append)(update)
+    assert first == second == [update]
+
+def test_unique_output_path_never_reuses_a_name(tmp_path, monkeypatch):
+    class Frozen(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 1, 2, 3, 4, 5)
+
+    monkeypatch.setattr(event, 'datetime', Frozen)
+    first = unique_output_path(str(tmp_path), '.csv')
+    with open(first, 'w', encoding='utf-8') as f:
+        f.write('kept')
+    second = unique_output_path(str(tmp_path), '.csv')
+    assert os.path.basename(first) == 'science_olympiad_event_scheduler_output_2026-01-02_03-04-05.csv'
+    assert os.path.basename(second) == 'science_olympiad_event_scheduler_output_2026-01-02_03-04-05_2.csv'
+    with open(first, encoding='utf-8') as f:
+        assert f.read() == 'kept'
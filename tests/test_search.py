@@ -0,0 +1,144 @@
+# solve_dfs: conflict-directed backjumping against plain chronological backtracking, what SolverStats
+# records of it, how budgets cut it short, and the branch-and-bound it runs as the last exact backend
+import json
+import os
+import sys
+import time
+import zlib
+
+import pytest
+
+import benchmark
+import event
+from event import (MAX_EVENTS_PER_STUDENT, SolverState, SolverStats, find_assignment, load_problem,
+                   problem_from_tables)
+from oracle import placements, violations
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example.csv')
+
+def dead_end_roster(k: int):
+    # k independent one-seat events with two candidates each, which MRV branches on first, and a
+    # three-seat event whose four candidates are all banned from each other, so it fails whatever the
+    # others hold; nobody may take an event they did not try out for
+    tryouts = {}
+    for i in range(k):
+        tryouts[f'P{i}'] = [(f'X{i}', 1)]
+        tryouts[f'Q{i}'] = [(f'X{i}', 2)]
+    for s in 'ABCD':
+        tryouts[s] = [('E', 1)]
+    requirements = {f'X{i}': 1 for i in range(k)}
+    requirements['E'] = 3
+    off = [(s, e) for s, tried in tryouts.items() for e in requirements if e not in dict(tried)]
+    apart = [(a, b) for a in 'ABCD' for b in 'ABCD' if a < b]
+    rules = {'mandatory': {'student-event': []}, 'banned': {'student-event': off, 'student-student': apart}}
+    return problem_from_tables(tryouts, list(requirements), {}, requirements, [], rules, {})
+
+def chronological(monkeypatch):
+    # every dead end blamed on every placement, and nothing learned: plain chronological backtracking
+    monkeypatch.setattr(SolverState, 'blame', lambda self, student, event: [
+        [(s, e) for s, evs in self.student_assignments.items() for e in evs]])
+    monkeypatch.setattr(event, 'NOGOOD_LIMIT', 0)
+
+def test_backjumping_skips_the_levels_a_dead_end_does_not_depend_on(monkeypatch):
+    problem = dead_end_roster(8)
+    jumping = SolverStats()
+    assert find_assignment(**problem, stats=jumping) is None
+    chronological(monkeypatch)
+    plain = SolverStats()
+    assert find_assignment(**problem, stats=plain) is None
+    assert jumping.backjumps >= 8 and plain.backjumps == 0
+    # the plain search retries both candidates of every independent event: 2^8 dead ends
+    assert plain.nodes > 2 ** 8 and jumping.nodes * 50 < plain.nodes
+
+def test_dead_ends_are_only_explained_when_they_happen(monkeypatch):
+    calls = []
+    blame = SolverState.blame
+    monkeypatch.setattr(SolverState, 'blame', lambda self, s, e: calls.append((s, e)) or blame(self, s, e))
+    stats = SolverStats()
+    assert find_assignment(**load_problem(EXAMPLE), stats=stats).complete
+    assert stats.backtracks == 0 and calls == []
+
+def test_stats_record_a_forced_backtrack():
+    # X0 takes P0; E then takes A, which bans the rest, and B, which A's exclusion and the bans leave
+    # alone too: two 'seats' dead ends, after which two untried students cannot fill three seats. The
+    # bans are not X0's doing, so the search jumps straight past it.
+    stats = SolverStats()
+    assert find_assignment(**dead_end_roster(1), stats=stats) is None
+    assert (stats.nodes, stats.backtracks, stats.backjumps, stats.max_depth) == (3, 1, 1, 2)
+    assert stats.prunes == {'seats': 2}
+    # E's domain after each try: the placed student, the three (then two) banned peers and the one tried
+    # before; P0 and Q0 never tried out for E, nor A-D for X0
+    assert stats.rejections == {'already placed': 2, 'banned peer': 5, 'tried in sibling branch': 1,
+                                'banned event': 6}
+    assert {'setup', 'search', 'eligibility', 'sorting', 'propagation'} <= set(stats.timings)
+
+def test_stats_json_round_trip(tmp_path):
+    stats = SolverStats()
+    find_assignment(**dead_end_roster(2), stats=stats)
+    path = tmp_path / 'stats.json'
+    text = stats.to_json(str(path))
+    assert json.loads(text) == json.loads(path.read_text(encoding='utf-8')) == stats.to_dict()
+    twice = SolverStats()
+    twice.add(stats)
+    twice.add(stats)
+    record = json.loads(twice.to_json())
+    assert record['nodes'] == 2 * stats.nodes and record['prunes'] == {k: 2 * v for k, v in stats.prunes.items()}
+    assert record['max_depth'] == stats.max_depth
+
+def test_without_stats_nothing_is_timed(monkeypatch):
+    calls = []
+    perf_counter = time.perf_counter
+    monkeypatch.setattr(time, 'perf_counter', lambda: calls.append(1) or perf_counter())
+    assert find_assignment(**dead_end_roster(2)) is None
+    assert find_assignment(**load_problem(EXAMPLE), solver='bnb').status == 'optimal'
+    monkeypatch.undo()
+    assert calls == []
+
+def generated(name: str):
+    params = next(params for case, params, _ in benchmark.CASES if case == name)
+    return benchmark.generate_roster(zlib.crc32(name.encode()), **params)
+
+@pytest.mark.parametrize('solver', ['dfs', 'bnb'])
+def test_one_node_leaves_a_backtracking_roster_partial(solver):
+    # plain dfs needs thousands of nodes here
+    problem = generated('search-bans-0.20-1')
+    result = find_assignment(**problem, solver=solver, node_limit=1)
+    assert result.status == 'partial' and not result.complete
+    # what it did place keeps every rule; only seats are left open
+    broken = violations(problem, placements(result), MAX_EVENTS_PER_STUDENT)
+    assert broken and all(v.endswith(' students') for v in broken)
+
+def test_an_unfinished_proof_of_infeasibility_is_partial():
+    problem = dead_end_roster(8)
+    assert find_assignment(**problem) is None
+    assert find_assignment(**problem, node_limit=1).status == 'partial'
+    assert find_assignment(**problem, node_limit=10 ** 6).status == 'infeasible'
+
+def test_branch_and_bound_only_claims_optimal_once_proved():
+    problem = generated('search-bans-0.15-2')
+    best = find_assignment(**problem, solver='bnb')
+    assert best.status == 'optimal'
+    cut = find_assignment(**problem, solver='bnb', node_limit=30)
+    assert cut.status == 'feasible' and cut.complete and cut.cost > best.cost
+    # the same search given room enough to finish proves the same optimum
+    assert find_assignment(**problem, solver='bnb', node_limit=10 ** 6).status == 'optimal'
+    assert violations(problem, placements(best), MAX_EVENTS_PER_STUDENT) == []
+
+@pytest.mark.parametrize('bans, cost', [
+    ([], 47993),
+    # StudentA and StudentC both sit in the cheapest Codebusters team
+    ([('StudentA', 'StudentC'), ('StudentH', 'StudentN')], 49988),
+    ([('StudentC', 'StudentH'), ('StudentM', 'StudentA'), ('StudentB', 'StudentP')], 47994),
+])
+def test_ilp_without_solver_libraries_proves_the_optimum_by_branch_and_bound(monkeypatch, bans, cost):
+    for name in ('ortools', 'ortools.sat', 'ortools.sat.python', 'pulp'):
+        monkeypatch.setitem(sys.modules, name, None)
+    calls = []
+    solve_bnb = event.solve_bnb
+    monkeypatch.setattr(event, 'solve_bnb', lambda *args, **kwargs: calls.append(1) or solve_bnb(*args, **kwargs))
+    problem = load_problem(EXAMPLE)
+    rules = dict(problem['rules'], banned=dict(problem['rules']['banned'], **{'student-student': bans}))
+    result = find_assignment(**dict(problem, rules=rules), solver='ilp', time_limit=30)
+    assert result.status == 'optimal' and result.cost == cost
+    # with no ban the flow fast path answers on its own
+    assert len(calls) == (1 if bans else 0)
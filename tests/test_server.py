@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from event import load_problem
+from server import RequestError, SchedulerService, check_delta, check_settings
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example.csv')
+
+@pytest.fixture
+def problem():
+    return load_problem(EXAMPLE)
+
+@pytest.fixture
+def service(problem):
+    # create and edit never touch the pool
+    service = SchedulerService(None)
+    service.add(problem, 'example')
+    return service
+
+def rejected(call, *args, status=400):
+    with pytest.raises(RequestError) as info:
+        call(*args)
+    assert info.value.status == status
+    return str(info.value)
+
+def test_check_delta_accepts_well_formed_edits(problem):
+    student, event = problem['students'][0], problem['events'][0]
+    delta = {'add_students': ['NewStudent'], 'preferences': {'NewStudent': [event]},
+             'event_student_requirements': {event: 3},
+             'rules': {'banned': {'student-event': [[student, event]], 'student-student': [[student, 'NewStudent']]},
+                       'limits': {'student-events': [[student, 2]], 'student-builds': [[student, 0]]},
+                       'pair_together': [[problem['events'][1], problem['events'][2]]]}}
+    assert check_delta(problem, delta) is delta
+
+@pytest.mark.parametrize('delta', [
+    None, {}, [], {'nonsense': 1},
+    {'add_students': 'Bob'},
+    {'add_students': [1]},
+    {'remove_students': 'StudentA'},
+    {'remove_students': ['Nobody']},
+    {'preferences': ['StudentA']},
+    {'preferences': {'StudentA': 'Codebusters'}},
+    {'performance': {'Codebusters': 'StudentA'}},
+    {'event_student_requirements': {'Codebusters': -1}},
+    {'event_student_requirements': {'Codebusters': '2'}},
+    {'event_student_requirements': {'Codebusters': True}},
+    {'rules': []},
+    {'rules': {'banned': [['StudentA', 'Codebusters']]}},
+    {'rules': {'banned': {'student-event': ['StudentA']}}},
+    {'rules': {'banned': {'student-event': [['StudentA', 'Codebusters', 'x']]}}},
+    {'rules': {'banned': {'student-event': [['StudentA', 'Nowhere']]}}},
+    {'rules': {'banned': {'student-event': [[['StudentA'], 'Codebusters']]}}},
+    {'rules': {'banned': {'everything': []}}},
+    {'rules': {'mandatory': {'student-event': [['Codebusters', 'StudentA']]}}},
+    {'rules': {'pair_together': [['StudentA', 'StudentB']]}},
+    {'rules': {'limits': {'student-events': [['StudentA', 'x']]}}},
+    {'rules': {'limits': {'student-builds': [['StudentA', -1]]}}},
+    {'rules': {'limits': {'student-builds': [['StudentA', 1.5]]}}},
+])
+def test_check_delta_rejects_malformed_edits(problem, delta):
+    rejected(check_delta, problem, delta)
+
+def test_rejected_edit_leaves_the_problem_alone(service, problem):
+    rejected(service.edit, 'example', {'rules': {'limits': {'student-events': [['StudentA', 'x']]}}})
+    entry = service.problems['example']
+    assert entry['version'] == 1
+    assert entry['problem'] is problem
+
+def test_edit_makes_a_new_version(service, problem):
+    event = problem['events'][0]
+    summary = service.edit('example', {'event_student_requirements': {event: 0}})
+    assert summary['version'] == 2
+    assert service.problems['example']['problem']['event_student_requirements'][event] == 0
+
+def test_create_from_csv_text(service):
+    with open(EXAMPLE, encoding='utf-8') as f:
+        summary = service.create({'csv': f.read(), 'id': 'copy'})
+    assert summary['id'] == 'copy'
+    assert rejected(service.create, {'csv': 'Students\n', 'id': 'copy'}, status=409)
+    rejected(service.create, {'csv': 'not a roster'})
+    rejected(service.create, {'id': 'bad id!', 'csv': ''})
+
+def test_create_by_path_needs_a_data_dir(service):
+    rejected(service.create, {'path': EXAMPLE}, status=403)
+
+def test_create_by_path_stays_inside_the_data_dir(tmp_path, problem):
+    with open(EXAMPLE, encoding='utf-8') as f:
+        (tmp_path / 'team.csv').write_text(f.read(), encoding='utf-8')
+    service = SchedulerService(None, data_dir=str(tmp_path))
+    assert service.create({'path': 'team.csv', 'id': 'team'})['students'] == len(problem['students'])
+    rejected(service.create, {'path': '../team.csv'}, status=403)
+    rejected(service.create, {'path': EXAMPLE}, status=403)
+    rejected(service.create, {'path': 'missing.csv'})
+
+def test_check_settings():
+    assert check_settings({}, 10) == {'solver': 'dfs', 'time_limit': 10, 'node_limit': None, 'decompose': False,
+                                      'repair': False}
+    for body in ({'solver': 'magic'}, {'time_limit': 0}, {'time_limit': 'soon'}, {'node_limit': 1.5},
+                 {'node_limit': True}, {'decompose': 'yes'}, {'repair': 1}):
+        rejected(check_settings, body, None)
@@ -0,0 +1,136 @@
+import zlib
+
+import pytest
+
+import benchmark
+import event
+from event import (MAX_EVENTS_PER_STUDENT, SolverStats, build_solver_state, find_assignment, problem_from_tables,
+                   solve_dfs)
+from oracle import placements, violations
+
+def state():
+    tryouts = {'StudentA': [('Boomilever', 1), ('Helicopter', 1), ('Astronomy', 1), ('Forensics', 1)],
+               'StudentB': [('Astronomy', 2), ('Forensics', 2)],
+               'StudentC': [('Astronomy', 3)]}
+    rules = {'banned': {'student-event': [('StudentC', 'Forensics')], 'student-student': [('StudentB', 'StudentC')]}}
+    problem = problem_from_tables(tryouts, ['Boomilever', 'Helicopter'], {'Block 1': ['Astronomy', 'Forensics']},
+                                  {'Boomilever': 1, 'Helicopter': 1, 'Astronomy': 2, 'Forensics': 1},
+                                  ['Boomilever', 'Helicopter'], rules, {})
+    return build_solver_state(**{k: v for k, v in problem.items() if k != 'events'}, max_per_student=3)
+
+def test_eligible_follows_every_rule_and_undo_restores_it():
+    s = state()
+    assert not s.eligible('StudentC', 'Forensics')
+    s.assign('StudentB', 'Astronomy')
+    # banned alongside StudentB, and StudentB's block is now taken
+    assert not s.eligible('StudentC', 'Astronomy')
+    assert not s.eligible('StudentB', 'Forensics')
+    assert not s.eligible('StudentB', 'Astronomy')
+    s.unassign('StudentB', 'Astronomy')
+    assert s.eligible('StudentC', 'Astronomy')
+    assert s.eligible('StudentB', 'Forensics')
+
+def test_event_and_build_caps():
+    events = ['Boomilever', 'Helicopter', 'Hovercraft', 'Codebusters', 'Astronomy']
+    tryouts = {s: [(e, 1) for e in events] for s in ('StudentA', 'StudentB', 'StudentC')}
+    problem = problem_from_tables(tryouts, events, {}, {e: 1 for e in events}, events[:3], {}, {})
+    s = build_solver_state(**{k: v for k, v in problem.items() if k != 'events'}, max_per_student=3)
+    s.assign('StudentA', 'Boomilever')
+    s.assign('StudentA', 'Helicopter')
+    # two builds is the cap
+    assert not s.eligible('StudentA', 'Hovercraft')
+    assert s.eligible('StudentA', 'Codebusters')
+    s.assign('StudentA', 'Codebusters')
+    # three events is the cap
+    assert not s.eligible('StudentA', 'Astronomy')
+    s.unassign('StudentA', 'Helicopter')
+    assert s.eligible('StudentA', 'Hovercraft')
+    assert 'StudentA' in s.candidates('Astronomy')
+
+def test_propagate_finds_a_block_short_of_students_before_branching_into_it():
+    # Block 1's five seats need all five of StudentA-E, and StudentA may take only two events, so
+    # StudentA can hold at most one of the builds StudentA is first choice for; each event alone
+    # still has students enough once StudentA holds both
+    others = {s: [('Astronomy', 2), ('Fossils', 2)] for s in ('StudentB', 'StudentC', 'StudentD', 'StudentE')}
+    tryouts = dict(others, StudentA=[('Boomilever', 1), ('Helicopter', 1), ('Astronomy', 1), ('Fossils', 1)],
+                   StudentF=[('Boomilever', 2), ('Helicopter', 2)])
+    off = [(s, e) for s in others for e in ('Boomilever', 'Helicopter')]
+    off += [('StudentF', 'Astronomy'), ('StudentF', 'Fossils')]
+    rules = {'banned': {'student-event': off}, 'limits': {'student-events': [('StudentA', 2)]}}
+    problem = problem_from_tables(tryouts, ['Boomilever', 'Helicopter'], {'Block 1': ['Astronomy', 'Fossils']},
+                                  {'Boomilever': 1, 'Helicopter': 1, 'Astronomy': 3, 'Fossils': 2}, [], rules, {})
+    s = build_solver_state(**{k: v for k, v in problem.items() if k != 'events'})
+    assert s.propagate() is None
+    s.assign('StudentA', 'Boomilever')
+    assert s.propagate() is None
+    s.assign('StudentA', 'Helicopter')
+    assert len(s.candidates('Astronomy')) == 4 and len(s.candidates('Fossils')) == 4
+    assert s.propagate() == ('block', 'Block 1')
+    # the search meets the same dead end on the builds and hands one to StudentF instead
+    stats = SolverStats()
+    result = find_assignment(**problem, stats=stats)
+    assert stats.prunes == {'block': 1}
+    assert violations(problem, placements(result), MAX_EVENTS_PER_STUDENT) == []
+    assert len(result['StudentF']) == 1
+
+def generated(name: str):
+    params = next(params for case, params, _ in benchmark.CASES if case == name)
+    return benchmark.generate_roster(zlib.crc32(name.encode()), **params)
+
+def with_and_without_arrays(monkeypatch, build):
+    # build() once with candidates ordered on NumPy arrays, once in plain Python
+    pytest.importorskip('numpy')
+    arrays = build()
+    with monkeypatch.context() as m:
+        m.setattr(event, 'VECTORIZE_MIN_STUDENTS', 10 ** 6)
+        plain = build()
+    return arrays, plain
+
+# plain order, weighted scores, random tie-breaking, and both (see SolverState.set_ordering)
+ORDERINGS = [(None, None), (None, (1, 1, 0, 0)), (3, None), (5, (1, 1, 5, 0))]
+
+@pytest.mark.parametrize('seed, weights', ORDERINGS)
+@pytest.mark.parametrize('case', ['pairs-4', 'builds-0.50'])
+def test_rank_arrays_order_candidates_as_python_does(monkeypatch, case, seed, weights):
+    problem = generated(case)
+    tables = {k: v for k, v in problem.items() if k != 'events'}
+    arrays, plain = with_and_without_arrays(monkeypatch, lambda: build_solver_state(**tables))
+    assert arrays.rank_arrays is not None and plain.rank_arrays is None
+    for s in (arrays, plain):
+        s.set_ordering(seed, weights)
+
+    def same_order():
+        for e in problem['event_student_requirements']:
+            assert arrays.candidates(e) == plain.candidates(e), e
+
+    # along a whole schedule and back, so loads and similar-group counts change both ways
+    placements = [(s, e) for s, evs in find_assignment(**problem).items() for e in evs]
+    same_order()
+    for s, e in placements:
+        for state in (arrays, plain):
+            state.assign(s, e)
+        same_order()
+    for s, e in reversed(placements):
+        for state in (arrays, plain):
+            state.unassign(s, e)
+        same_order()
+
+@pytest.mark.parametrize('seed, weights', ORDERINGS)
+def test_rank_arrays_search_the_same_tree(monkeypatch, seed, weights):
+    # branch-and-bound under a node limit on 26 students, just over VECTORIZE_MIN_STUDENTS: it
+    # backtracks often, and every tie in cost order falls back to the candidate order
+    problem = benchmark.generate_roster(1, **dict(benchmark.SEARCH, students=26, ban_density=0.15, pairs=1))
+    tables = {k: v for k, v in problem.items() if k != 'events'}
+
+    def solve():
+        state = build_solver_state(**tables)
+        state.set_ordering(seed, weights)
+        state.stats = SolverStats()
+        result = solve_dfs(state, node_limit=100, optimize=True)
+        return result, state.stats
+
+    (arrays, arrays_stats), (plain, plain_stats) = with_and_without_arrays(monkeypatch, solve)
+    assert arrays_stats.backtracks > 10
+    assert arrays_stats.nodes == plain_stats.nodes and arrays_stats.backtracks == plain_stats.backtracks
+    assert arrays_stats.prunes == plain_stats.prunes
+    assert arrays == plain and arrays.cost == plain.cost and arrays.status == plain.status
@@ -0,0 +1,44 @@
+# Seat-order symmetry breaking: a student who failed in an event is excluded from its later seats,
+# which must never cost the only schedule when students who tried out alike differ by one rule
+import pytest
+
+from event import SolverState, SolverStats, find_assignment, problem_from_tables
+from oracle import placements, schedules
+
+STUDENTS = ['StudentA', 'StudentB', 'StudentC', 'StudentD']
+EVENTS = ['Astronomy', 'Codebusters', 'Fossils']
+
+def twins(seats, rules, build_events=()):
+    # four students with the same tryout for every event; only the rules tell them apart
+    tryouts = {s: [(e, 1) for e in EVENTS] for s in STUDENTS}
+    return problem_from_tables(tryouts, EVENTS, {}, dict(zip(EVENTS, seats)), list(build_events), rules, {})
+
+# each has exactly one schedule with two events per student, and more without its last rule
+ROSTERS = {
+    'ban': twins((3, 2, 2), {'banned': {'student-event': [('StudentC', 'Codebusters')],
+                                        'student-student': [('StudentC', 'StudentD'), ('StudentB', 'StudentD')]}}),
+    'peer ban': twins((1, 3, 3), {'banned': {'student-student': [('StudentC', 'StudentD'),
+                                                                 ('StudentA', 'StudentD')]}}),
+    'event limit': twins((3, 2, 1), {'banned': {'student-event': [('StudentB', 'Fossils'), ('StudentA', 'Codebusters')],
+                                                'student-student': [('StudentA', 'StudentD'), ('StudentA', 'StudentB')]},
+                                     'limits': {'student-events': [('StudentC', 1)]}}),
+    'build limit': twins((2, 3, 2), {'banned': {'student-student': [('StudentB', 'StudentD'), ('StudentA', 'StudentD')]},
+                                     'limits': {'student-builds': [('StudentA', 1)]}},
+                         build_events=['Astronomy', 'Codebusters']),
+}
+
+@pytest.mark.parametrize('solver', ['dfs', 'bnb'])
+@pytest.mark.parametrize('forward_checking', [True, False])
+@pytest.mark.parametrize('kind', list(ROSTERS))
+def test_the_only_schedule_survives_symmetry_breaking(monkeypatch, kind, forward_checking, solver):
+    problem = ROSTERS[kind]
+    only = schedules(problem, 2)
+    assert len(only) == 1
+    if not forward_checking:
+        # without propagation the search walks into the dead ends, so the exclusions come into play
+        monkeypatch.setattr(SolverState, 'propagate', lambda self: None)
+    stats = SolverStats()
+    result = find_assignment(**problem, max_per_student=2, solver=solver, stats=stats)
+    assert result is not None and placements(result) in only
+    if not forward_checking and solver == 'dfs':
+        assert stats.backtracks and stats.rejections['tried in sibling branch']